@@ -0,0 +1,67 @@
+#! /usr/bin/env python3
+"""
+Benchmark writing records to a file, using lo99ing's ``FileHandler`` vs. ``BytesFileHandler``
+(bytes-native, using vectored writes).
+"""
+
+import os
+import time
+import logging
+import tempfile
+import tracemalloc
+from lo99ing.handlers import FileHandler, BytesFileHandler
+from lo99ing.formatter import formatter
+
+
+N = 200000
+
+
+def make_records(n):
+    return [
+        logging.LogRecord(
+            'bench.logger', logging.INFO, __file__, 1, 'message %s %s', (i, 'x' * 50), None)
+        for i in range(n)
+    ]
+
+
+def run(handler, records):
+    t0 = time.perf_counter()
+    for r in records:
+        handler.handle(r)
+    handler.flush()
+    return time.perf_counter() - t0
+
+
+def measure_allocs(handler, records):
+    """ Returns the peak memory (in bytes) allocated while handling the records. """
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    for r in records:
+        handler.handle(r)
+    handler.flush()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+    records = make_records(N)
+    cases = [
+        ('FileHandler', lambda path: FileHandler(path)),
+        ('BytesFileHandler', lambda path: BytesFileHandler(path)),
+        ('BytesFileHandler/100', lambda path: BytesFileHandler(path, buffer_records=100)),
+    ]
+    print('%-22s %12s %12s %14s' % ('', 'records/s', 'us/record', 'peak-mem[KB]'))
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for name, factory in cases:
+            path = os.path.join(tmpdir, name.replace('/', '_') + '.log')
+            handler = factory(path)
+            handler.setFormatter(formatter)
+            t = min(run(handler, records) for _ in range(3))
+            peak = measure_allocs(handler, records[:10000])
+            handler.close()
+            print('%-22s %12.0f %12.2f %14.1f' % (name, N / t, t / N * 1e6, peak / 1024))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+#! /usr/bin/env python3
+"""
+Benchmark the cost of calling logging methods of disabled levels (e.g. ``logger.debug()`` when
+level is INFO), with and without ``use_fast_disabled_calls()``.
+"""
+
+import timeit
+import lo99ing
+
+
+N = 1000000
+
+
+def bench(stmt, namespace):
+    # best of 5, in nanoseconds per call
+    return min(timeit.repeat(stmt, globals=namespace, number=N, repeat=5)) / N * 1e9
+
+
+def main():
+    logger = lo99ing.get_logger('BENCH', level='info')
+    plogger = logger.prefixed('PREFIX')
+    namespace = dict(logger=logger, plogger=plogger)
+    cases = [
+        ('logger.debug', 'logger.debug("x %s", 1)'),
+        ('prefixed.debug', 'plogger.debug("x %s", 1)'),
+    ]
+
+    print('%-20s %12s %12s %8s' % ('', 'default[ns]', 'fast[ns]', 'speedup'))
+    for name, stmt in cases:
+        lo99ing.use_fast_disabled_calls(False)
+        default = bench(stmt, namespace)
+        lo99ing.use_fast_disabled_calls(True)
+        fast = bench(stmt, namespace)
+        print('%-20s %12.1f %12.1f %7.1fx' % (name, default, fast, default / fast))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+#! /usr/bin/env python3
+"""
+Benchmark durable logging from multiple threads (each logging a record, then waiting for it to
+be on disk): fsync per record vs ``DurableFileHandler``'s group commit.
+"""
+
+import os
+import time
+import tempfile
+import threading
+import lo99ing
+from lo99ing.handlers import FileHandler
+from lo99ing.durable import DurableFileHandler
+from lo99ing.formatter import formatter
+
+
+NUM_THREADS = 8
+N = 200  # per thread
+
+
+class FsyncFileHandler(FileHandler):
+    """ fsync per record """
+
+    def flush(self):
+        super().flush()
+        os.fsync(self.stream.fileno())
+
+
+def run(logger, handler):
+    def target():
+        for i in range(N):
+            logger.info('txn %s', i)
+            if isinstance(handler, DurableFileHandler):
+                handler.sync()
+
+    threads = [threading.Thread(target=target) for _ in range(NUM_THREADS)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return NUM_THREADS * N / (time.perf_counter() - t0)
+
+
+def main():
+    tmpdir = tempfile.mkdtemp()
+    print('%-20s %12s' % ('', 'records/sec'))
+    for name, handler_class in [('fsync per record', FsyncFileHandler),
+                                ('group commit', DurableFileHandler)]:
+        path = os.path.join(tmpdir, 'bench.log')
+        logger = lo99ing.get_logger('BENCH.%s' % handler_class.__name__, propagate=False)
+        lo99ing.disable_stderr(logger)
+        handler = handler_class(path)
+        handler.setFormatter(formatter)
+        logger.addHandler(handler)
+        rate = run(logger, handler)
+        extra = ''
+        if isinstance(handler, DurableFileHandler):
+            stats = handler.stats()
+            extra = '  (avg batch %.1f, avg commit %.2fms)' % (
+                stats['avg_batch'], stats['avg_commit_time'] * 1000)
+        print('%-20s %12.0f%s' % (name, rate, extra))
+        logger.removeHandler(handler)
+        handler.close()
+        os.remove(path)
+    os.rmdir(tmpdir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+#! /usr/bin/env python3
+"""
+Benchmark the time of ``import lo99ing`` (based on ``python -X importtime``), excluding the
+time of importing ``logging`` itself.
+
+The package is byte-compiled first, as installed packages are, so the time of compiling its
+sources (e.g. with ``PYTHONDONTWRITEBYTECODE`` set, or after editing them) is not measured.
+
+Exits with an error if it exceeds the budget, e.g.::
+
+    python benchmarks/import_time.py --budget-ms 10
+"""
+
+import os
+import sys
+import argparse
+import compileall
+import subprocess
+
+
+REPEAT = 10
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_times(module):
+    """ Returns a dict of module -> cumulative import time (us), from a fresh interpreter. """
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(
+        [ROOT] + ([env['PYTHONPATH']] if env.get('PYTHONPATH') else []))
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import %s' % module],
+        env=env, stderr=subprocess.PIPE, universal_newlines=True, check=True)
+    times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cumulative, name = line.split('|')
+        try:
+            times[name.strip()] = int(cumulative)
+        except ValueError:
+            pass  # the header line
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--budget-ms', type=float, default=10.0)
+    args = parser.parse_args()
+
+    compileall.compile_dir(os.path.join(ROOT, 'lo99ing'), quiet=1)
+    results = []
+    for _ in range(REPEAT):
+        times = import_times('lo99ing')
+        results.append((times['lo99ing'] - times.get('logging', 0), times['lo99ing']))
+    own, total = min(results)
+
+    print('import lo99ing: %.1fms (%.1fms excluding logging), budget: %.1fms' % (
+        total / 1000, own / 1000, args.budget_ms))
+    if own / 1000 > args.budget_ms:
+        print('OVER BUDGET')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
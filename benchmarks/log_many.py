@@ -0,0 +1,55 @@
+#! /usr/bin/env python3
+"""
+Benchmark logging a batch of records to a file, using individual ``logger.info()`` calls vs a
+single ``logger.log_many()`` call.
+"""
+
+import os
+import time
+import logging
+import tempfile
+import lo99ing
+
+
+N = 100000
+BATCH_SIZE = 1000
+
+
+def bench(func):
+    # best of 3, in records per second
+    best = None
+    for _ in range(3):
+        t0 = time.perf_counter()
+        func()
+        t = time.perf_counter() - t0
+        best = t if best is None else min(best, t)
+    return N / best
+
+
+def main():
+    tmpdir = tempfile.mkdtemp()
+    logger = lo99ing.get_file_logger('BENCH', os.path.join(tmpdir, 'bench.log'), level='info')
+    items = [(i, 'ok') for i in range(BATCH_SIZE)]
+
+    def individual():
+        for _ in range(N // BATCH_SIZE):
+            for item in items:
+                logger.info('item %s: %s', *item)
+
+    def bulk():
+        for _ in range(N // BATCH_SIZE):
+            logger.log_many([(logging.INFO, 'item %s: %s', item) for item in items])
+
+    print('%-20s %12s' % ('', 'records/sec'))
+    for name, func in [('info()', individual), ('log_many()', bulk)]:
+        print('%-20s %12.0f' % (name, bench(func)))
+
+    for h in list(logger.handlers):
+        logger.removeHandler(h)
+        h.close()
+    os.remove(os.path.join(tmpdir, 'bench.log'))
+    os.rmdir(tmpdir)
+
+
+if __name__ == '__main__':
+    main()
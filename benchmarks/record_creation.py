@@ -0,0 +1,58 @@
+#! /usr/bin/env python3
+"""
+Benchmark the per-record cost of ``logging.LogRecord`` vs ``lo99ing.record.SlimLogRecord``:
+creation time, memory allocated per record, and the time of a full ``logger.info()`` call
+(formatted by lo99ing's default formatter).
+"""
+
+import io
+import timeit
+import logging
+import tracemalloc
+import lo99ing
+from lo99ing.handlers import StreamHandler
+from lo99ing.formatter import formatter
+from lo99ing.record import SlimLogRecord
+
+
+N = 100000
+NUM_ALIVE = 10000
+
+
+def bench(func):
+    # best of 5, in nanoseconds per call
+    return min(timeit.repeat(func, number=N, repeat=5)) / N * 1e9
+
+
+def bytes_per_record(factory):
+    tracemalloc.start()
+    records = [factory('BENCH', logging.INFO, __file__, 1, 'x %s', (1, ), None, 'main')
+               for _ in range(NUM_ALIVE)]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del records
+    return size / NUM_ALIVE
+
+
+def main():
+    logger = lo99ing.get_logger('BENCH', propagate=False)
+    lo99ing.disable_stderr(logger)
+    handler = StreamHandler(io.StringIO())
+    handler.setFormatter(formatter)
+    logger.addHandler(handler)
+
+    print('%-20s %14s %14s %16s' % ('', 'create[ns]', 'bytes/record', 'logger.info[ns]'))
+    for name, factory in [('LogRecord', logging.LogRecord), ('SlimLogRecord', SlimLogRecord)]:
+        logging.setLogRecordFactory(factory)
+        create = bench(
+            lambda: factory('BENCH', logging.INFO, __file__, 1, 'x %s', (1, ), None, 'main'))
+        size = bytes_per_record(factory)
+        stream = handler.stream = io.StringIO()
+        info = bench(lambda: logger.info('x %s', 1))
+        stream.close()
+        print('%-20s %14.0f %14.0f %16.0f' % (name, create, size, info))
+    logging.setLogRecordFactory(logging.LogRecord)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+#! /usr/bin/env python3
+"""
+Benchmark logging throughput to a file vs thread count, using a regular file handler vs a
+``ShardedHandler`` (per-thread buffers, merged and written by a single writer thread).
+
+Throughput includes writing all records (the sharded handler is flushed before stopping the
+clock).  Run it using both a standard and a free-threaded (no-GIL) interpreter, to compare.
+"""
+
+import os
+import sys
+import time
+import tempfile
+import threading
+import lo99ing
+
+
+N = 100000  # records per run, split between the threads
+THREAD_COUNTS = (1, 2, 4, 8, 16, 32)
+
+
+def worker(barrier, logger, n):
+    barrier.wait()
+    for i in range(n):
+        logger.info('item %s: %s', i, 'ok')
+
+
+def run(logger, num_threads, flush):
+    barrier = threading.Barrier(num_threads + 1)
+    threads = [
+        threading.Thread(target=worker, args=(barrier, logger, N // num_threads))
+        for _ in range(num_threads)
+    ]
+    for t in threads:
+        t.start()
+    t0 = time.perf_counter()
+    barrier.wait()
+    for t in threads:
+        t.join()
+    flush()
+    return N / (time.perf_counter() - t0)
+
+
+def main():
+    is_gil_enabled = getattr(sys, '_is_gil_enabled', lambda: True)()
+    print('python %s, GIL %s' % (
+        sys.version.split()[0], 'enabled' if is_gil_enabled else 'disabled'))
+    tmpdir = tempfile.mkdtemp()
+    plain_path = os.path.join(tmpdir, 'plain.log')
+    sharded_path = os.path.join(tmpdir, 'sharded.log')
+    plain = lo99ing.get_file_logger('BENCH.plain', plain_path, level='info')
+    sharded = lo99ing.get_file_logger('BENCH.sharded', sharded_path, level='info')
+    sharded_handler = lo99ing.enable_sharded(sharded)
+
+    def flush_plain():
+        for h in plain.handlers:
+            h.flush()
+
+    print('%8s %18s %18s' % ('threads', 'plain[records/s]', 'sharded[records/s]'))
+    for num_threads in THREAD_COUNTS:
+        print('%8d %18.0f %18.0f' % (
+            num_threads,
+            run(plain, num_threads, flush_plain),
+            run(sharded, num_threads, sharded_handler.flush)))
+    print('sharded stats: %s' % (sharded_handler.stats(), ))
+
+    for logger in (plain, sharded):
+        for h in list(logger.handlers):
+            logger.removeHandler(h)
+            h.close()
+    for h in sharded_handler.handlers:
+        h.close()
+    for path in (plain_path, sharded_path):
+        os.remove(path)
+    os.rmdir(tmpdir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+#! /usr/bin/env python3
+"""
+Benchmark scaling of lo99ing's shared-state operations (``get_logger``, reading log-level
+overrides) across thread counts.
+
+Run it using both a standard and a free-threaded (no-GIL) interpreter, to compare.
+"""
+
+import sys
+import time
+import threading
+import lo99ing
+from lo99ing.level import get_log_level_override, get_log_level_overrides
+
+
+N = 100000
+THREAD_COUNTS = (1, 2, 4, 8, 16, 32)
+NAMES = ['bench.logger%d' % i for i in range(100)]
+
+
+def worker(barrier, writes):
+    barrier.wait()
+    for i in range(N):
+        name = NAMES[i % len(NAMES)]
+        lo99ing.get_logger(name)
+        get_log_level_override(name)
+        if writes and i % 1000 == 0:
+            lo99ing.set_log_level_override(name, 'debug' if i % 2000 else None)
+    get_log_level_overrides()
+
+
+def run(num_threads, writes):
+    barrier = threading.Barrier(num_threads + 1)
+    threads = [
+        threading.Thread(target=worker, args=(barrier, writes))
+        for _ in range(num_threads)
+    ]
+    for t in threads:
+        t.start()
+    t0 = time.perf_counter()
+    barrier.wait()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - t0
+
+
+def main():
+    is_gil_enabled = getattr(sys, '_is_gil_enabled', lambda: True)()
+    print('python %s, GIL %s' % (
+        sys.version.split()[0], 'enabled' if is_gil_enabled else 'disabled'))
+    for name in NAMES:
+        lo99ing.get_logger(name)
+
+    print('%8s %16s %16s' % ('threads', 'read-only[op/s]', 'with-writes[op/s]'))
+    for num_threads in THREAD_COUNTS:
+        ops = num_threads * N
+        print('%8d %16.0f %16.0f' % (
+            num_threads, ops / run(num_threads, False), ops / run(num_threads, True)))
+
+
+if __name__ == '__main__':
+    main()
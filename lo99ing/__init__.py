@@ -4,11 +4,55 @@ Python logging, configured the way I like it.
 
 from . import _bootstrap  # for side effects
 
-from .utils import get_logger, get_file_logger, use_utc, use_clock
-from .handlers import enable_stderr, disable_stderr, enable_file
+from .utils import get_logger, get_file_logger, use_utc, use_clock, use_fast_disabled_calls
+from .utils import set_max_arg_length, use_slim_records
+from .handlers import enable_stderr, disable_stderr, enable_file, add_global_filter
 from .level import set_log_level_override
 from .logger import prefixed
+from .misc import lazy
 
 
-_bootstrap, get_logger, get_file_logger, use_utc, use_clock  # pyflakes
+_bootstrap, get_logger, get_file_logger, use_utc, use_clock, use_fast_disabled_calls  # pyflakes
+set_max_arg_length, use_slim_records  # pyflakes
 set_log_level_override, prefixed, enable_stderr, disable_stderr, enable_file  # pyflakes
+add_global_filter, lazy  # pyflakes
+
+
+################################################################################
+# lazy imports
+# These are imported on first access, to keep ``import lo99ing`` fast (e.g. for CLI tools).
+
+_LAZY_ATTRS = {
+    'ProcessLogListener': 'multiproc',
+    'enable_process_sink': 'multiproc',
+    'enable_shipping': 'shipping',
+    'get_ephemeral_logger': 'ephemeral',
+    'FilterRule': 'filters',
+    'RuleFilter': 'filters',
+    'LevelGovernor': 'governor',
+    'wait_durable': 'durable',
+    'enable_sharded': 'sharded',
+    'guard_handlers': 'watchdog',
+}
+
+_LAZY_MODULES = {
+    'multiproc', 'shipping', 'ephemeral', 'filters', 'governor', 'durable', 'fdpool',
+    'rotating', 'profile', 'sharded', 'watchdog',
+}
+
+
+def __getattr__(name):
+    import importlib
+
+    if name in _LAZY_ATTRS:
+        module = importlib.import_module('.' + _LAZY_ATTRS[name], __name__)
+        value = getattr(module, name)
+        globals()[name] = value
+        return value
+    if name in _LAZY_MODULES:
+        return importlib.import_module('.' + name, __name__)
+    raise AttributeError('module %r has no attribute %r' % (__name__, name))
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRS) | _LAZY_MODULES)
@@ -22,9 +22,9 @@ enable_stderr(logging.root)
 logging.root.setLevel(logging.NOTSET)
 
 # but we also need to set default level on loggers which has been created before
-# importing lo99ing
-for logger_name, logger in logging.Logger.manager.loggerDict.items():
-    if logger == logging.root or getattr(logger, 'level', object()) != logging.NOTSET:
+# importing lo99ing (the root logger is not in loggerDict, and placeholders are skipped)
+for logger_name, logger in list(logging.Logger.manager.loggerDict.items()):
+    if type(logger) is logging.PlaceHolder or logger.level != logging.NOTSET:
         continue
     log_level_manager.set_initial(logger_name, logging.WARNING)
     set_log_level(logger_name, log_level_manager.get_effective(logger_name))
@@ -0,0 +1,292 @@
+"""
+Durable file handlers, for audit logs: records can be waited for, until they are on disk.
+
+Records are formatted by the logging thread, and committed by a background committer thread:
+each commit writes all pending records using a single write, followed by a single
+``fdatasync``.  While a commit is in progress, new records accumulate, and are committed together
+by the next one ("group commit"), so the cost of syncing is shared by all records logged
+meanwhile.
+
+Usage::
+
+    audit = get_file_logger('audit', '/var/log/audit.log', durable=True)
+    audit.info('transaction %s committed', txn_id)
+    wait_durable(audit)  # returns once the record is on disk
+"""
+
+import os
+import time
+import logging
+import threading
+
+from .handlers import (
+    _GlobalFiltersMixin, _BatchHandlerMixin, _ErrorHandlerMixin, _DailyFilenameMixin,
+    _to_strftime_pattern, _next_utc_midnight, writev_all)
+
+
+_fdatasync = getattr(os, 'fdatasync', os.fsync)
+
+
+################################################################################
+# handlers
+
+class DurableFileHandler(
+        _GlobalFiltersMixin, _BatchHandlerMixin, _ErrorHandlerMixin, logging.Handler):
+    """
+    A file handler whose records are committed to disk (write+fdatasync) in groups, by a
+    background thread.  Call ``sync()`` to wait until all records logged so far are on disk.
+    """
+
+    terminator = '\n'
+
+    def __init__(self, filename, encoding='utf-8', commit_delay=0.0, retry_interval=1.0,
+                 level=logging.NOTSET):
+        """
+        :param commit_delay: seconds to wait, after a record becomes pending, before committing.
+            Trades latency for larger groups.  With the default of 0, groups are formed by
+            records logged while the previous commit is in progress.
+        :param retry_interval: seconds to wait, after a failed commit, before retrying it.
+        """
+        super().__init__(level)
+        self.encoding = encoding
+        self.commit_delay = commit_delay
+        self.retry_interval = retry_interval
+        self.fd = None
+        self._open_file(filename)
+
+        self._pending = []
+        self._num_pending_records = 0
+        self._seq = 0  # number of batches ever queued
+        self._durable_seq = 0  # number of batches committed
+        self._error = None  # the error of the last commit, if it failed (it is being retried)
+        self._cond = threading.Condition(threading.Lock())
+        self._stopped = False
+        self._counters = dict(
+            commits=0, records=0, bytes=0, errors=0, dropped=0, max_batch=0, commit_time=0.0,
+            max_commit_time=0.0)
+
+        self._thread = threading.Thread(
+            target=self._run, name='lo99ing-committer', daemon=True)
+        self._thread.start()
+
+    ################################################################################
+    # caller side
+
+    def emit(self, record):
+        try:
+            data = (self.format(record) + self.terminator).encode(
+                self.encoding, 'backslashreplace')
+        except Exception:
+            self.handleError(record)
+            return
+        self._enqueue(data, 1)
+
+    def emit_many(self, records):
+        data, num_records = self.format_many_counted(records)
+        if data:
+            self._enqueue(data.encode(self.encoding, 'backslashreplace'), num_records)
+
+    def _enqueue(self, data, num_records):
+        with self._cond:
+            if self._stopped:
+                return  # closed
+            self._pending.append(data)
+            self._num_pending_records += num_records
+            self._seq += 1
+            self._cond.notify_all()
+
+    def sync(self, timeout=None):
+        """
+        Waits until all records logged (by any thread) before this call are on disk.
+        Returns True if they are, or False on timeout.
+        Raises the error if the next commit of any of these records fails (failed commits are
+        retried, so a later call may succeed).
+        """
+        with self._cond:
+            target = self._seq
+            errors = self._counters['errors']
+            if not self._cond.wait_for(
+                    lambda: self._durable_seq >= target or self._counters['errors'] > errors,
+                    timeout):
+                return False
+            if self._durable_seq < target:
+                raise self._error
+        return True
+
+    def flush(self):
+        self.sync()
+
+    def close(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        self._thread.join()
+        # the fd is owned by the committer thread, which has exited
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+        super().close()
+
+    def stats(self):
+        """
+        Returns a dict of metrics: number of commits, records, bytes and failed commits, records
+        dropped (pending when closed, while commits were failing), records pending, batch size
+        (records per commit) and commit latency (seconds, of each write+fdatasync), average and
+        max.
+        """
+        with self._cond:
+            d = dict(self._counters)
+            d['pending'] = self._num_pending_records
+        commits = d['commits'] or 1
+        d['avg_batch'] = d['records'] / commits
+        d['avg_commit_time'] = d.pop('commit_time') / commits
+        return d
+
+    ################################################################################
+    # committer thread
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending or self._stopped)
+                if not self._pending:
+                    return  # stopped, and all committed
+            if self.commit_delay and not self._stopped:
+                time.sleep(self.commit_delay)
+            with self._cond:
+                batch = self._pending
+                num_records = self._num_pending_records
+                self._pending = []
+                self._num_pending_records = 0
+                last_seq = self._seq
+
+            t0 = time.perf_counter()
+            error = None
+            try:
+                self._commit(batch)
+            except Exception as e:
+                error = e
+            commit_time = time.perf_counter() - t0
+
+            with self._cond:
+                counters = self._counters
+                if error is not None:
+                    counters['errors'] += 1
+                    self._error = error
+                    self._cond.notify_all()
+                    if self._stopped:
+                        # closing: no more retries
+                        counters['dropped'] += num_records + self._num_pending_records
+                        self._pending = []
+                        self._num_pending_records = 0
+                        return
+                    # retried (with any records logged meanwhile), after retry_interval
+                    self._pending = batch + self._pending
+                    self._num_pending_records += num_records
+                    self._cond.wait_for(lambda: self._stopped, self.retry_interval)
+                else:
+                    self._durable_seq = last_seq
+                    self._error = None
+                    counters['commits'] += 1
+                    counters['records'] += num_records
+                    counters['bytes'] += sum(len(data) for data in batch)
+                    counters['max_batch'] = max(counters['max_batch'], num_records)
+                    counters['commit_time'] += commit_time
+                    counters['max_commit_time'] = max(counters['max_commit_time'], commit_time)
+                self._cond.notify_all()
+
+    def _commit(self, batch):
+        offset = os.lseek(self.fd, 0, os.SEEK_END)
+        try:
+            writev_all(self.fd, batch)
+            _fdatasync(self.fd)
+        except OSError:
+            # undo a partial write, so that the retried batch is not duplicated
+            try:
+                os.ftruncate(self.fd, offset)
+            except OSError:
+                pass
+            raise
+
+    def _open_file(self, filename):
+        """ Opens the file (for appending), making sure a newly-created file's entry is durable. """
+        self.baseFilename = os.path.abspath(str(filename))
+        existed = os.path.exists(self.baseFilename)
+        self.fd = os.open(self.baseFilename, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o666)
+        if not existed:
+            _fsync_dir(os.path.dirname(self.baseFilename))
+
+    def __repr__(self):
+        return '<%s %s (%s)>' % (type(self).__name__, self.baseFilename, self.level)
+
+
+class DurableDailyRotatingFileHandler(_DailyFilenameMixin, DurableFileHandler):
+    """
+    Like ``DailyRotatingFileHandler``, but durable (see ``DurableFileHandler``).
+
+    Rollover is done by the committer thread, between commits: the old file is closed only
+    after all its records were committed, and the new file's directory entry is synced before
+    the first commit to it.
+    """
+
+    def __init__(self, filename_pattern, **kwargs):
+        """
+        :param filename_pattern: a path (str or Path), with a single '*' date-placeholder
+        """
+        self.filename_pattern = _to_strftime_pattern(filename_pattern, self.DATE_FORMAT)
+        self.rolloverAt = _next_utc_midnight(time.time())
+        super().__init__(self.get_filename_for_time(self.now()), **kwargs)
+
+    def _commit(self, batch):
+        if time.time() >= self.rolloverAt:
+            self.doRollover()
+        super()._commit(batch)
+
+    def doRollover(self):
+        # NOTE: called by the committer thread.  all previous commits were synced, so the old
+        # file is already durable.  the fd is owned by the committer thread, so the handler's
+        # lock is not taken: it may be held by a thread waiting for this commit (e.g. by
+        # logging.shutdown(), which holds it while flushing).
+        old_fd = self.fd
+        self._open_file(self.get_filename_for_time(self.now()))
+        os.close(old_fd)
+        self.rolloverAt = _next_utc_midnight(time.time())
+
+
+def _fsync_dir(path):
+    try:
+        fd = os.open(path or '.', os.O_RDONLY)
+    except OSError:
+        return  # e.g. on windows, directories can't be opened
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+################################################################################
+# waiting
+
+def wait_durable(logger=None, timeout=None):
+    """
+    Waits until all records logged so far to the durable handlers of ``logger`` (root logger by
+    default), and of its ancestors it propagates to, are on disk.
+    Returns True if they are, or False on timeout.
+    """
+    if logger is None:
+        logger = logging.root
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    c = logger
+    while c:
+        for h in c.handlers:
+            if isinstance(h, DurableFileHandler):
+                remaining = max(0, deadline - time.monotonic()) if deadline is not None else None
+                if not h.sync(remaining):
+                    return False
+        c = c.parent if c.propagate else None
+    return True
+
+
+################################################################################
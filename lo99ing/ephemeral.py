@@ -0,0 +1,129 @@
+"""
+Ephemeral loggers: loggers with dynamic names (e.g. per connection), which are evicted when there
+are too many of them, to keep memory bounded in long-running processes.
+
+An evicted logger is removed from ``logging``'s logger registry and from the log-level manager.
+Its log-level override (if any) is kept, so getting it again re-creates it with the override
+restored.
+"""
+
+import logging
+import threading
+import collections
+
+from .level import log_level_manager
+from .handlers import stderr_handler
+from .misc import logging_lock
+
+
+################################################################################
+
+class EphemeralLoggers:
+    """
+    A bounded collection of loggers, evicting the least-recently-used one when full.
+
+    NOTE: ephemeral loggers should be "leaves" in the logger hierarchy, i.e. no other (regular)
+    logger should be a child of an ephemeral logger.
+    """
+
+    def __init__(self, max_loggers=1000):
+        self.max_loggers = max_loggers
+        self._loggers = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.num_created = 0
+        self.num_evictions = 0
+
+    def get_logger(self, name, level=None, propagate=True):
+        """ Same as ``lo99ing.get_logger()``, but for an ephemeral logger. """
+        from .utils import get_logger
+
+        with self._lock:
+            logger = self._loggers.get(name)
+            if logger is not None:
+                self._loggers.move_to_end(name)
+                return logger
+
+        logger = get_logger(name, level=level, propagate=propagate)
+
+        evicted = []
+        with self._lock:
+            if name not in self._loggers:
+                self._loggers[name] = logger
+                self.num_created += 1
+            while len(self._loggers) > self.max_loggers:
+                evicted.append(self._loggers.popitem(last=False)[1])
+            self.num_evictions += len(evicted)
+        for old_logger in evicted:
+            _remove_logger(old_logger)
+        return logger
+
+    def get_child(self, logger, suffix):
+        """ Returns an ephemeral child of ``logger`` (which can be a regular logger). """
+        return self.get_logger('%s.%s' % (logger.name, suffix))
+
+    def evict(self, name):
+        """ Explicitly evict a logger (e.g. when the connection it is used for is closed). """
+        with self._lock:
+            logger = self._loggers.pop(name, None)
+            if logger is None:
+                return
+            self.num_evictions += 1
+        _remove_logger(logger)
+
+    def stats(self):
+        """ Returns the number of loggers alive, created and evicted. """
+        with self._lock:
+            return dict(
+                alive=len(self._loggers),
+                created=self.num_created,
+                evictions=self.num_evictions,
+            )
+
+
+def _remove_logger(logger):
+    """
+    Removes a logger from logging's registry (along with placeholders of its parents, if only
+    used by it), from log_level_manager, and closes its handlers.
+    """
+    name = logger.name
+    manager = logger.manager
+    with logging_lock:
+        if manager.loggerDict.get(name) is not logger:
+            return
+        del manager.loggerDict[name]
+        i = name.rfind('.')
+        while i > 0:
+            parent_name = name[:i]
+            placeholder = manager.loggerDict.get(parent_name)
+            if isinstance(placeholder, logging.PlaceHolder):
+                placeholder.loggerMap.pop(logger, None)
+                if not placeholder.loggerMap:
+                    del manager.loggerDict[parent_name]
+            i = parent_name.rfind('.')
+
+    # NOTE: the override (if any) is kept, to be restored if the logger is re-created
+    with log_level_manager.lock:
+        log_level_manager.clear_initial(name)
+
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+        if handler is not stderr_handler:
+            handler.close()
+
+
+################################################################################
+# default instance
+
+ephemeral_loggers = EphemeralLoggers()
+
+
+def get_ephemeral_logger(name, level=None, propagate=True):
+    """
+    Same as ``get_logger()``, but the logger is evicted when there are too many ephemeral
+    loggers (``ephemeral_loggers.max_loggers``).
+    Use for loggers with dynamic names (e.g. per connection, or per symbol).
+    """
+    return ephemeral_loggers.get_logger(name, level=level, propagate=propagate)
+
+
+################################################################################
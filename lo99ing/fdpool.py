@@ -0,0 +1,252 @@
+"""
+A pool of shared, lazily-(re)opened files, for processes with many independent file loggers.
+
+Pooled handlers don't own an open file.  They write through a ``FilePool``, which:
+
+- shares a single stream between all handlers writing to the same path
+- keeps at most ``max_open`` files open, closing the least-recently-used one when another needs
+  to be opened (it is reopened, in append mode, on its next write)
+- keeps hit/miss/eviction counters (see ``FilePool.stats()``)
+
+Usage::
+
+    for client in clients:
+        get_file_logger(client, '/var/log/clients/%s.log' % client, pooled=True)
+
+    lo99ing.fdpool.file_pool.set_max_open(1000)
+"""
+
+import os
+import time
+import logging
+import threading
+import collections
+
+from .handlers import (
+    _GlobalFiltersMixin, _BatchHandlerMixin, _ErrorHandlerMixin, _DailyFilenameMixin,
+    _to_strftime_pattern, _next_utc_midnight)
+
+
+################################################################################
+# pool
+
+class _PooledFile:
+    """ A path in the pool: its (possibly closed) stream, and the number of handlers using it. """
+
+    def __init__(self, path, encoding, errors):
+        self.path = path
+        self.encoding = encoding
+        self.errors = errors
+        self.stream = None
+        self.refs = 0
+        self.lock = threading.Lock()
+
+
+class FilePool:
+    """
+    Shares and caps open files between pooled handlers.
+
+    Each path has its own lock, so writes to different files don't contend (other than for
+    briefly updating the LRU order).
+    """
+
+    def __init__(self, max_open=256):
+        self.max_open = max_open
+        self._files = {}  # path -> _PooledFile, for all paths in use
+        self._open = collections.OrderedDict()  # path -> _PooledFile, in LRU order
+        self._lock = threading.Lock()
+        self._counters = dict(hits=0, misses=0, evictions=0)
+
+    def set_max_open(self, max_open):
+        """ Sets the max number of open files, closing LRU files if needed. """
+        with self._lock:
+            self.max_open = max_open
+            self._evict()
+
+    def acquire(self, path, encoding=None, errors=None):
+        """
+        Registers a user (handler) of a path.  Returns the pooled file, to be passed to
+        ``write()`` and ``release()``.  The file is not opened until written to.
+        """
+        path = os.path.abspath(str(path))
+        with self._lock:
+            f = self._files.get(path)
+            if f is None:
+                f = self._files[path] = _PooledFile(path, encoding, errors)
+            elif (f.encoding, f.errors) != (encoding, errors):
+                raise ValueError(
+                    'file already in pool with a different encoding', path, f.encoding, f.errors)
+            f.refs += 1
+        return f
+
+    def release(self, f):
+        """ Unregisters a user of the file.  When its last user releases it, it is closed. """
+        with self._lock:
+            f.refs -= 1
+            if f.refs > 0:
+                return
+            del self._files[f.path]
+            self._open.pop(f.path, None)
+        with f.lock:
+            self._close(f)
+
+    def write(self, f, data):
+        """ Writes (and flushes) a str to the file, opening it if needed. """
+        with f.lock:
+            stream = f.stream
+            if stream is None:
+                stream = self._reopen(f)
+            else:
+                with self._lock:
+                    self._counters['hits'] += 1
+                    if f.path in self._open:
+                        self._open.move_to_end(f.path)
+            stream.write(data)
+            stream.flush()
+
+    def close_all(self):
+        """ Closes all open files (they are reopened on their next write). """
+        with self._lock:
+            files = list(self._open.values())
+            self._open.clear()
+        for f in files:
+            with f.lock:
+                self._close(f)
+
+    def stats(self):
+        """ Returns a dict of metrics: open files, paths in use, hits, misses and evictions. """
+        with self._lock:
+            d = dict(self._counters)
+            d['open'] = len(self._open)
+            d['paths'] = len(self._files)
+            d['max_open'] = self.max_open
+        return d
+
+    def _reopen(self, f):
+        # NOTE: must be called with f.lock held
+        stream = open(f.path, 'a', encoding=f.encoding, errors=f.errors)
+        f.stream = stream
+        with self._lock:
+            self._counters['misses'] += 1
+            self._open[f.path] = f
+            self._evict()
+        return stream
+
+    def _evict(self):
+        # NOTE: must be called with self._lock held.
+        # Skips files which are being written to (their lock is held), to avoid waiting for (and
+        # deadlocking with) their writers.  If all are busy, the pool temporarily exceeds max_open.
+        for path, f in list(self._open.items()):
+            if len(self._open) <= self.max_open:
+                break
+            if not f.lock.acquire(blocking=False):
+                continue
+            try:
+                del self._open[path]
+                self._close(f)
+                self._counters['evictions'] += 1
+            finally:
+                f.lock.release()
+
+    @staticmethod
+    def _close(f):
+        # NOTE: must be called with f.lock held
+        stream = f.stream
+        f.stream = None
+        if stream is not None:
+            stream.close()
+
+
+file_pool = FilePool()
+
+
+################################################################################
+# handlers
+
+class PooledFileHandler(
+        _GlobalFiltersMixin, _BatchHandlerMixin, _ErrorHandlerMixin, logging.Handler):
+    """
+    Like ``FileHandler``, but writing through a ``FilePool``, instead of keeping its own file
+    open.
+    """
+
+    terminator = '\n'
+
+    def __init__(self, filename, encoding=None, errors=None, pool=None, level=logging.NOTSET):
+        super().__init__(level)
+        self.pool = pool if pool is not None else file_pool
+        self.encoding = encoding
+        self.errors = errors
+        self._file = self.pool.acquire(filename, encoding, errors)
+        self.baseFilename = self._file.path
+
+    def emit(self, record):
+        try:
+            self.pool.write(self._file, self.format(record) + self.terminator)
+        except Exception:
+            self.handleError(record)
+
+    def emit_many(self, records):
+        data = self.format_many(records)
+        if not data:
+            return
+        try:
+            self.pool.write(self._file, data)
+        except Exception:
+            self.handleError(records[-1])
+
+    def close(self):
+        with self.lock:
+            if self._file is not None:
+                self.pool.release(self._file)
+                self._file = None
+        super().close()
+
+    def __repr__(self):
+        return '<%s %s (%s)>' % (type(self).__name__, self.baseFilename, self.level)
+
+
+class PooledDailyRotatingFileHandler(_DailyFilenameMixin, PooledFileHandler):
+    """
+    Like ``DailyRotatingFileHandler``, but writing through a ``FilePool``.
+
+    Rollover is coordinated through the pool: all handlers of the same pattern share the file of
+    the current date, which is closed once the last of them has moved on to the next date.
+    """
+
+    def __init__(self, filename_pattern, **kwargs):
+        """
+        :param filename_pattern: a path (str or Path), with a single '*' date-placeholder
+        """
+        self.filename_pattern = _to_strftime_pattern(filename_pattern, self.DATE_FORMAT)
+        self.rolloverAt = _next_utc_midnight(time.time())
+        super().__init__(self.get_filename_for_time(self.now()), **kwargs)
+
+    def emit(self, record):
+        try:
+            if time.time() >= self.rolloverAt:
+                self.doRollover()
+        except Exception:
+            self.handleError(record)
+            return
+        super().emit(record)
+
+    def emit_many(self, records):
+        try:
+            if time.time() >= self.rolloverAt:
+                self.doRollover()
+        except Exception:
+            self.handleError(records[0])
+            return
+        super().emit_many(records)
+
+    def doRollover(self):
+        old_file = self._file
+        self._file = self.pool.acquire(
+            self.get_filename_for_time(self.now()), self.encoding, self.errors)
+        self.baseFilename = self._file.path
+        self.pool.release(old_file)
+        self.rolloverAt = _next_utc_midnight(time.time())
+
+
+################################################################################
@@ -0,0 +1,196 @@
+"""
+Declarative filter rules, for dropping (noisy) records before they are formatted.
+
+Rules match on logger name (hierarchically, i.e. 'urllib3' matches 'urllib3.connectionpool'),
+level, call site, and message template (``record.msg``, before applying args).  Optionally, they
+can also match on the rendered message, which is only rendered if all other conditions match.
+
+All rules of a ``RuleFilter`` are compiled together: per logger name, the candidate rules are
+looked up once (using a trie of name parts) and cached, and all templates are combined into a
+single regex, used for ruling out all templated rules using a single search.  (Templates which
+can't be combined, i.e. using groups or flags, are searched separately.)
+
+NOTE: the template of a record logged using a ``prefixed()`` logger starts with the prefix, so
+``^``-anchored templates should include it (e.g. ``r'^db: Heartbeat '``, for a 'db:' prefix).
+
+Usage::
+
+    noisy = RuleFilter([
+        FilterRule(logger='urllib3', max_level='info'),
+        FilterRule(template=r'^Heartbeat '),
+        FilterRule(logger='myapp.db', site='db/pool.py:123'),
+    ])
+    add_global_filter(noisy)  # or handler.addFilter(noisy)
+"""
+
+import re
+import logging
+import threading
+
+from .level import to_level
+
+
+################################################################################
+# rules
+
+class FilterRule:
+    """
+    A rule matching records for which all given conditions hold.
+    """
+
+    def __init__(self, logger=None, min_level=None, max_level=None, site=None, template=None,
+                 text=None):
+        """
+        :param logger: a logger name, matching it and its descendants.
+        :param min_level: match records of this level or above.
+        :param max_level: match records of this level or below.
+        :param site: 'path/to/file.py' or 'path/to/file.py:LINENO', matching the end of the
+            path of the logging call.
+        :param template: a regex, searched in ``record.msg`` (before applying args, but after
+            adding the prefix of ``prefixed()`` loggers).
+        :param text: a regex, searched in the rendered message.
+        """
+        self.logger = logger or ''
+        self.min_level = to_level(min_level) if min_level is not None else None
+        self.max_level = to_level(max_level) if max_level is not None else None
+        self.site_path, self.site_lineno = _parse_site(site)
+        self.template = template
+        self.template_re = re.compile(template) if template is not None else None
+        # whether the template can be combined with others into a single regex.  groups can't
+        # (e.g. backreferences to them would be renumbered), nor can flags (e.g. '(?i)', which
+        # is only allowed at the start of the combined regex)
+        self.template_combinable = (
+            self.template_re is not None and not self.template_re.groups
+            and not self.template_re.flags & ~re.UNICODE)
+        self.text_re = re.compile(text) if text is not None else None
+        self.num_matched = 0
+
+    def _matches_base(self, record):
+        """ Checks all conditions except the template and text. """
+        levelno = record.levelno
+        if self.min_level is not None and levelno < self.min_level:
+            return False
+        if self.max_level is not None and levelno > self.max_level:
+            return False
+        if self.site_path is not None:
+            if self.site_lineno is not None and record.lineno != self.site_lineno:
+                return False
+            if not record.pathname.endswith(self.site_path):
+                return False
+        return True
+
+    def __repr__(self):
+        attrs = [
+            '%s=%r' % (k, v) for k, v in vars(self).items()
+            if v is not None and k not in ('template_re', 'template_combinable', 'num_matched')]
+        return '<%s %s>' % (type(self).__name__, ' '.join(attrs))
+
+
+def _parse_site(site):
+    if site is None:
+        return None, None
+    path, sep, lineno = site.rpartition(':')
+    if sep and lineno.isdigit():
+        return path, int(lineno)
+    return site, None
+
+
+################################################################################
+# filter
+
+class RuleFilter(logging.Filter):
+    """
+    A filter dropping records matching any of its rules.
+    Can be attached to a handler (``handler.addFilter()``), or globally
+    (``lo99ing.add_global_filter()``).
+    """
+
+    MAX_CACHED_NAMES = 10000
+
+    def __init__(self, rules):
+        super().__init__()
+        self.rules = list(rules)
+        self._trie = _build_trie(self.rules)
+        templates = [r.template_re.pattern for r in self.rules if r.template_combinable]
+        self._templates_re = re.compile(
+            '|'.join('(?:%s)' % t for t in templates)) if templates else None
+        self._candidates = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        candidates = self._candidates.get(record.name)
+        if candidates is None:
+            candidates = self._get_candidates(record.name)
+        if not candidates:
+            return True
+
+        templates_searched = False
+        any_template_matches = False
+        for rule in candidates:
+            if not rule._matches_base(record):
+                continue
+            if rule.template_re is not None:
+                msg = record.msg
+                if not isinstance(msg, str):
+                    continue
+                if rule.template_combinable:
+                    if not templates_searched:
+                        # a single search, ruling out all combined templates at once (in the
+                        # common case)
+                        any_template_matches = self._templates_re.search(msg) is not None
+                        templates_searched = True
+                    if not any_template_matches:
+                        continue
+                if not rule.template_re.search(msg):
+                    continue
+            if rule.text_re is not None and not rule.text_re.search(record.getMessage()):
+                continue
+            rule.num_matched += 1
+            return False
+        return True
+
+    def _get_candidates(self, name):
+        candidates = tuple(_lookup_trie(self._trie, name))
+        with self._lock:
+            if len(self._candidates) >= self.MAX_CACHED_NAMES:
+                self._candidates.clear()
+            self._candidates[name] = candidates
+        return candidates
+
+    def stats(self):
+        """
+        Returns a list of (rule, number of records it dropped).
+        (If attached to multiple handlers, a record dropped by each of them is counted by each.)
+        """
+        return [(rule, rule.num_matched) for rule in self.rules]
+
+
+################################################################################
+# logger-name trie
+
+def _build_trie(rules):
+    """ A trie of logger-name parts. Each node is a (children, rules) pair. """
+    root = ({}, [])
+    for rule in rules:
+        node = root
+        if rule.logger:
+            for part in rule.logger.split('.'):
+                node = node[0].setdefault(part, ({}, []))
+        node[1].append(rule)
+    return root
+
+
+def _lookup_trie(trie, name):
+    """ Yields the rules matching a logger name, i.e. of the name and of all its ancestors. """
+    node = trie
+    yield from node[1]
+    if name == 'root':
+        return
+    for part in name.split('.'):
+        node = node[0].get(part)
+        if node is None:
+            return
+        yield from node[1]
+
+
+################################################################################
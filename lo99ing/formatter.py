@@ -1,8 +1,36 @@
 """
 Defines lo99ing's global (default) formatter.
 """
+import time
 import logging
 
 
 FORMAT = '%(asctime)s:%(levelname)s:%(name)s: %(message)s'
-formatter = logging.Formatter(FORMAT)
+
+
+class Formatter(logging.Formatter):
+    """
+    A ``logging.Formatter`` which renders the timestamp (``asctime``) from the record's creation
+    time, using a cached per-second prefix, so ``strftime`` is called once per second (rather
+    than once per record).
+    """
+
+    # (second, converter, datefmt, formatted prefix).  replaced as a whole, so it's thread-safe.
+    _ts_cache = (None, None, None, None)
+
+    def formatTime(self, record, datefmt=None):
+        created = record.created
+        sec = int(created)
+        converter = self.converter
+        cache = self._ts_cache
+        if cache[0] == sec and cache[1] is converter and cache[2] == datefmt:
+            prefix = cache[3]
+        else:
+            prefix = time.strftime(datefmt or self.default_time_format, converter(created))
+            self._ts_cache = (sec, converter, datefmt, prefix)
+        if datefmt or not self.default_msec_format:
+            return prefix
+        return self.default_msec_format % (prefix, record.msecs)
+
+
+formatter = Formatter(FORMAT)
@@ -0,0 +1,217 @@
+"""
+An adaptive level governor, shedding log volume under load.
+
+The governor counts the records logged per logger.  Every ``window`` seconds, each logger
+logging more than its budget (records per second) gets its level raised one step (e.g. INFO to
+WARNING, up to ``max_level``).  Once a logger has stayed within its budget for ``hold`` seconds,
+its level is restored.
+
+Levels are raised using a floor (see ``set_log_level_floor``), applied on top of the logger's
+initial level and override, which are never changed.  So overrides set meanwhile (e.g. using
+``set_log_level_override``) are kept, and take effect once the floor is cleared.
+
+Usage::
+
+    governor = LevelGovernor(budget=500, budgets={'myapp.access': 50})
+    governor.start()
+    ...
+    governor.state()
+
+NOTE: while a logger is shed, records of the disabled levels are not created, so are not counted.
+Its rate is therefore re-checked (at its original level) once it is restored, and it is shed
+again if still over budget.
+
+NOTE: only records of ``Lo99er`` loggers are counted (i.e. not of the root logger, nor of loggers
+created before lo99ing was imported).
+"""
+
+import sys
+import time
+import logging
+import threading
+
+from .level import log_level_manager, set_log_level_floor, to_level
+from .logger import Lo99er
+
+
+GOVERNOR_LOGGER_NAME = 'lo99ing.governor'
+
+_LEVELS = (logging.DEBUG, logging.INFO, logging.WARNING, logging.ERROR, logging.CRITICAL)
+
+
+################################################################################
+
+class _Shed:
+    """ State of a logger whose level was raised by the governor. """
+
+    def __init__(self, level, rate, now):
+        self.level = level
+        self.rate = rate
+        self.since = now
+        self.last_over = now
+
+
+class LevelGovernor:
+    """
+    Raises the levels of loggers exceeding their budgets, and restores them once load subsides.
+    """
+
+    def __init__(self, budget=1000, window=1.0, hold=10.0, max_level=logging.WARNING,
+                 budgets=None, pressure=None):
+        """
+        :param budget: the default budget, in records per second per logger.
+        :param window: the interval (seconds) at which rates are measured.
+        :param hold: how long (seconds) a logger must stay within budget before it is restored.
+        :param max_level: the governor never raises levels above this.
+        :param budgets: a dict of logger-name -> budget, overriding the default budget.
+        :param pressure: an optional callable, returning a measure of pressure on the handlers,
+            where values above 1.0 mean overload (e.g. a shipping handler's queue depth, divided
+            by some high watermark, or the recent write latency, divided by an acceptable
+            latency).  Budgets are divided by the pressure, when it is above 1.0.
+        """
+        self.budget = budget
+        self.window = window
+        self.hold = hold
+        self.max_level = to_level(max_level)
+        self.budgets = dict(budgets or {})
+        self.pressure = pressure
+        self._counts = {}
+        self._rates = {}
+        self._shed = {}
+        self._last_pressure = None
+        self._window_start = time.monotonic()
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    ################################################################################
+    # start/stop
+
+    def start(self):
+        """ Starts counting records, and the thread applying the budgets. """
+        Lo99er.governor = self
+        self._window_start = time.monotonic()
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name='lo99ing-governor', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """ Stops the governor, and restores the levels of all loggers it raised. """
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if Lo99er.governor is self:
+            Lo99er.governor = None
+        with self._lock:
+            names = list(self._shed)
+            self._shed.clear()
+            for name in names:
+                set_log_level_floor(name, None)
+        self._log_changes([
+            ('restoring level of %s (governor stopped)', (name, )) for name in names])
+
+    def count(self, name, n=1):
+        """ Counts ``n`` records logged by logger ``name`` (called by ``Lo99er``). """
+        # NOTE: not atomic, so counts are approximate (when logging from multiple threads)
+        counts = self._counts
+        counts[name] = counts.get(name, 0) + n
+
+    def _run(self):
+        while not self._stopped.wait(self.window):
+            try:
+                self.tick()
+            except Exception:
+                # printed rather than logged, since logging may be what fails
+                if logging.raiseExceptions:
+                    import traceback
+                    sys.stderr.write('--- lo99ing: the level governor failed to apply budgets\n')
+                    traceback.print_exc(file=sys.stderr)
+
+    ################################################################################
+    # applying budgets
+
+    def tick(self, now=None):
+        """ Ends the current window: measures the rates, and raises/restores levels. """
+        if now is None:
+            now = time.monotonic()
+        counts, self._counts = self._counts, {}
+        elapsed = max(now - self._window_start, 1e-6)
+        self._window_start = now
+        pressure = self.pressure() if self.pressure is not None else None
+        scale = max(1.0, pressure or 0)
+
+        changes = []
+        with self._lock:
+            self._last_pressure = pressure
+            self._rates = rates = {
+                name: n / elapsed for name, n in counts.items() if name != GOVERNOR_LOGGER_NAME}
+            for name, rate in rates.items():
+                budget = self.budgets.get(name, self.budget) / scale
+                if rate <= budget:
+                    continue
+                shed = self._shed.get(name)
+                if shed is not None:
+                    shed.last_over = now
+                    shed.rate = rate
+                level = self._next_level(name)
+                if level is None:
+                    continue
+                if shed is None:
+                    shed = self._shed[name] = _Shed(level, rate, now)
+                shed.level = level
+                set_log_level_floor(name, level)
+                changes.append((
+                    'raising level of %s to %s (%.0f records/s, budget %.0f)',
+                    (name, logging.getLevelName(level), rate, budget)))
+            for name, shed in list(self._shed.items()):
+                if now - shed.last_over >= self.hold:
+                    del self._shed[name]
+                    set_log_level_floor(name, None)
+                    changes.append(('restoring level of %s', (name, )))
+
+        # logged outside the lock, since logging creates records (which we count)
+        self._log_changes(changes)
+
+    def _next_level(self, name):
+        """ Returns the level one step above the logger's current level, or None if at max. """
+        logger = logging.Logger.manager.loggerDict.get(name)
+        if not isinstance(logger, logging.Logger) or not log_level_manager.has_initial(name):
+            return None
+        cur_level = logger.getEffectiveLevel()
+        for level in _LEVELS:
+            if level > cur_level:
+                return level if level <= self.max_level else None
+        return None
+
+    def _log_changes(self, changes):
+        if not changes:
+            return
+        from .utils import get_logger
+        logger = get_logger(GOVERNOR_LOGGER_NAME)
+        for msg, args in changes:
+            logger.warning(msg, *args)
+
+    ################################################################################
+    # state
+
+    def state(self):
+        """
+        Returns a dict describing the governor's state: the loggers it shed (with their raised
+        level, rate and since when), the rates measured in the last window, and the last
+        pressure measured.
+        """
+        with self._lock:
+            return dict(
+                shed={
+                    name: dict(
+                        level=logging.getLevelName(shed.level), rate=shed.rate,
+                        since=shed.since)
+                    for name, shed in self._shed.items()
+                },
+                rates=dict(self._rates),
+                pressure=self._last_pressure,
+            )
+
+
+################################################################################
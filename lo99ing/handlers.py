@@ -3,13 +3,12 @@ Definition of logger handlers, and tools for manipulating logger handlers.
 """
 
 import logging
-import logging.handlers
+import os
 import sys
 import time
-import datetime
-import traceback
 
-from .formatter import formatter
+from .formatter import formatter, Formatter, FORMAT
+from .misc import lazy
 
 
 ################################################################################
@@ -25,7 +24,9 @@ class _ErrorHandlerMixin:
         if not logging.raiseExceptions:
             return
 
-        output_stream = getattr(self, 'stream')
+        import traceback
+
+        output_stream = getattr(self, 'stream', None)  # not all handlers have a stream
         if not output_stream:
             output_stream = sys.stderr
         try:
@@ -37,133 +38,517 @@ class _ErrorHandlerMixin:
         except (AttributeError, IOError):
             pass
 
+    def _handle_thread_error(self, msg):
+        """ Reports the current exception, raised in the handler's own thread. """
+        # the failure is not of any one logging call, so the record points at the failing code
+        caller = sys._getframe(1)
+        record = logging.makeLogRecord(dict(
+            name=type(self).__module__, msg=msg, levelno=logging.ERROR, levelname='ERROR',
+            pathname=caller.f_code.co_filename, lineno=caller.f_lineno))
+        self.handleError(record)
+
+
+class _GlobalFiltersMixin:
+    """
+    A mixin applying the global filters (see ``add_global_filter``), before the handler's own
+    filters, and before any formatting.
+    """
+
+    def filter(self, record):
+        for f in _global_filters:
+            if not f.filter(record):
+                return False
+        return super().filter(record)
+
+
+class _BatchHandlerMixin:
+    """
+    A mixin adding ``handle_many``, for handling a batch of records (see ``Lo99er.log_many``)
+    under a single lock acquisition.  Subclasses can override ``emit_many``, e.g. for writing
+    the whole batch using a single write.
+    """
+
+    def handle_many(self, records):
+        """ Same as ``handle``, for a batch of records.  Returns the records emitted. """
+        records = [record for record in records if self.filter(record)]
+        if records:
+            with self.lock:
+                self.emit_many(records)
+        return records
+
+    def emit_many(self, records):
+        for record in records:
+            self.emit(record)
 
-class StreamHandler(_ErrorHandlerMixin, logging.StreamHandler):
+    def format_many(self, records):
+        """
+        Returns the formatted records, concatenated (each followed by the terminator).
+        Records which fail to format are passed to ``handleError``, and skipped.
+        """
+        return self.format_many_counted(records)[0]
+
+    def format_many_counted(self, records):
+        """
+        Same as ``format_many``, but returns a tuple of the data and the number of records in it
+        (i.e. not skipped).
+        """
+        terminator = self.terminator
+        parts = []
+        for record in records:
+            try:
+                parts.append(self.format(record))
+            except RecursionError:
+                raise
+            except Exception:
+                self.handleError(record)
+                continue
+            parts.append(terminator)
+        return ''.join(parts), len(parts) // 2
+
+
+def prepare_deferred(record):
+    """
+    Renders the record's message, for a record to be formatted later (e.g. by another thread),
+    since the args may change (or not be thread-safe) by then.
+    Messages with ``lazy`` args are not rendered, so these are computed when formatted.
+    """
+    args = record.args
+    if args and isinstance(args, tuple) and any(isinstance(a, lazy) for a in args):
+        return
+    record.msg = record.getMessage()
+    record.args = None
+
+
+def record_to_dict(record, formatter=formatter):
+    """
+    Returns a dict representing the record (e.g. to pickle it, or to dump it as JSON), with its
+    message fully rendered, and its exception (if any) formatted by ``formatter``.
+    """
+    materialize = getattr(record, 'materialize', None)
+    if materialize is not None:
+        materialize()  # a SlimLogRecord, whose lazy fields are not in its __dict__ yet
+    msg = record.getMessage()
+    if record.exc_info and not record.exc_text:
+        record.exc_text = formatter.formatException(record.exc_info)
+    d = dict(record.__dict__)
+    d['msg'] = msg
+    d['args'] = None
+    d['exc_info'] = None
+    d.pop('message', None)
+    return d
+
+
+def handle_batch(handler, records):
+    """
+    Passes the records which pass the handler's level to it, in a single call if it has a
+    ``handle_many`` method.  Returns the records passed.
+    """
+    if handler.level:
+        records = [record for record in records if record.levelno >= handler.level]
+    if not records:
+        return records
+    handle_many = getattr(handler, 'handle_many', None)
+    if handle_many is not None:
+        handle_many(records)
+    else:
+        for record in records:
+            handler.handle(record)
+    return records
+
+
+class _UnlockedHandleMixin:
+    """
+    A mixin for handlers whose ``emit`` is thread-safe (e.g. only queues the record), so their
+    ``handle`` doesn't take the handler's lock.
+    """
+
+    def handle(self, record):
+        """ Same as ``Handler.handle``, but without taking the handler's lock. """
+        rv = self.filter(record)
+        if rv:
+            self.emit(record)
+        return rv
+
+
+class StreamHandler(
+        _GlobalFiltersMixin, _BatchHandlerMixin, _ErrorHandlerMixin, logging.StreamHandler):
     """
     Same as ``logging.StreamHandler``, but with an improved error-handler.
     """
-    pass
+
+    def emit_many(self, records):
+        _write_many(self, records)
 
 
-class FileHandler(_ErrorHandlerMixin, logging.FileHandler):
+class FileHandler(
+        _GlobalFiltersMixin, _BatchHandlerMixin, _ErrorHandlerMixin, logging.FileHandler):
     """
     Same as ``logging.FileHandler``, but with an improved error-handler.
     """
-    pass
 
+    def emit_many(self, records):
+        _write_many_to_file(self, records)
+
+
+def _write_many(handler, records):
+    """ Writes a batch of records to the stream of a StreamHandler, using a single write. """
+    data = handler.format_many(records)
+    if not data:
+        return
+    try:
+        handler.stream.write(data)
+        handler.flush()
+    except RecursionError:
+        raise
+    except Exception:
+        handler.handleError(records[-1])
 
-class DailyRotatingFileHandler(_ErrorHandlerMixin, logging.handlers.TimedRotatingFileHandler):
-    """
-    A customized daily TimedRotatingFileHandler.
 
-    The class takes a filename_pattern, which is a path containing a '*' date-placeholder,
-    which is replaced with the appropriate date, in YYYYMMDD format.
+def _write_many_to_file(handler, records):
+    """ Same as ``_write_many``, opening the file first, if opening was delayed. """
+    if handler.stream is None:
+        if handler.mode != 'w' or not getattr(handler, '_closed', False):
+            handler.stream = handler._open()
+    if handler.stream:
+        _write_many(handler, records)
 
-    This class always uses: when='MIDNIGHT', backupCount=0, utc=True, atTime=None.
-    Since utc=True, it doesn't hanlde DST changes.
 
+class _DailyFilenameMixin:
+    """
+    A mixin for handlers writing to daily files: ``filename_pattern`` is a path containing a '*'
+    date-placeholder, which is replaced with the (UTC) date, in YYYYMMDD format.
     """
 
     DATE_FORMAT = '%Y%m%d'
 
-    def __init__(self, filename_pattern, **kwargs):
-        """
-        :param filename_pattern: a path (str or Path), with a single '*' date-placeholder
-        """
-        if filename_pattern:
-            filename_pattern = str(filename_pattern)  # support Path
-        fptn = filename_pattern
-        filename_pattern = filename_pattern.replace('*', self.DATE_FORMAT)
-        if fptn == filename_pattern:
-            raise ValueError('filename_pattern must contain "*"', filename_pattern)
-        self.filename_pattern = filename_pattern
-        for k in ['when', 'utc', 'backupCount', 'atTime']:
-            if k in kwargs:
-                raise TypeError('arg not supported', k)
-        first_filename = self.get_filename_for_time(self.now())
-        logging.handlers.TimedRotatingFileHandler.__init__(
-            self, first_filename, when='MIDNIGHT', utc=True, **kwargs)
-
-        # making sure super doesn't use these, because we don't want it to.
-        self.suffix = None
-        self.extMatch = None
-
-    def doRollover(self):
-
-        # close current file
-        if self.stream:
-            self.stream.close()
-            self.stream = None
-
-        # write to a new file
-        self.baseFilename = self.get_filename_for_time(self.now())
-        self.mode = 'a'
-        self.stream = self._open()
-
-        # compute next
-        currentTime = int(time.time())
-        newRolloverAt = self.computeRollover(currentTime)
-        while newRolloverAt <= currentTime:
-            newRolloverAt = newRolloverAt + self.interval
-        self.rolloverAt = newRolloverAt
-
     def now(self):
+        import datetime
         return datetime.datetime.utcnow()
 
     def get_filename_for_time(self, dt):
         return dt.strftime(self.filename_pattern)
 
 
+def _next_utc_midnight(t):
+    return (int(t) // 86400 + 1) * 86400
+
+
+def _to_strftime_pattern(filename_pattern, date_format):
+    """ Replaces the '*' date-placeholder in filename_pattern with date_format. """
+    if filename_pattern:
+        filename_pattern = str(filename_pattern)  # support Path
+    fptn = filename_pattern
+    filename_pattern = filename_pattern.replace('*', date_format)
+    if fptn == filename_pattern:
+        raise ValueError('filename_pattern must contain "*"', filename_pattern)
+    return filename_pattern
+
+
+################################################################################
+# bytes-native handlers
+
+try:
+    _IOV_MAX = os.sysconf('SC_IOV_MAX')
+except (AttributeError, ValueError, OSError):
+    _IOV_MAX = 1024
+
+_NEWLINE = b'\n'
+_MSECS = [b',%03d:' % i for i in range(1000)]
+
+
+class BytesFdHandler(
+        _GlobalFiltersMixin, _BatchHandlerMixin, _ErrorHandlerMixin, logging.Handler):
+    """
+    Writes records to a file descriptor, bypassing the ``TextIOWrapper`` and buffered-writer
+    layers.
+
+    With lo99ing's default formatter, records are built directly as a list of bytes fragments,
+    reusing the encoded timestamp (per second), milliseconds and level+logger-name fragments.
+    Pending fragments are written using ``os.writev()``, without first joining them.
+
+    Records are written when ``buffer_records`` records are pending, when a record of level
+    ``flush_level`` or above is logged, or on ``flush()``.
+    """
+
+    def __init__(self, fd, encoding='utf-8', buffer_records=1, flush_level=logging.ERROR,
+                 level=logging.NOTSET):
+        super().__init__(level)
+        self.fd = fd
+        self.encoding = encoding
+        self.buffer_records = buffer_records
+        self.flush_level = flush_level
+        self._pending = []
+        self._num_pending = 0
+        self._ts_sec = None
+        self._ts_converter = None
+        self._ts_prefix = None
+        self._level_name_fragments = {}
+
+    def emit(self, record):
+        try:
+            self._pending.extend(self.encode(record))
+            self._num_pending += 1
+            if self._num_pending >= self.buffer_records or record.levelno >= self.flush_level:
+                self._write_pending()
+        except Exception:
+            self.handleError(record)
+
+    def emit_many(self, records):
+        write = False
+        for record in records:
+            try:
+                self._pending.extend(self.encode(record))
+            except Exception:
+                self.handleError(record)
+                continue
+            self._num_pending += 1
+            write = write or record.levelno >= self.flush_level
+        try:
+            if write or self._num_pending >= self.buffer_records:
+                self._write_pending()
+        except Exception:
+            self.handleError(records[-1])
+
+    def encode(self, record):
+        """ Returns a list of bytes fragments, whose concatenation is the formatted record. """
+        fmt = self.formatter or formatter
+        if not _is_default_format(fmt):
+            s = fmt.format(record)
+            return [s.encode(self.encoding, 'backslashreplace'), _NEWLINE]
+
+        created = record.created
+        sec = int(created)
+        if sec != self._ts_sec or fmt.converter is not self._ts_converter:
+            self._ts_sec = sec
+            self._ts_converter = fmt.converter
+            self._ts_prefix = time.strftime(
+                fmt.default_time_format, fmt.converter(created)).encode(self.encoding)
+
+        key = (record.levelname, record.name)
+        level_name = self._level_name_fragments.get(key)
+        if level_name is None:
+            level_name = self._level_name_fragments[key] = (
+                '%s:%s: ' % key).encode(self.encoding, 'backslashreplace')
+
+        msg = record.getMessage()
+        pieces = [
+            self._ts_prefix, _MSECS[int(record.msecs)], level_name,
+            msg.encode(self.encoding, 'backslashreplace'),
+        ]
+        if record.exc_info and not record.exc_text:
+            record.exc_text = fmt.formatException(record.exc_info)
+        for text in (record.exc_text, record.stack_info and fmt.formatStack(record.stack_info)):
+            if text:
+                if msg[-1:] != '\n':
+                    pieces.append(_NEWLINE)
+                pieces.append(text.encode(self.encoding, 'backslashreplace'))
+                msg = text
+        pieces.append(_NEWLINE)
+        return pieces
+
+    def flush(self):
+        with self.lock:
+            self._write_pending()
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            super().close()
+
+    def _write_pending(self):
+        # NOTE: must be called with self.lock held
+        if not self._pending:
+            return
+        pending = self._pending
+        self._pending = []
+        self._num_pending = 0
+        writev_all(self.fd, pending)
+
+
+class BytesFileHandler(BytesFdHandler):
+    """
+    A ``BytesFdHandler`` writing to a file (in append mode).
+    """
+
+    def __init__(self, filename, **kwargs):
+        self.baseFilename = os.path.abspath(str(filename))
+        fd = os.open(self.baseFilename, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o666)
+        super().__init__(fd, **kwargs)
+
+    def close(self):
+        with self.lock:
+            try:
+                super().close()
+            finally:
+                if self.fd is not None:
+                    os.close(self.fd)
+                    self.fd = None
+
+
+def _is_default_format(fmt):
+    """
+    Checks if the formatter formats exactly like lo99ing's default formatter (i.e. it is safe to
+    use the fast-path of BytesFdHandler).
+    """
+    return (
+        type(fmt) in (logging.Formatter, Formatter)
+        and fmt._fmt == FORMAT
+        and fmt.datefmt is None
+        and fmt.default_msec_format == '%s,%03d'
+        and 'formatTime' not in vars(fmt)
+    )
+
+
+def writev_all(fd, buffers):
+    """ Writes all buffers (a list of bytes) to fd, using as few syscalls as possible. """
+    if not hasattr(os, 'writev'):
+        data = memoryview(b''.join(buffers))
+        while data:
+            data = data[os.write(fd, data):]
+        return
+    while buffers:
+        chunk = buffers[:_IOV_MAX]
+        written = os.writev(fd, chunk)
+        idx = 0
+        while idx < len(chunk) and written >= len(chunk[idx]):
+            written -= len(chunk[idx])
+            idx += 1
+        buffers = buffers[idx:]
+        if written:
+            # partial write of a buffer
+            buffers[0] = memoryview(buffers[0])[written:]
+
+
 ################################################################################
 # globals
 
+_global_filters = ()
+
 stderr_handler = StreamHandler(sys.stderr)
 stderr_handler.setFormatter(formatter)
 
+_bytes_stderr_handler = None
+
+
+def _get_bytes_stderr_handler():
+    global _bytes_stderr_handler
+    if _bytes_stderr_handler is None:
+        sys.stderr.flush()
+        _bytes_stderr_handler = BytesFdHandler(sys.stderr.fileno())
+        _bytes_stderr_handler.setFormatter(formatter)
+    return _bytes_stderr_handler
+
 
 ################################################################################
 # add/remove handlers
 
-def enable_stderr(logger=None):
-    """ Adds a stderr StreamHandler to root logger (if not already there). """
+def enable_stderr(logger=None, native_bytes=False):
+    """
+    Adds a stderr StreamHandler to root logger (if not already there).
+    If native_bytes=True, adds a ``BytesFdHandler`` writing directly to stderr's fd instead.
+    """
     if logger is None:
         logger = logging.root
 
     # Don't add if it already has one
-    if any(_is_stderr_handler(h) for h in logger.handlers):
+    if any(_is_stderr_handler(h) for h in _iter_handlers(logger)):
             return
 
-    logger.addHandler(stderr_handler)
+    logger.addHandler(_get_bytes_stderr_handler() if native_bytes else stderr_handler)
 
 
 def disable_stderr(logger=None):
-    """ Removes the stderr StreamHandler from root logger (if there). """
+    """
+    Removes the stderr StreamHandler from root logger (if there), also from behind a
+    ``ShardedHandler`` or a ``StallGuardHandler``.
+    """
     if logger is None:
         logger = logging.root
 
     for h in list(logger.handlers):
         if _is_stderr_handler(h):
             logger.removeHandler(h)
+        elif _is_sharded(h):
+            h.handlers = [w for w in h.handlers if not _is_stderr_handler(w)]
 
 
 def _is_stderr_handler(handler):
+    if isinstance(handler, BytesFdHandler):
+        return handler is _bytes_stderr_handler
+    watchdog = sys.modules.get('lo99ing.watchdog')  # imported lazily
+    if watchdog is not None and isinstance(handler, watchdog.StallGuardHandler):
+        return _is_stderr_handler(handler.primary)
     return isinstance(handler, logging.StreamHandler) and handler.stream == sys.stderr
 
 
-def enable_file(filename, logger=None, file_handler=None, rotate=False, **kwargs):
+def _iter_handlers(logger):
+    """ Yields the handlers of the logger, and those wrapped by its ``ShardedHandler``s. """
+    for h in logger.handlers:
+        yield h
+        if _is_sharded(h):
+            yield from h.handlers
+
+
+def _is_sharded(handler):
+    # lo99ing.sharded is imported lazily: if it's not imported, there are no ShardedHandlers
+    sharded = sys.modules.get('lo99ing.sharded')
+    return sharded is not None and isinstance(handler, sharded.ShardedHandler)
+
+
+def enable_file(filename, logger=None, file_handler=None, rotate=False, native_bytes=False,
+                pooled=False, durable=False, **kwargs):
     """
     Adds a FileHandler to root logger, to enable logging to ``filename``.
     If rotate=True, will create a daily-rotating file handler (filename should contain '*',
     which is replaced with the date).
+    If native_bytes=True, will create a ``BytesFileHandler`` (rotation is not supported).
+    If pooled=True, will create a handler writing through the shared file pool (see
+    ``lo99ing.fdpool``), which caps the number of open files.
+    If durable=True, will create a handler committing records to disk (write+fsync) in groups,
+    which callers can wait for (see ``lo99ing.durable``).
     """
     if file_handler is None:
-        if rotate:
+        if sum([native_bytes, pooled, durable]) > 1:
+            raise ValueError('only one of native_bytes, pooled and durable is supported')
+        if durable:
+            from .durable import DurableFileHandler, DurableDailyRotatingFileHandler
+            if rotate:
+                file_handler = DurableDailyRotatingFileHandler(filename, **kwargs)
+            else:
+                file_handler = DurableFileHandler(filename, **kwargs)
+        elif pooled:
+            from .fdpool import PooledFileHandler, PooledDailyRotatingFileHandler
+            if rotate:
+                file_handler = PooledDailyRotatingFileHandler(filename, **kwargs)
+            else:
+                file_handler = PooledFileHandler(filename, **kwargs)
+        elif native_bytes:
+            if rotate:
+                raise ValueError('native_bytes does not support rotate')
+            file_handler = BytesFileHandler(filename, **kwargs)
+        elif rotate:
+            from .rotating import DailyRotatingFileHandler
             file_handler = DailyRotatingFileHandler(filename, **kwargs)
         else:
             file_handler = FileHandler(filename, **kwargs)
     return _add_logging_handler(file_handler, logger=logger)
 
 
+def add_global_filter(f):
+    """
+    Adds a filter (e.g. a ``lo99ing.filters.RuleFilter``) applied by all of lo99ing's handlers.
+    """
+    global _global_filters
+    if f not in _global_filters:
+        _global_filters = _global_filters + (f, )
+
+
+def remove_global_filter(f):
+    global _global_filters
+    _global_filters = tuple(x for x in _global_filters if x is not f)
+
+
 def _add_logging_handler(handler, logger=None):
     if logger is None:
         logger = logging.root
@@ -173,3 +558,12 @@ def _add_logging_handler(handler, logger=None):
 
 
 ################################################################################
+
+
+def __getattr__(name):
+    # DailyRotatingFileHandler is defined in a separate module, imported on first use, since it
+    # depends on logging.handlers, which is slow to import
+    if name == 'DailyRotatingFileHandler':
+        from .rotating import DailyRotatingFileHandler
+        return DailyRotatingFileHandler
+    raise AttributeError('module %r has no attribute %r' % (__name__, name))
@@ -3,7 +3,7 @@ Tools for working with log levels (and overrides).
 """
 
 import logging
-from .misc import logging_lock
+import threading
 
 
 ################################################################################
@@ -41,12 +41,37 @@ def to_level(level):
 
 class LogLevelManager:
     """
-    Keeps track of log level: for each logger, it stores initial and override levels.
+    Keeps track of log level: for each logger, it stores initial and override levels, and an
+    optional floor (a minimum level, applied on top of both, e.g. by ``LevelGovernor``).
+
+    Reads take no lock.  Writers are serialized using ``self.lock``:
+
+    - ``overrides``, ``floors`` and ``subscribers`` are copy-on-write: never mutated, only replaced.
+    - ``initials`` is only ever added to (or popped from, for evicted loggers), using single
+      dict operations, which are atomic (also on free-threaded builds).
     """
 
     def __init__(self):
         self.initials = {}
         self.overrides = {}
+        self.floors = {}
+        self.subscribers = ()
+        self.lock = threading.RLock()
+
+    def subscribe(self, callback):
+        """
+        Register a callable to be called (with no args) whenever overrides change.
+        """
+        with self.lock:
+            self.subscribers = self.subscribers + (callback, )
+
+    def unsubscribe(self, callback):
+        with self.lock:
+            self.subscribers = tuple(cb for cb in self.subscribers if cb != callback)
+
+    def notify(self):
+        for callback in self.subscribers:
+            callback()
 
     def set_initial(self, name, level):
         assert level is not None, (name, level)
@@ -58,28 +83,54 @@ class LogLevelManager:
     def has_initial(self, name):
         return name in self.initials
 
+    def clear_initial(self, name):
+        self.initials.pop(name, None)
+
     def set_override(self, name, level):
         assert level is not None, (name, level)
-        self.overrides[name] = level
+        overrides = dict(self.overrides)
+        overrides[name] = level
+        self.overrides = overrides
 
     def get_override(self, name):
         return self.overrides.get(name)
 
     def clear_override(self, name):
-        self.overrides.pop(name, None)
+        if name in self.overrides:
+            overrides = dict(self.overrides)
+            del overrides[name]
+            self.overrides = overrides
+
+    def set_floor(self, name, level):
+        assert level is not None, (name, level)
+        self.floors = {**self.floors, name: level}
+
+    def get_floor(self, name):
+        return self.floors.get(name)
+
+    def clear_floor(self, name):
+        if name in self.floors:
+            floors = dict(self.floors)
+            del floors[name]
+            self.floors = floors
 
     def get_effective(self, name):
         try:
-            return self.overrides[name]
+            level = self.overrides[name]
         except KeyError:
-            return self.initials.get(name, None)
+            level = self.initials.get(name, None)
+        floor = self.floors.get(name)
+        if floor is not None and level is not None and floor > level:
+            return floor
+        return level
 
     def get_all_overrides(self):
         return dict(self.overrides)
 
     def restore_overrides(self, overrides):
-        for name, level in overrides.items():
-            self.set_override(name, level)
+        for level in overrides.values():
+            assert level is not None, overrides
+        self.overrides = {**self.overrides, **overrides}
 
 
 log_level_manager = LogLevelManager()
@@ -87,8 +138,7 @@ log_level_manager = LogLevelManager()
 
 def get_log_level_override(name):
     """ Returns the current override for given logger, or None. """
-    with logging_lock:
-        return log_level_manager.get_override(name)
+    return log_level_manager.get_override(name)
 
 
 def set_log_level_override(name, level):
@@ -96,7 +146,7 @@ def set_log_level_override(name, level):
     Override log level of given logger.
     If ``level is None``, will reset, i.e. clear existing override.
     """
-    with logging_lock:
+    with log_level_manager.lock:
         if level is None:
             log_level_manager.clear_override(name)
         else:
@@ -108,11 +158,28 @@ def set_log_level_override(name, level):
             eff_level = log_level_manager.get_effective(name)
             set_log_level(name, eff_level)
 
+    # called outside the lock, since subscribers may block (e.g. writing to a pipe)
+    log_level_manager.notify()
+
+
+def set_log_level_floor(name, level):
+    """
+    Sets a minimum level for given logger, applied on top of its initial and override levels,
+    without changing them.
+    If ``level is None``, will clear the floor.
+    """
+    with log_level_manager.lock:
+        if level is None:
+            log_level_manager.clear_floor(name)
+        else:
+            log_level_manager.set_floor(name, to_level(level))
+        if log_level_manager.has_initial(name):
+            set_log_level(name, log_level_manager.get_effective(name))
+
 
 def get_log_level_overrides():
     """ Return all current log-level overrides, as a name->level dict. """
-    with logging_lock:
-        return log_level_manager.get_all_overrides()
+    return log_level_manager.get_all_overrides()
 
 
 def restore_log_level_overrides(overrides):
@@ -120,8 +187,9 @@ def restore_log_level_overrides(overrides):
     Set multiple log-level overrides.
     :param overrides: the value returned by ``get_all_overrides``.
     """
-    with logging_lock:
-        return log_level_manager.restore_overrides(overrides)
+    with log_level_manager.lock:
+        log_level_manager.restore_overrides(overrides)
+    log_level_manager.notify()
 
 
 ################################################################################
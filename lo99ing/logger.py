@@ -2,21 +2,39 @@
 Definition of lo99ing's custom logger class.
 """
 
+import os
 import sys
-import inspect
 import logging
+import weakref
 import lo99ing
+from collections.abc import Mapping
 
-from .level import set_log_level_override
-from .misc import oneline, get_exception_kwargs, format_exception, is_installed_module
+from .level import set_log_level_override, to_level
+from .handlers import handle_batch
+from .misc import (
+    oneline, get_exception_kwargs, format_exception, is_installed_module, bounded_arg,
+    truncate_elided)
 
 
 ################################################################################
 
 class Lo99er(logging.Logger):
 
+    # if set, methods of disabled levels are rebound to a no-op.  see use_fast_disabled_calls()
+    fast_disabled_calls = False
+
+    # if set, bounds the rendered size of each logged arg.  see set_max_arg_length()
+    max_arg_length = None
+
+    # if set, profiles logging calls.  see lo99ing.profile
+    profiler = None
+
+    # if set, counts the records logged.  see lo99ing.governor
+    governor = None
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
+        self._adapters = weakref.WeakSet()
         self._set_default_level()
 
     ################################################################################
@@ -24,14 +42,44 @@ class Lo99er(logging.Logger):
 
     def _log(self, level, msg, args, exc_info=None, extra=None):
 
-        # automatically format exceptions properly (if passed directly as arguments):
-        args = tuple([
-            format_exception(a) if isinstance(a, Exception) else a
-            for a in args
-        ])
+        profiler = self.profiler
+        sample = None
+        if profiler is not None:
+            sample = profiler.begin()
 
-        # call super:
-        super()._log(level, msg, args, exc_info=exc_info, extra=extra)
+        try:
+            if self.governor is not None:
+                self.governor.count(self.name)
+
+            msg, args = self._prepare_args(msg, args)
+
+            # call super:
+            super()._log(level, msg, args, exc_info=exc_info, extra=extra)
+        finally:
+            if sample is not None:
+                profiler.end(sample)
+
+    def _prepare_args(self, msg, args):
+        maxlen = self.max_arg_length
+        if maxlen is None:
+            # automatically format exceptions properly (if passed directly as arguments):
+            args = tuple([
+                format_exception(a) if isinstance(a, Exception) else a
+                for a in args
+            ])
+        else:
+            # same, and also avoid rendering huge args (and messages) in full:
+            if (len(args) == 1 and isinstance(args[0], Mapping) and args[0]
+                    and isinstance(msg, str) and '%(' in msg):
+                # a single mapping, for '%(key)s' formatting (see LogRecord): bound its values
+                args = ({k: bounded_arg(v, maxlen) for k, v in args[0].items()}, )
+            else:
+                args = tuple([bounded_arg(a, maxlen) for a in args])
+            if not isinstance(msg, str):
+                msg = bounded_arg(msg, maxlen)
+            elif not args:
+                msg = truncate_elided(msg, maxlen)
+        return msg, args
 
     def exception(self, msg, *args, exc_info=None, **kwargs):
 
@@ -54,6 +102,37 @@ class Lo99er(logging.Logger):
         for attr, v in exc_kwargs.items():
             self.error('\t%s.%s = %s' % (exc_obj.__class__.__name__, attr, oneline(v)))
 
+    def setLevel(self, level):
+        super().setLevel(level)
+        if self.fast_disabled_calls:
+            self.rebind_level_methods()
+
+    def findCaller(self, stack_info=False, stacklevel=1):
+        """
+        Same as ``logging.Logger.findCaller``, but also skips lo99ing's own frames (so the
+        location of the actual logging call is found).
+        """
+        f = sys._getframe(0)
+        while stacklevel > 0:
+            next_f = f.f_back
+            if next_f is None:
+                break
+            f = next_f
+            if not _is_internal_frame(f):
+                stacklevel -= 1
+        co = f.f_code
+        sinfo = None
+        if stack_info:
+            import io
+            import traceback
+            with io.StringIO() as sio:
+                sio.write('Stack (most recent call last):\n')
+                traceback.print_stack(f, file=sio)
+                sinfo = sio.getvalue()
+                if sinfo[-1] == '\n':
+                    sinfo = sinfo[:-1]
+        return co.co_filename, f.f_lineno, co.co_name, sinfo
+
     def getChild(self, suffix):
         from lo99ing import get_logger
 
@@ -61,6 +140,80 @@ class Lo99er(logging.Logger):
             suffix = '.'.join((self.name, suffix))
         return get_logger(suffix)  # using get_logger() instead of self.manager.getLogger()
 
+    ################################################################################
+    # bulk logging
+
+    def log_many(self, entries):
+        """
+        Logs many records at once.
+
+        Each level is checked once, records are created in a tight loop (all sharing the location
+        of this call), and each handler gets them as a batch: handlers supporting it (i.e.
+        lo99ing's handlers) format them all, and write them using a single write, under a single
+        lock acquisition.
+
+        :param entries: an iterable of (level, msg, args) tuples.
+        :return: the number of records logged (i.e. not dropped by level or by filters).
+        """
+        if self.disabled:
+            return 0
+
+        profiler = self.profiler
+        sample = None
+        if profiler is not None:
+            sample = profiler.begin()
+
+        try:
+            try:
+                fn, lno, func, sinfo = self.findCaller()
+            except ValueError:
+                fn, lno, func, sinfo = "(unknown file)", 0, "(unknown function)", None
+
+            levelnos = {}  # level -> levelno, or None if disabled
+            records = []
+            for level, msg, args in entries:
+                try:
+                    levelno = levelnos[level]
+                except KeyError:
+                    levelno = to_level(level)
+                    if not self.isEnabledFor(levelno):
+                        levelno = None
+                    levelnos[level] = levelno
+                if levelno is None:
+                    continue
+                msg, args = self._prepare_args(msg, args)
+                record = self.makeRecord(
+                    self.name, levelno, fn, lno, msg, args, None, func, None, sinfo)
+                if not self.filters or self.filter(record):
+                    records.append(record)
+            if self.governor is not None:
+                self.governor.count(self.name, len(records))
+            if records:
+                self.callHandlersMany(records)
+            return len(records)
+        finally:
+            if sample is not None:
+                profiler.end(sample)
+
+    def callHandlersMany(self, records):
+        """
+        Same as ``callHandlers``, for a batch of records.  Handlers having a ``handle_many``
+        method get the batch in a single call.
+        """
+        c = self
+        found = 0
+        while c:
+            for hdlr in c.handlers:
+                found = found + 1
+                handle_batch(hdlr, records)
+            if not c.propagate:
+                c = None    # break out
+            else:
+                c = c.parent
+        if found == 0:
+            for record in records:
+                self.callHandlers(record)  # lastResort, or a no-handlers warning
+
     ################################################################################
     # log level
 
@@ -72,12 +225,10 @@ class Lo99er(logging.Logger):
         logging_packages = [logging.__package__, lo99ing.__package__]
         try:
             # find caller frame, i.e. deepest frame which is not in logging/lo99ing
-            frame = None
-            for f in inspect.stack():
-                if f.frame.f_globals.get('__package__') not in logging_packages:
-                    frame = f
-                    break
-            if is_installed_module(frame.filename):
+            frame = sys._getframe(1)
+            while frame.f_globals.get('__package__') in logging_packages:
+                frame = frame.f_back
+            if is_installed_module(frame.f_code.co_filename):
                 # module belonging an installed package. default is warning
                 level = logging.WARNING
             else:
@@ -95,6 +246,27 @@ class Lo99er(logging.Logger):
         """
         return set_log_level_override(self.name, level)
 
+    def rebind_level_methods(self):
+        """
+        Binds the logging methods (``debug``, ``info``, etc.) of levels below the level of this
+        logger (and of its adapters) to a no-op, and restores the rest.
+        If ``fast_disabled_calls`` is not set, restores all of them.
+        Loggers whose level is NOTSET keep all methods: their effective level is their
+        ancestor's, which can change without them being rebound.
+        """
+        level = self.level if self.fast_disabled_calls else logging.NOTSET
+        for obj in [self, *self._adapters]:
+            for name, method_level in _LEVEL_METHODS:
+                if method_level < level:
+                    obj.__dict__[name] = _noop
+                else:
+                    obj.__dict__.pop(name, None)
+
+    def _register_adapter(self, adapter):
+        self._adapters.add(adapter)
+        if self.fast_disabled_calls:
+            self.rebind_level_methods()
+
     ################################################################################
     # utilities
 
@@ -137,6 +309,51 @@ class Lo99er(logging.Logger):
         return '<%s %r [%s]>' % (
             type(self).__name__, self.name, logging.getLevelName(self.level))
 
+################################################################################
+# caller
+
+_LO99ING_DIR = os.path.dirname(os.path.abspath(__file__)) + os.sep
+
+
+def _is_internal_frame(frame):
+    """ Checks if a frame belongs to logging or lo99ing (or importlib's bootstrap). """
+    filename = frame.f_code.co_filename
+    try:
+        return _internal_filenames[filename]
+    except KeyError:
+        pass
+    normalized = os.path.normcase(filename)
+    is_internal = _internal_filenames[filename] = (
+        normalized == logging._srcfile
+        or normalized.startswith(_LO99ING_DIR)
+        or ('importlib' in normalized and '_bootstrap' in normalized)
+    )
+    return is_internal
+
+
+_internal_filenames = {}  # cache of _is_internal_frame, by filename
+
+
+################################################################################
+# fast disabled calls
+
+_LEVEL_METHODS = (
+    ('debug', logging.DEBUG),
+    ('info', logging.INFO),
+    ('warning', logging.WARNING),
+    ('warn', logging.WARNING),
+    ('error', logging.ERROR),
+    ('exception', logging.ERROR),
+    ('critical', logging.CRITICAL),
+    ('fatal', logging.CRITICAL),
+)
+
+
+def _noop(*args, **kwargs):
+    """ Replaces the logging methods of disabled levels. """
+    pass
+
+
 ################################################################################
 # prefixed
 
@@ -145,6 +362,11 @@ class _PrefixedAdapter(logging.LoggerAdapter):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.extra['prefix'] = '%s ' % (self.prefix, )
+        base_logger = self.logger
+        while isinstance(base_logger, logging.LoggerAdapter):
+            base_logger = base_logger.logger
+        if isinstance(base_logger, Lo99er):
+            base_logger._register_adapter(self)
 
     @property
     def prefix(self):
@@ -176,6 +398,11 @@ class _PrefixedAdapter(logging.LoggerAdapter):
     def set_log_level_override(self, *args, **kwargs):
         return self.logger.set_log_level_override(*args, **kwargs)
 
+    def log_many(self, entries):
+        prefix = self.prefix
+        return self.logger.log_many(
+            (level, prefix + msg, args) for level, msg, args in entries)
+
     def TRACE(self, *args, **kwargs):
         return self.logger._TRACE(*args, **kwargs)
 
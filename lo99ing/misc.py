@@ -3,7 +3,11 @@ Misc functions used in this package.
 """
 
 import logging
-from pathlib import Path
+import numbers
+import reprlib
+import threading
+import collections
+import os
 
 
 ################################################################################
@@ -39,6 +43,230 @@ def oneline(s, **kwargs):
     return join_lines(truncate(s, **kwargs))
 
 
+################################################################################
+# bounded rendering
+
+ELIDED_FORMAT = '... [%d chars elided]'
+
+
+def truncate_elided(s, maxlen):
+    """
+    Like ``truncate``, but the suffix tells how much was elided.
+
+    >>> truncate_elided('1234567890', 4)
+    '1234... [6 chars elided]'
+    """
+    if len(s) > maxlen:
+        return s[:maxlen] + ELIDED_FORMAT % (len(s) - maxlen)
+    return s
+
+
+class _Rendered(str):
+    """ An already-rendered arg, which renders the same using both ``%s`` and ``%r``. """
+    __slots__ = ()
+
+    def __repr__(self):
+        return str.__str__(self)
+
+
+class _BoundedArg:
+    """
+    Wraps an arbitrary object, and truncates its str()/repr() when rendered.
+    (The object itself is fully rendered first, so this only bounds the output size.)
+    """
+
+    __slots__ = ('obj', 'maxlen')
+
+    def __init__(self, obj, maxlen):
+        self.obj = obj
+        self.maxlen = maxlen
+
+    def __str__(self):
+        return truncate_elided(str(self.obj), self.maxlen)
+
+    def __repr__(self):
+        return truncate_elided(repr(self.obj), self.maxlen)
+
+
+_CONTAINER_TYPES = (
+    list, tuple, dict, set, frozenset, collections.deque, bytes, bytearray)
+_bounded_reprs = {}
+
+
+def _get_bounded_repr(maxlen):
+    try:
+        return _bounded_reprs[maxlen]
+    except KeyError:
+        pass
+    r = reprlib.Repr()
+    r.maxlevel = 2
+    r.maxstring = r.maxother = r.maxlong = maxlen
+    r.maxlist = r.maxtuple = r.maxdict = r.maxset = r.maxfrozenset = r.maxdeque = \
+        r.maxarray = min(max(maxlen // 10, 6), 100)
+    _bounded_reprs[maxlen] = r
+    return r
+
+
+def bounded_repr(x, maxlen):
+    """
+    repr() of a container, which doesn't render more than (roughly) ``maxlen`` chars of it.
+
+    >>> bounded_repr(list(range(1000)), 30)
+    '[0, 1, 2, 3, 4, 5, ...] [1000 items]'
+    """
+    r = _get_bounded_repr(maxlen)
+    if isinstance(x, (bytes, bytearray)):
+        if len(x) <= maxlen:
+            return repr(x)
+        return repr(x[:maxlen]) + ELIDED_FORMAT % (len(x) - maxlen)
+    s = r.repr(x)
+    if len(s) > maxlen:
+        # not cutting through a '...' of reprlib (which would end up as e.g. '5, . ...')
+        s = s[:maxlen].rstrip('., ') + ' ...'
+    if len(x) > r.maxlist or s.endswith('...'):
+        s = '%s [%d %s]' % (s, len(x), 'item' if len(x) == 1 else 'items')
+    return s
+
+
+def _is_number_like(x):
+    cls = type(x)
+    if hasattr(cls, '__len__'):
+        return False  # e.g. a numpy array, which converts to a number only if it has 1 item
+    return hasattr(cls, '__index__') or hasattr(cls, '__int__') or hasattr(cls, '__float__')
+
+
+def bounded_arg(x, maxlen):
+    """
+    Returns an object which renders like ``x`` when used as a logging argument, but whose
+    rendered size is bounded by (roughly) ``maxlen``.
+    Numbers (and number-like objects, e.g. having ``__index__``) are returned as-is, for ``%d``
+    etc. to work.
+    """
+    if isinstance(x, Exception):
+        return format_exception(x, maxlen=maxlen)
+    if isinstance(x, lazy):
+        return x.bounded(maxlen)
+    if isinstance(x, str):
+        return truncate_elided(x, maxlen)
+    if x is None or isinstance(x, numbers.Number) or _is_number_like(x):
+        return x
+    if isinstance(x, _CONTAINER_TYPES):
+        return _Rendered(bounded_repr(x, maxlen))
+    return _BoundedArg(x, maxlen)
+
+
+################################################################################
+# lazy args
+
+class lazy:
+    """
+    A logging argument whose value is computed only when the message is rendered, and at most
+    once (even if rendered by multiple handlers).  For disabled levels, it is never computed::
+
+        logger.debug('state: %s', lazy(summarize, state))
+
+    The computed value is rendered like a regular argument (e.g. exceptions are formatted,
+    and its size is bounded if ``set_max_arg_length`` is used).
+    """
+
+    __slots__ = ('func', 'args', 'kwargs', 'maxlen', '_rendered')
+
+    def __init__(self, func, *args, **kwargs):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.maxlen = None
+        self._rendered = _NOT_RENDERED
+
+    def rendered(self):
+        """ Returns the rendered value, computing it on first call. """
+        rendered = self._rendered
+        if rendered is _NOT_RENDERED or type(rendered) is _Rendering:
+            rendered = self._render_once()
+        return rendered
+
+    def _render_once(self):
+        # the lock is held only for claiming the computation, not while computing (which runs
+        # arbitrary code).  other threads rendering this arg meanwhile wait for the result.
+        with _lazy_lock:
+            rendering = self._rendered
+            if rendering is _NOT_RENDERED:
+                rendering = self._rendered = _Rendering()
+                claimed = True
+            elif type(rendering) is _Rendering:
+                claimed = False
+            else:
+                return rendering  # computed meanwhile
+        if claimed:
+            try:
+                rendered = self._rendered = self._render()
+            except BaseException:
+                self._rendered = _NOT_RENDERED
+                raise
+            finally:
+                rendering.done.set()
+            return rendered
+        if rendering.thread == threading.get_ident():
+            # rendered by its own computation (e.g. the computation logs it)
+            return '(lazy arg rendered while computed)'
+        rendering.done.wait()
+        return self.rendered()
+
+    def _render(self):
+        try:
+            value = self.func(*self.args, **self.kwargs)
+        except Exception as e:
+            # rendered (rather than raised), so it is not computed again by other handlers
+            return '(error computing lazy arg: %s)' % format_exception(e, maxlen=self.maxlen)
+        if self.maxlen is not None:
+            return bounded_arg(value, self.maxlen)
+        if isinstance(value, Exception):
+            return format_exception(value)
+        return value
+
+    def bounded(self, maxlen):
+        """ Returns a copy, whose rendered size is bounded by ``maxlen`` (see ``bounded_arg``). """
+        copy = lazy(self.func, *self.args, **self.kwargs)
+        copy.maxlen = maxlen
+        return copy
+
+    def __str__(self):
+        return str(self.rendered())
+
+    def __repr__(self):
+        return repr(self.rendered())
+
+    def __format__(self, format_spec):
+        return format(self.rendered(), format_spec)
+
+    # for %d, %x, %f etc.
+    def __index__(self):
+        return self.rendered().__index__()
+
+    def __int__(self):
+        return int(self.rendered())
+
+    def __float__(self):
+        return float(self.rendered())
+
+
+_NOT_RENDERED = object()
+
+
+class _Rendering:
+    """ Marks a lazy arg as being computed by ``thread``.  ``done`` is set once it's computed. """
+
+    __slots__ = ('thread', 'done')
+
+    def __init__(self):
+        self.thread = threading.get_ident()
+        self.done = threading.Event()
+
+
+# the lock guarding claiming the computation of lazy args (so each is computed at most once)
+_lazy_lock = threading.Lock()
+
+
 ################################################################################
 # exception related
 
@@ -51,10 +279,25 @@ def get_exception_kwargs(e):
     return kwargs
 
 
-def format_exception(e):
-    """ Returns a string which includes both exception-type and its str() """
+def format_exception(e, maxlen=None):
+    """
+    Returns a string which includes both exception-type and its str()
+    If ``maxlen`` is set, exception's str() is bounded (and if it is based on the exception's
+    args, as is the default, they are not fully rendered).
+    """
     try:
-        exception_str = str(e)
+        if maxlen is None:
+            exception_str = str(e)
+        elif type(e).__str__ is BaseException.__str__:
+            args = e.args
+            if not args:
+                exception_str = ''
+            elif len(args) == 1:
+                exception_str = str(bounded_arg(args[0], maxlen))
+            else:
+                exception_str = bounded_repr(args, maxlen)
+        else:
+            exception_str = truncate_elided(str(e), maxlen)
     except Exception:
         try:
             exception_str = repr(e)
@@ -72,8 +315,8 @@ def is_installed_module(module_filename):
     to user's env (e.g. local development tree).
     """
     return any(
-        p.name in ['site-packages', 'dist-packages']
-        for p in Path(module_filename).parents
+        name in ['site-packages', 'dist-packages']
+        for name in os.path.dirname(module_filename).split(os.sep)
     )
 
 
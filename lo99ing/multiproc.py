@@ -0,0 +1,303 @@
+"""
+Central log aggregation for multiprocessing workers.
+
+Worker processes ship (batches of) records over a ``multiprocessing`` pipe to the parent process,
+which owns the actual handlers (files, stderr, etc.).
+
+Usage::
+
+    # parent:
+    listener = ProcessLogListener()
+    listener.start()
+    conn = listener.new_connection()
+    proc = multiprocessing.Process(target=worker, args=(conn, ))
+    proc.start()
+    ...
+    listener.stop()
+
+    # worker:
+    def worker(conn):
+        enable_process_sink(conn)
+        ...
+
+Log-level overrides set in the parent are pushed to the workers, which filter locally, so records
+which would be dropped anyway are never shipped.
+"""
+
+import os
+import logging
+import threading
+import weakref
+import multiprocessing
+import multiprocessing.connection
+import multiprocessing.util
+
+from .handlers import _GlobalFiltersMixin, _ErrorHandlerMixin, record_to_dict
+from .formatter import formatter as _formatter
+from .level import log_level_manager, set_log_level_override, get_log_level_overrides
+
+
+MSG_RECORDS = 'records'
+MSG_LEVELS = 'levels'
+
+
+################################################################################
+# worker side
+
+class ProcessSinkHandler(_GlobalFiltersMixin, _ErrorHandlerMixin, logging.Handler):
+    """
+    A handler which ships records to a ``ProcessLogListener`` in the parent process.
+
+    Records are rendered (message and exception text) in the worker, and sent in batches, either
+    when ``batch_size`` records are pending, or every ``flush_interval`` seconds.
+    """
+
+    def __init__(self, conn, batch_size=100, flush_interval=0.1, level=logging.NOTSET):
+        """
+        :param conn: a connection returned by ``ProcessLogListener.new_connection()``
+        """
+        super().__init__(level)
+        self.conn = conn
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._pushed_levels = {}
+        self._reset()
+        _sinks.add(self)
+        # multiprocessing workers exit using os._exit(), skipping atexit, but finalizers do run:
+        multiprocessing.util.Finalize(self, self.flush, exitpriority=100)
+
+    def _reset(self):
+        """ (Re)create all per-process state. Called on init, and in a child after fork. """
+        self.createLock()
+        self._buffer = []
+        self._pid = os.getpid()
+        self._thread = None
+        self._stopped = threading.Event()
+
+    def emit(self, record):
+        try:
+            if self._pid != os.getpid():
+                # forked, and os.register_at_fork is not available
+                self._reset()
+            if self._thread is None:
+                self._start_thread()
+            self._buffer.append(self.prepare(record))
+            if len(self._buffer) >= self.batch_size:
+                self._send_buffer()
+        except Exception:
+            self.handleError(record)
+
+    def prepare(self, record):
+        """ Returns a picklable dict representing the record (see ``record_to_dict``). """
+        return record_to_dict(record, self.formatter or _formatter)
+
+    def flush(self):
+        if self._pid != os.getpid():
+            return
+        with self.lock:
+            try:
+                self._send_buffer()
+            except (OSError, EOFError):
+                # parent is gone, nowhere to send to
+                pass
+
+    def close(self):
+        self.flush()
+        self._stopped.set()
+        _sinks.discard(self)
+        super().close()
+
+    def _send_buffer(self):
+        # NOTE: must be called with self.lock held
+        if not self._buffer:
+            return
+        batch = self._buffer
+        self._buffer = []
+        self.conn.send((MSG_RECORDS, batch))
+
+    def _start_thread(self):
+        self._thread = threading.Thread(
+            target=self._run, name='lo99ing-process-sink', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        """ Periodically flush pending records, and apply level overrides pushed by the parent. """
+        while not self._stopped.is_set():
+            try:
+                self.receive_levels(self.flush_interval)
+                with self.lock:
+                    self._send_buffer()
+            except (OSError, EOFError):
+                break
+
+    def receive_levels(self, timeout=0):
+        """ Apply all level-override messages pending on the connection. """
+        while self.conn.poll(timeout):
+            kind, payload = self.conn.recv()
+            if kind == MSG_LEVELS:
+                self._apply_levels(payload)
+            timeout = 0
+
+    def _apply_levels(self, overrides):
+        for name in self._pushed_levels.keys() - overrides.keys():
+            set_log_level_override(name, None)
+        for name, level in overrides.items():
+            set_log_level_override(name, level)
+        self._pushed_levels = overrides
+
+
+_sinks = weakref.WeakSet()
+
+
+def _after_fork_in_child():
+    for sink in list(_sinks):
+        sink._reset()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+def enable_process_sink(conn, logger=None, **kwargs):
+    """
+    Replaces the handlers of ``logger`` (root logger by default) with a ``ProcessSinkHandler``,
+    which ships records to the parent process.  Call this at the start of the worker process.
+    """
+    if logger is None:
+        logger = logging.root
+    sink = ProcessSinkHandler(conn, **kwargs)
+    # apply the levels the parent pushed when creating the connection, before logging anything:
+    sink.receive_levels()
+    # and keep receiving level updates, even before anything is logged (so the parent's pushes
+    # don't fill the pipe):
+    sink._start_thread()
+    for h in list(logger.handlers):
+        logger.removeHandler(h)
+    logger.addHandler(sink)
+    return sink
+
+
+################################################################################
+# parent side
+
+class ProcessLogListener:
+    """
+    Receives records shipped by ``ProcessSinkHandler``s in worker processes, and dispatches them
+    to the handlers of the parent process.
+    """
+
+    def __init__(self, poll_interval=0.1, push_levels=True):
+        self.poll_interval = poll_interval
+        self.push_levels = push_levels
+        self._conns = []
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._thread = None
+        self._pusher = None
+        self._stopped = threading.Event()
+        self._levels_changed = threading.Event()
+
+    def new_connection(self):
+        """
+        Returns a new connection, to be passed to a worker process (and then to
+        ``enable_process_sink``).
+
+        NOTE: the parent should close its copy of the returned connection after the worker has
+        started, so the listener can detect when the worker exits.
+        """
+        parent_conn, child_conn = multiprocessing.Pipe()
+        if self.push_levels:
+            # a new pipe, so this doesn't block.  sent before the connection is listed, so the
+            # pusher thread (the only other sender) doesn't send to it concurrently.
+            parent_conn.send((MSG_LEVELS, get_log_level_overrides()))
+        with self._lock:
+            self._conns.append(parent_conn)
+        return child_conn
+
+    def start(self):
+        if self.push_levels:
+            log_level_manager.subscribe(self._on_levels_changed)
+            self._pusher = threading.Thread(
+                target=self._push_levels, name='lo99ing-level-pusher', daemon=True)
+            self._pusher.start()
+        self._thread = threading.Thread(
+            target=self._run, name='lo99ing-process-listener', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """ Stops the listener thread, after handling all records already received. """
+        log_level_manager.unsubscribe(self._on_levels_changed)
+        self._stopped.set()
+        self._levels_changed.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._pusher is not None:
+            # may be blocked sending to a worker which doesn't read its pipe.  it's a daemon.
+            self._pusher.join(self.poll_interval)
+            self._pusher = None
+        for conn in self._get_conns():
+            self._receive(conn, timeout=0)
+
+    def _get_conns(self):
+        with self._lock:
+            return list(self._conns)
+
+    def _remove(self, conn):
+        with self._lock:
+            if conn in self._conns:
+                self._conns.remove(conn)
+        conn.close()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            conns = self._get_conns()
+            if not conns:
+                self._stopped.wait(self.poll_interval)
+                continue
+            for conn in multiprocessing.connection.wait(conns, self.poll_interval):
+                self._receive(conn)
+
+    def _receive(self, conn, timeout=None):
+        try:
+            while timeout is None or conn.poll(timeout):
+                kind, payload = conn.recv()
+                if kind == MSG_RECORDS:
+                    self.handle_records(payload)
+                if timeout is None:
+                    break
+        except (EOFError, OSError):
+            self._remove(conn)
+
+    def handle_records(self, batch):
+        """ Dispatches a batch of records (dicts) received from a worker. """
+        from .utils import get_logger
+        for d in batch:
+            record = logging.makeLogRecord(d)
+            get_logger(record.name).handle(record)
+
+    def _on_levels_changed(self):
+        # NOTE: called by set_log_level_override(), so must not block: the pusher thread sends
+        # the levels.  changes made while it is sending are coalesced into a single push.
+        if os.getpid() != self._pid:
+            # a copy of the listener in a forked child
+            return
+        self._levels_changed.set()
+
+    def _push_levels(self):
+        while True:
+            self._levels_changed.wait()
+            if self._stopped.is_set():
+                return
+            self._levels_changed.clear()
+            overrides = get_log_level_overrides()
+            for conn in self._get_conns():
+                try:
+                    conn.send((MSG_LEVELS, overrides))
+                except (OSError, EOFError):
+                    # the worker exited.  not removed here: the listener thread removes it once
+                    # it has received the records still pending on it.
+                    pass
+
+
+################################################################################
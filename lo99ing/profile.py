@@ -0,0 +1,279 @@
+"""
+A profiler of logging costs, attributing them to individual logging call sites.
+
+For each call site (file, line, function), it measures the wall and CPU time spent in logging
+calls, split into formatting, exception rendering, and the rest (mostly I/O), and the number of
+chars formatted.
+
+Usage (API)::
+
+    profiler = LoggingProfiler()
+    profiler.enable()
+    ...
+    profiler.disable()
+    print(profiler.report())
+
+Usage (CLI)::
+
+    python -m lo99ing.profile [-s SORT] [-n LIMIT] [-e SAMPLE_EVERY] script.py [args...]
+"""
+
+import os
+import sys
+import time
+import runpy
+import logging
+import argparse
+import threading
+
+from . import logger as _logger_module
+from . import misc as _misc_module
+from .logger import Lo99er
+
+
+COLUMNS = ('calls', 'wall', 'cpu', 'format', 'exception', 'other', 'chars')
+
+
+################################################################################
+# samples and stats
+
+class _Sample:
+    """ Timing of a single (sampled) logging call. """
+
+    __slots__ = ('site', 'wall0', 'cpu0', 'format', 'exception', 'chars')
+
+    def __init__(self, site):
+        self.site = site
+        self.format = 0.
+        self.exception = 0.
+        self.chars = 0
+        self.wall0 = time.perf_counter()
+        self.cpu0 = time.thread_time()
+
+
+class SiteStats:
+    """ Accumulated costs of a single call site. """
+
+    __slots__ = COLUMNS
+
+    def __init__(self):
+        for k in COLUMNS:
+            setattr(self, k, 0)
+
+    def as_dict(self):
+        return {k: getattr(self, k) for k in COLUMNS}
+
+
+################################################################################
+# profiler
+
+class LoggingProfiler:
+    """
+    Profiles logging calls made through ``Lo99er``s.
+
+    Only one in every ``sample_every`` logging calls is measured (and attributed to its call
+    site), to reduce the profiler's own overhead.
+    """
+
+    def __init__(self, sample_every=1):
+        self.sample_every = sample_every
+        self._counter = 0
+        self._sites = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._originals = None
+
+    ################################################################################
+    # enable/disable
+
+    def enable(self):
+        if self._originals is not None:
+            return
+        self._originals = dict(
+            format=logging.Formatter.format,
+            formatException=logging.Formatter.formatException,
+            logger_format_exception=_logger_module.format_exception,
+            misc_format_exception=_misc_module.format_exception,
+            get_exception_kwargs=_logger_module.get_exception_kwargs,
+        )
+        logging.Formatter.format = self._wrap_format(logging.Formatter.format)
+        logging.Formatter.formatException = self._wrap_exception(
+            logging.Formatter.formatException)
+        _logger_module.format_exception = self._wrap_exception(_logger_module.format_exception)
+        _misc_module.format_exception = self._wrap_exception(_misc_module.format_exception)
+        _logger_module.get_exception_kwargs = self._wrap_exception(
+            _logger_module.get_exception_kwargs)
+        Lo99er.profiler = self
+
+    def disable(self):
+        if self._originals is None:
+            return
+        Lo99er.profiler = None
+        orig = self._originals
+        logging.Formatter.format = orig['format']
+        logging.Formatter.formatException = orig['formatException']
+        _logger_module.format_exception = orig['logger_format_exception']
+        _misc_module.format_exception = orig['misc_format_exception']
+        _logger_module.get_exception_kwargs = orig['get_exception_kwargs']
+        self._originals = None
+
+    def __enter__(self):
+        self.enable()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.disable()
+
+    ################################################################################
+    # measuring (called from Lo99er._log, and from the wrappers)
+
+    def begin(self):
+        """ Returns a new sample if this call should be sampled, else None. """
+        self._counter += 1
+        if self._counter % self.sample_every:
+            return None
+        sample = _Sample(_find_call_site())
+        self._stack().append(sample)
+        return sample
+
+    def end(self, sample):
+        wall = time.perf_counter() - sample.wall0
+        cpu = time.thread_time() - sample.cpu0
+        stack = self._stack()
+        if stack and stack[-1] is sample:
+            stack.pop()
+        with self._lock:
+            st = self._sites.get(sample.site)
+            if st is None:
+                st = self._sites[sample.site] = SiteStats()
+            st.calls += 1
+            st.wall += wall
+            st.cpu += cpu
+            st.format += sample.format
+            st.exception += sample.exception
+            st.other += max(0., wall - sample.format - sample.exception)
+            st.chars += sample.chars
+
+    def _stack(self):
+        try:
+            return self._local.stack
+        except AttributeError:
+            stack = self._local.stack = []
+            return stack
+
+    def _current(self):
+        stack = self._stack()
+        return stack[-1] if stack else None
+
+    def _wrap_format(self, func):
+        def format(formatter, record):
+            sample = self._current()
+            if sample is None:
+                return func(formatter, record)
+            exception0 = sample.exception
+            t0 = time.perf_counter()
+            try:
+                s = func(formatter, record)
+            finally:
+                t = time.perf_counter() - t0
+                sample.format += t - (sample.exception - exception0)
+            sample.chars += len(s) + 1  # +1 for the terminator
+            return s
+        return format
+
+    def _wrap_exception(self, func):
+        def wrapper(*args, **kwargs):
+            sample = self._current()
+            standalone = sample is None
+            if standalone:
+                # e.g. get_exception_kwargs(), called by Lo99er.exception() outside _log()
+                if Lo99er.profiler is not self:
+                    return func(*args, **kwargs)
+                sample = self.begin()
+                if sample is None:
+                    return func(*args, **kwargs)
+            t0 = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                sample.exception += time.perf_counter() - t0
+                if standalone:
+                    self.end(sample)
+        return wrapper
+
+    ################################################################################
+    # results
+
+    def reset(self):
+        with self._lock:
+            self._sites.clear()
+
+    def stats(self, sort='wall'):
+        """
+        Returns a list of dicts, one per call site, sorted by ``sort`` (descending).
+        Times are in seconds.
+        """
+        with self._lock:
+            items = [dict(site=site, **st.as_dict()) for site, st in self._sites.items()]
+        items.sort(key=lambda d: d[sort], reverse=True)
+        return items
+
+    def report(self, sort='wall', limit=30):
+        """ Returns the stats as a table (str), sorted by ``sort``. """
+        items = self.stats(sort=sort)
+        total = {k: sum(d[k] for d in items) for k in COLUMNS}
+        lines = [
+            'logging profile: %d calls sampled (1 in %d), %.3fs wall, %.3fs cpu, %d chars' % (
+                total['calls'], self.sample_every, total['wall'], total['cpu'], total['chars']),
+            '%8s %10s %10s %10s %10s %10s %10s  %s' % (COLUMNS + ('call site', )),
+        ]
+        for d in items[:limit]:
+            lines.append('%8d %10.6f %10.6f %10.6f %10.6f %10.6f %10d  %s' % (
+                tuple(d[k] for k in COLUMNS) + (d['site'], )))
+        return '\n'.join(lines)
+
+
+_INTERNAL_DIRS = tuple(
+    os.path.dirname(os.path.abspath(m.__file__)) + os.sep
+    for m in (logging, _logger_module)
+)
+
+
+def _find_call_site():
+    """ Returns 'file:line (function)' of the deepest frame not in logging or lo99ing. """
+    f = sys._getframe(2)
+    while f is not None:
+        code = f.f_code
+        if not code.co_filename.startswith(_INTERNAL_DIRS):
+            return '%s:%d (%s)' % (code.co_filename, f.f_lineno, code.co_name)
+        f = f.f_back
+    return '(unknown)'
+
+
+################################################################################
+# CLI
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m lo99ing.profile',
+        description='Run a python script, and report the costs of its logging calls.')
+    parser.add_argument('-s', '--sort', default='wall', choices=COLUMNS)
+    parser.add_argument('-n', '--limit', type=int, default=30)
+    parser.add_argument('-e', '--sample-every', type=int, default=1)
+    parser.add_argument('script')
+    parser.add_argument('args', nargs=argparse.REMAINDER)
+    args = parser.parse_args(argv)
+
+    sys.argv = [args.script] + args.args
+    sys.path.insert(0, os.path.dirname(os.path.abspath(args.script)))
+    profiler = LoggingProfiler(sample_every=args.sample_every)
+    profiler.enable()
+    try:
+        runpy.run_path(args.script, run_name='__main__')
+    finally:
+        profiler.disable()
+        print(profiler.report(sort=args.sort, limit=args.limit), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,350 @@
+"""
+A slim ``LogRecord``, which computes only the fields which are actually used.
+
+``logging.LogRecord`` eagerly computes all of its fields, e.g. ``filename`` and ``module`` (from
+the path), ``threadName`` and ``processName``, though most formats (e.g. lo99ing's default
+format) use none of them.
+
+``SlimLogRecord`` computes only the fields which the formatters of the installed handlers use.
+The rest are computed lazily, when accessed as attributes (e.g. by filters, or by
+``_ErrorHandlerMixin``).  If any installed handler or formatter is not known to only access
+fields this way, or using its format string (e.g. a handler copying ``record.__dict__``), all
+fields are computed.
+
+The installed handlers and formatters are re-inspected whenever handlers are created, whenever
+a formatter is set (using ``setFormatter``), and every ``INSPECT_EVERY`` records.
+
+Enable using ``lo99ing.use_slim_records()``.
+
+This module also implements lo99ing's record clock (see ``lo99ing.use_clock()``): when a clock
+is set, records are stamped with the clock's time when created.
+"""
+
+import os
+import re
+import sys
+import time
+import logging
+import datetime
+import threading
+import collections.abc
+
+from .formatter import Formatter
+
+
+################################################################################
+# lazy fields
+
+def _filename(record):
+    try:
+        return os.path.basename(record.pathname)
+    except (TypeError, ValueError, AttributeError):
+        return record.pathname
+
+
+def _module(record):
+    try:
+        return os.path.splitext(os.path.basename(record.pathname))[0]
+    except (TypeError, ValueError, AttributeError):
+        return 'Unknown module'
+
+
+def _thread_name(record):
+    ident = record.thread
+    if ident is None:
+        return None
+    # computed from the creating thread's ident, since a record may be formatted by another
+    # thread (e.g. by a background writer)
+    thread = threading._active.get(ident)
+    if thread is None:
+        return 'Thread-%s' % (ident, )  # the thread has exited
+    return thread.name
+
+
+def _process_name(record):
+    if not logging.logMultiprocessing:
+        return None
+    mp = sys.modules.get('multiprocessing')
+    if mp is not None:
+        try:
+            return mp.current_process().name
+        except Exception:
+            pass
+    return 'MainProcess'
+
+
+LAZY_FIELDS = {
+    'filename': _filename,
+    'module': _module,
+    'threadName': _thread_name,
+    'processName': _process_name,
+}
+
+
+################################################################################
+# record
+
+class SlimLogRecord(logging.LogRecord):
+    """
+    A ``LogRecord`` whose ``filename``, ``module``, ``threadName`` and ``processName`` fields
+    are computed only if used.
+
+    ``__init__`` sets the fields itself, and does not call ``LogRecord.__init__`` (which would
+    compute all of them).  Subclasses should extend it by calling ``SlimLogRecord.__init__``,
+    and not rely on ``LogRecord.__init__`` being called.  For adding fields to all records, it's
+    simpler to wrap the record factory (after ``use_slim_records()``).
+    """
+
+    def __init__(self, name, level, pathname, lineno, msg, args, exc_info, func=None, sinfo=None,
+                 **kwargs):
+        ns = time.time_ns()
+        ct = ns / 1e9
+        if (args and len(args) == 1 and isinstance(args[0], collections.abc.Mapping)
+                and args[0]):
+            args = args[0]
+        self.name = name
+        self.msg = msg
+        self.args = args
+        self.levelname = logging.getLevelName(level)
+        self.levelno = level
+        self.pathname = pathname
+        self.exc_info = exc_info
+        self.exc_text = None
+        self.stack_info = sinfo
+        self.lineno = lineno
+        self.funcName = func
+        self.created = ct
+        self.created_ns = ns
+        self.msecs = (ns % 1000000000) // 1000000 + 0.0
+        self.relativeCreated = (ct - _start_time) * 1000
+        self.thread = threading.get_ident() if logging.logThreads else None
+        self.process = os.getpid() if logging.logProcesses else None
+        if _HAS_TASK_NAME:
+            self.taskName = _task_name()
+        for field in _get_eager_fields():
+            setattr(self, field, LAZY_FIELDS[field](self))
+        if _clock is not None:
+            apply_clock(self)
+
+    def __getattr__(self, name):
+        # called only for attributes not found, i.e. lazy fields not computed yet
+        func = LAZY_FIELDS.get(name)
+        if func is None:
+            raise AttributeError(name)
+        value = func(self)
+        setattr(self, name, value)
+        return value
+
+    def materialize(self):
+        """ Computes all lazy fields (e.g. before the record is sent to another process). """
+        for field in LAZY_FIELDS:
+            getattr(self, field)
+        return self
+
+    def __reduce_ex__(self, protocol):
+        # copied/pickled records (e.g. by QueueHandler) get all fields
+        self.materialize()
+        return super().__reduce_ex__(protocol)
+
+
+_start_time = logging._startTime
+
+_HAS_TASK_NAME = hasattr(logging, 'logAsyncioTasks')  # python 3.12+
+
+
+def _task_name():
+    if not logging.logAsyncioTasks:
+        return None
+    asyncio = sys.modules.get('asyncio')
+    if asyncio is None:
+        return None
+    try:
+        return asyncio.current_task().get_name()
+    except Exception:
+        return None
+
+
+################################################################################
+# inspecting installed handlers and formatters
+
+_FIELD_PATTERNS = {
+    logging.PercentStyle: re.compile(r'%\((\w+)\)'),
+    logging.StrFormatStyle: re.compile(r'\{(\w+)'),
+    logging.StringTemplateStyle: re.compile(r'\$\{?(\w+)'),
+}
+
+INSPECT_EVERY = 1024
+
+_eager_fields = ()
+_inspect_key = None
+_counter = 0
+_formatters_version = 0  # incremented by setFormatter (see install())
+
+
+def _get_eager_fields():
+    global _counter, _eager_fields, _inspect_key
+    _counter += 1
+    key = (len(logging._handlerList), _formatters_version)
+    if key != _inspect_key or _counter >= INSPECT_EVERY:
+        _counter = 0
+        _inspect_key = key
+        _eager_fields = tuple(sorted(get_used_fields() & LAZY_FIELDS.keys()))
+    return _eager_fields
+
+
+def get_used_fields():
+    """
+    Returns the set of record fields used by the formatters of all installed handlers.
+    If any of them may use any field, returns all lazy fields.
+    """
+    fields = set()
+    for ref in list(logging._handlerList):
+        handler = ref()
+        if handler is None:
+            continue
+        handler_fields = _get_handler_fields(handler)
+        if handler_fields is None:
+            return set(LAZY_FIELDS)
+        fields |= handler_fields
+    return fields
+
+
+def _get_handler_fields(handler):
+    from .handlers import _GlobalFiltersMixin
+
+    if not isinstance(handler, (_GlobalFiltersMixin, logging.StreamHandler, logging.NullHandler)):
+        # e.g. SocketHandler, which copies record.__dict__
+        return None
+    formatter = handler.formatter or logging._defaultFormatter
+    if type(formatter) not in (logging.Formatter, Formatter):
+        return None
+    pattern = _FIELD_PATTERNS.get(type(formatter._style))
+    if pattern is None:
+        return None
+    return set(pattern.findall(formatter._style._fmt))
+
+
+################################################################################
+# clock
+
+_clock = None
+_clock_formatter = None
+
+_EPOCH = datetime.datetime(1970, 1, 1)
+_EPOCH_UTC = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+_MICROSECOND = datetime.timedelta(microseconds=1)
+
+
+def set_clock(clock, formatter=None):
+    """
+    Sets (or clears, if None) the clock records are stamped with (see ``lo99ing.use_clock``).
+    Naive datetimes returned by the clock are taken to be in ``formatter``'s timezone (UTC if its
+    converter is ``time.gmtime``, else local time), so that formatter displays them as is.
+    Naive local times are ambiguous around DST changes (see ``lo99ing.use_clock``).
+    """
+    global _clock, _clock_formatter
+    _clock = clock
+    _clock_formatter = formatter
+    _set_factory()
+
+
+def apply_clock(record):
+    """
+    Stamps the record with the clock's time: sets ``created_ns`` (nanoseconds since the epoch),
+    ``created`` and ``msecs``.  If the clock returns None, the record keeps its creation time.
+    """
+    ns = _clock_ns()
+    if ns is None:
+        return
+    record.created_ns = ns
+    record.created = ns / 1e9
+    record.msecs = (ns % 1000000000) // 1000000 + 0.0
+
+
+def clock_time():
+    """
+    Returns the time (seconds since the epoch) records created now are stamped with, i.e. the
+    clock's time if a clock is set (and it returns a time), else the real time.
+    """
+    ns = _clock_ns() if _clock is not None else None
+    return time.time() if ns is None else ns / 1e9
+
+
+def _clock_ns():
+    """ Returns the clock's time, in nanoseconds since the epoch (or None). """
+    now = _clock()
+    if now is None:
+        return None
+    if isinstance(now, datetime.datetime):
+        if now.tzinfo is not None:
+            return (now - _EPOCH_UTC) // _MICROSECOND * 1000
+        if _clock_formatter is not None and _clock_formatter.converter is time.gmtime:
+            return (now - _EPOCH) // _MICROSECOND * 1000
+        # local time: unlike mktime(), timestamp() honors ``fold`` (for times repeated by DST)
+        return int(now.replace(microsecond=0).timestamp()) * 1000000000 + now.microsecond * 1000
+    return round(now * 1e6) * 1000  # seconds since the epoch (float precision is ~1us)
+
+
+################################################################################
+# install
+
+_slim = False
+
+_orig_set_formatter = logging.Handler.setFormatter
+
+
+def _set_formatter(self, fmt):
+    global _formatters_version
+    _orig_set_formatter(self, fmt)
+    _formatters_version += 1
+
+
+def install(enabled=True):
+    """
+    Installs ``SlimLogRecord`` as the record factory (or uninstalls it, if ``enabled=False``).
+    """
+    global _slim
+    _slim = enabled
+    logging.Handler.setFormatter = _set_formatter if enabled else _orig_set_formatter
+    _set_factory()
+
+
+def make_record(*args, **kwargs):
+    """
+    lo99ing's record factory, installed when slim records or a clock are used.  It wraps the
+    factory which was installed before it: records are created by that factory, and stamped
+    with the clock's time.  Slim records are created only if that factory is the default one
+    (``logging.LogRecord``), since another factory may create records of its own class.
+    """
+    base = _base_factory
+    if _slim and base is logging.LogRecord:
+        return SlimLogRecord(*args, **kwargs)  # applies the clock itself
+    record = base(*args, **kwargs)
+    if _clock is not None:
+        apply_clock(record)
+    return record
+
+
+# the factory make_record wraps.  None if make_record is not installed
+_base_factory = None
+
+
+def _set_factory():
+    """
+    Installs ``make_record`` (if slim records or a clock are used, and it's not installed yet),
+    or uninstalls it (if neither is used).  Factories installed by others are kept: if a factory
+    was installed on top of ``make_record`` (wrapping it), ``make_record`` is not uninstalled,
+    and keeps passing records of the factory it wraps through, as is.
+    """
+    global _base_factory
+    current = logging.getLogRecordFactory()
+    if _slim or _clock is not None:
+        if _base_factory is None:
+            _base_factory = current
+            logging.setLogRecordFactory(make_record)
+    elif _base_factory is not None and current is make_record:
+        logging.setLogRecordFactory(_base_factory)
+        _base_factory = None
+
+
+################################################################################
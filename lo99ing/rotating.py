@@ -0,0 +1,77 @@
+"""
+A daily-rotating file handler.
+(Kept separate from ``lo99ing.handlers``, since ``logging.handlers`` is slow to import.)
+"""
+
+import time
+import logging
+import logging.handlers
+
+from .handlers import (
+    _GlobalFiltersMixin, _BatchHandlerMixin, _ErrorHandlerMixin, _DailyFilenameMixin,
+    _to_strftime_pattern, _write_many_to_file)
+
+
+################################################################################
+
+class DailyRotatingFileHandler(
+        _GlobalFiltersMixin, _BatchHandlerMixin, _ErrorHandlerMixin, _DailyFilenameMixin,
+        logging.handlers.TimedRotatingFileHandler):
+    """
+    A customized daily TimedRotatingFileHandler.
+
+    The class takes a filename_pattern, which is a path containing a '*' date-placeholder,
+    which is replaced with the appropriate date, in YYYYMMDD format.
+
+    This class always uses: when='MIDNIGHT', backupCount=0, utc=True, atTime=None.
+    Since utc=True, it doesn't hanlde DST changes.
+
+    """
+
+    def __init__(self, filename_pattern, **kwargs):
+        """
+        :param filename_pattern: a path (str or Path), with a single '*' date-placeholder
+        """
+        self.filename_pattern = _to_strftime_pattern(filename_pattern, self.DATE_FORMAT)
+        for k in ['when', 'utc', 'backupCount', 'atTime']:
+            if k in kwargs:
+                raise TypeError('arg not supported', k)
+        first_filename = self.get_filename_for_time(self.now())
+        logging.handlers.TimedRotatingFileHandler.__init__(
+            self, first_filename, when='MIDNIGHT', utc=True, **kwargs)
+
+        # making sure super doesn't use these, because we don't want it to.
+        self.suffix = None
+        self.extMatch = None
+
+    def doRollover(self):
+
+        # close current file
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+
+        # write to a new file
+        self.baseFilename = self.get_filename_for_time(self.now())
+        self.mode = 'a'
+        self.stream = self._open()
+
+        # compute next
+        currentTime = int(time.time())
+        newRolloverAt = self.computeRollover(currentTime)
+        while newRolloverAt <= currentTime:
+            newRolloverAt = newRolloverAt + self.interval
+        self.rolloverAt = newRolloverAt
+
+    def emit_many(self, records):
+        # records of a batch are all created at (nearly) the same time, so checked once
+        try:
+            if self.shouldRollover(records[0]):
+                self.doRollover()
+        except Exception:
+            self.handleError(records[0])
+            return
+        _write_many_to_file(self, records)
+
+
+################################################################################
@@ -0,0 +1,234 @@
+"""
+Sharded output, for processes with many threads logging to the same handlers.
+
+With a regular handler, each logging thread takes the handler's lock, and formats and writes its
+record while holding it, so threads queue up behind each other's formatting and I/O.
+
+A ``ShardedHandler`` only renders the record's message (unless it has ``lazy`` args), and
+appends the record to a buffer of the calling thread (a "shard"), without taking any lock.  A
+single writer thread periodically drains all shards, merges their records in timestamp order, and
+passes them (in batches) to the actual handlers (e.g. file and stderr handlers).
+
+Records are merged within a bounded reordering window: a record is written once it is at least
+``window`` seconds old, so records logged concurrently by different threads are written in order
+of creation.  A record reaching the writer later than that (e.g. logged by a thread which was
+descheduled for longer than ``window``) is written as soon as possible, out of order, and is
+counted (see ``ShardedHandler.stats()``).  Ages are measured by the clock records are stamped
+with (see ``lo99ing.use_clock``), so with a clock which doesn't advance, records are written
+only by ``flush()``/``close()``.
+
+Shards of threads which exited are drained, and then discarded, by the writer.  On process exit
+(and on ``flush()``/``close()``), all shards are drained and written.
+
+Usage::
+
+    lo99ing.enable_file('/var/log/app.log')
+    lo99ing.enable_sharded()  # moves root logger's handlers behind a ShardedHandler
+"""
+
+import atexit
+import logging
+import threading
+import collections
+
+from .handlers import (
+    _GlobalFiltersMixin, _ErrorHandlerMixin, _UnlockedHandleMixin, prepare_deferred, handle_batch)
+from .record import clock_time
+
+
+################################################################################
+# handler
+
+class _Shard:
+    """ The buffer of records logged by a thread. """
+
+    def __init__(self, thread):
+        self.thread = thread
+        self.records = collections.deque()
+
+
+class ShardedHandler(
+        _GlobalFiltersMixin, _ErrorHandlerMixin, _UnlockedHandleMixin, logging.Handler):
+    """
+    Buffers records per thread, and writes them to ``handlers`` from a single writer thread,
+    merged in timestamp order.
+
+    The handlers should not be attached to loggers themselves (see ``enable_sharded``).  They are
+    flushed, but not closed, by ``close()``.
+    """
+
+    def __init__(self, handlers, window=0.05, flush_interval=0.01, level=logging.NOTSET):
+        """
+        :param handlers: the handlers to write the records to.
+        :param window: the reordering window, in seconds.  Records are written once they are
+            this old.  Larger windows tolerate longer scheduling delays, at the cost of latency
+            and of memory (the records logged during the window are kept).
+        :param flush_interval: the interval (seconds) at which the writer drains the shards.
+        """
+        super().__init__(level)
+        self.handlers = list(handlers)
+        self.window = window
+        self.flush_interval = flush_interval
+
+        self._local = threading.local()
+        self._shards = []  # copy-on-write
+        self._shards_lock = threading.Lock()
+        self._pending = []  # drained records, not yet written.  accessed under _drain_lock
+        self._drain_lock = threading.Lock()
+        self._last_written = 0.0  # the creation time of the newest record written
+        self._counters = dict(records=0, batches=0, late=0)
+        self._stopped = threading.Event()
+
+        self._thread = threading.Thread(target=self._run, name='lo99ing-sharded', daemon=True)
+        self._thread.start()
+        # runs before logging's own atexit hook (which flushes and closes the handlers):
+        atexit.register(self.close)
+
+    ################################################################################
+    # logging threads
+
+    def emit(self, record):
+        try:
+            shard = self._local.shard
+        except AttributeError:
+            shard = self._add_shard()
+        try:
+            self.prepare(record)
+        except Exception:
+            self.handleError(record)
+            return
+        shard.records.append(record)
+
+    def prepare(self, record):
+        """
+        Renders the record's message in the logging thread (see ``prepare_deferred``).
+        Messages with ``lazy`` args are not rendered, so these are computed by the writer thread.
+        """
+        prepare_deferred(record)
+
+    def _add_shard(self):
+        shard = self._local.shard = _Shard(threading.current_thread())
+        with self._shards_lock:
+            self._shards = self._shards + [shard]
+        return shard
+
+    ################################################################################
+    # writer thread
+
+    def _run(self):
+        while not self._stopped.wait(self.flush_interval):
+            try:
+                # the records' creation times are of the records' clock, so compared with it
+                self._drain(clock_time() - self.window)
+            except Exception:
+                self._handle_thread_error('writing sharded records failed')
+
+    def _drain(self, cutoff=None):
+        """
+        Moves the records of all shards to the pending records, and writes (in timestamp order)
+        those created before ``cutoff`` (or all, if None).
+        """
+        with self._drain_lock:
+            pending = self._pending
+            dead = []
+            for shard in self._shards:
+                # checking is_alive() before draining: a thread which is not alive won't append
+                is_alive = shard.thread.is_alive()
+                records = shard.records
+                for _ in range(len(records)):
+                    pending.append(records.popleft())
+                if not is_alive:
+                    dead.append(shard)
+            if dead:
+                with self._shards_lock:
+                    self._shards = [shard for shard in self._shards if shard not in dead]
+            if not pending:
+                return
+
+            pending.sort(key=_get_created)  # stable, so each thread's records keep their order
+            if cutoff is None:
+                batch, self._pending = pending, []
+            else:
+                i = 0
+                while i < len(pending) and pending[i].created <= cutoff:
+                    i += 1
+                if i == 0:
+                    return
+                batch, self._pending = pending[:i], pending[i:]
+
+            late = 0
+            while late < len(batch) and batch[late].created < self._last_written:
+                late += 1
+            self._last_written = max(self._last_written, batch[-1].created)
+            counters = self._counters
+            counters['records'] += len(batch)
+            counters['batches'] += 1
+            counters['late'] += late
+            self._write(batch)
+
+    def _write(self, batch):
+        for handler in self.handlers:
+            handle_batch(handler, batch)
+
+    ################################################################################
+    # flush/close
+
+    def flush(self):
+        """ Writes all records logged so far (including those within the window). """
+        self._drain()
+        for handler in self.handlers:
+            handler.flush()
+
+    def close(self):
+        atexit.unregister(self.close)
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+            self.flush()
+        super().close()
+
+    def stats(self):
+        """
+        Returns a dict of metrics: number of records and batches written, records written out
+        of order (which reached the writer after the window), and number of shards (threads).
+        """
+        with self._drain_lock:
+            d = dict(self._counters)
+            d['pending'] = len(self._pending)
+        d['shards'] = len(self._shards)
+        return d
+
+
+def _get_created(record):
+    return record.created
+
+
+################################################################################
+# enabling
+
+def enable_sharded(logger=None, **kwargs):
+    """
+    Moves the handlers of ``logger`` (root logger by default) behind a ``ShardedHandler``.
+    Call this after adding the handlers (e.g. using ``enable_file()``).
+    Returns the ``ShardedHandler``.
+    """
+    if logger is None:
+        logger = logging.root
+    sharded = None
+    handlers = []
+    for h in list(logger.handlers):
+        if isinstance(h, ShardedHandler):
+            sharded = h
+        else:
+            logger.removeHandler(h)
+            handlers.append(h)
+    if sharded is None:
+        sharded = ShardedHandler(handlers, **kwargs)
+        logger.addHandler(sharded)
+    else:
+        sharded.handlers = sharded.handlers + handlers
+    return sharded
+
+
+################################################################################
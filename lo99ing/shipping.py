@@ -0,0 +1,355 @@
+"""
+A handler for shipping log records to a (local) collector, over TCP or a Unix socket.
+
+Records are formatted by the handler, queued, and sent by a background thread in batches.  Each
+batch is a length-prefixed frame::
+
+    <batch-length:uint32> <record-count:uint32> ( <record-length:uint32> <utf8-record> )*
+
+(all integers are big-endian).  ``iter_batches()`` reads this format, and is useful for
+implementing collectors.
+
+The connection is persistent.  When the collector is down, the handler reconnects with an
+exponential backoff, and meanwhile spools batches to a bounded local file (if ``spool_path`` is
+given), which is replayed once the collector is back.
+"""
+
+import os
+import time
+import shutil
+import select
+import socket
+import struct
+import logging
+import threading
+import collections
+
+from .handlers import _GlobalFiltersMixin, _ErrorHandlerMixin, _add_logging_handler
+
+
+_BATCH_HEADER = struct.Struct('>II')
+_RECORD_HEADER = struct.Struct('>I')
+
+
+################################################################################
+# framing
+
+def encode_batch(records):
+    """ Returns a frame (bytes) containing the given records (a list of bytes). """
+    body = b''.join([_RECORD_HEADER.pack(len(r)) + r for r in records])
+    return _BATCH_HEADER.pack(len(body), len(records)) + body
+
+
+def iter_batches(stream):
+    """
+    Reads frames from a binary file-like object, and yields batches (lists of str).
+    Stops when the stream is exhausted.
+    """
+    while True:
+        header = _read_exactly(stream, _BATCH_HEADER.size)
+        if header is None:
+            return
+        length, count = _BATCH_HEADER.unpack(header)
+        body = _read_exactly(stream, length)
+        if body is None:
+            return
+        records = []
+        offset = 0
+        for _ in range(count):
+            n, = _RECORD_HEADER.unpack_from(body, offset)
+            offset += _RECORD_HEADER.size
+            records.append(body[offset:offset + n].decode('utf-8'))
+            offset += n
+        yield records
+
+
+def _read_exactly(stream, n):
+    data = stream.read(n)
+    if len(data) < n:
+        return None
+    return data
+
+
+################################################################################
+# handler
+
+class ShippingHandler(_GlobalFiltersMixin, _ErrorHandlerMixin, logging.Handler):
+    """
+    Ships formatted records to a collector, in batches, from a background thread.
+
+    Logging never blocks on the network: if the queue is full (``max_queue`` records), new
+    records are dropped (and counted).
+    """
+
+    def __init__(self, address, max_queue=10000, batch_size=500, flush_interval=0.1,
+                 spool_path=None, max_spool_bytes=64 * 1024 * 1024, timeout=1.0,
+                 min_backoff=0.1, max_backoff=30.0, level=logging.NOTSET):
+        """
+        :param address: a (host, port) tuple for TCP, or a path (str) of a Unix socket
+        :param spool_path: a file to spool batches to while the collector is unreachable.
+            If None, these batches are dropped.
+        """
+        super().__init__(level)
+        self.address = address
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.spool_path = str(spool_path) if spool_path else None
+        self.max_spool_bytes = max_spool_bytes
+        self.timeout = timeout
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+
+        self._queue = collections.deque()
+        self._cond = threading.Condition(threading.Lock())
+        self._stopped = False
+        self._sock = None
+        self._backoff = min_backoff
+        self._next_connect_time = 0
+        self._spooled_records = 0
+        self._counters = dict(
+            sent=0, sent_batches=0, sent_bytes=0, dropped=0, reconnects=0,
+            connect_failures=0)
+        if self.spool_path and os.path.exists(self.spool_path):
+            # leftovers from a previous run, to be replayed
+            self._spooled_records = _count_records(self.spool_path)
+
+        self._thread = threading.Thread(target=self._run, name='lo99ing-shipper', daemon=True)
+        self._thread.start()
+
+    ################################################################################
+    # caller side
+
+    def emit(self, record):
+        try:
+            data = self.format(record).encode('utf-8')
+        except Exception:
+            self.handleError(record)
+            return
+        with self._cond:
+            if len(self._queue) >= self.max_queue:
+                self._counters['dropped'] += 1
+                return
+            self._queue.append(data)
+            if len(self._queue) >= self.batch_size:
+                self._cond.notify()
+
+    def flush(self, timeout=5.0):
+        """ Waits (up to ``timeout`` seconds) for all queued records to be sent (or spooled). """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            self._cond.notify()
+            while self._queue or self._sending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(min(remaining, self.flush_interval))
+
+    def close(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        self._thread.join(self.timeout + 5.0)
+        self._disconnect()
+        super().close()
+
+    def stats(self):
+        """ Returns a dict of metrics: queue size, records sent/dropped/spooled, etc. """
+        with self._cond:
+            d = dict(self._counters)
+            d['queued'] = len(self._queue)
+        d['spooled'] = self._spooled_records
+        d['connected'] = self._sock is not None
+        return d
+
+    ################################################################################
+    # sender thread
+
+    _sending = False
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._queue and not self._stopped:
+                    self._cond.wait(self.flush_interval)
+                batch = [
+                    self._queue.popleft()
+                    for _ in range(min(self.batch_size, len(self._queue)))
+                ]
+                stopped = self._stopped
+                self._sending = bool(batch)
+            try:
+                if batch:
+                    self._ship(encode_batch(batch), len(batch))
+                elif self._spooled_records:
+                    # retry replaying the spool, even if nothing new is logged
+                    self._connect()
+            except Exception:
+                self._drop(len(batch))
+                self._handle_thread_error('shipping %s records failed' % len(batch))
+            finally:
+                with self._cond:
+                    self._sending = False
+                    self._cond.notify_all()
+            if stopped and not batch:
+                break
+
+    def _ship(self, frame, num_records):
+        if self._connect():
+            try:
+                self._send(frame, num_records)
+                return
+            except OSError:
+                self._disconnect()
+                self._schedule_reconnect()
+        self._spool(frame, num_records)
+
+    def _send(self, frame, num_records):
+        self._sock.sendall(frame)
+        with self._cond:
+            self._counters['sent'] += num_records
+            self._counters['sent_batches'] += 1
+            self._counters['sent_bytes'] += len(frame)
+
+    def _connect(self):
+        """ Returns True if connected (reconnecting and replaying the spool, if needed). """
+        if self._sock is not None:
+            if not self._is_peer_closed():
+                return True
+            self._disconnect()
+        if time.monotonic() < self._next_connect_time:
+            return False
+        try:
+            if isinstance(self.address, str):
+                sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                sock.settimeout(self.timeout)
+                sock.connect(self.address)
+            else:
+                sock = socket.create_connection(self.address, self.timeout)
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        except OSError:
+            with self._cond:
+                self._counters['connect_failures'] += 1
+            self._schedule_reconnect()
+            return False
+        self._sock = sock
+        self._backoff = self.min_backoff
+        with self._cond:
+            self._counters['reconnects'] += 1
+        try:
+            self._replay_spool()
+        except OSError:
+            self._disconnect()
+            self._schedule_reconnect()
+            return False
+        return True
+
+    def _is_peer_closed(self):
+        # a closed connection is readable, and reads EOF.  (the collector is not expected to
+        # send anything.)
+        try:
+            readable, _, _ = select.select([self._sock], [], [], 0)
+            return bool(readable) and not self._sock.recv(1, socket.MSG_PEEK)
+        except (OSError, ValueError):
+            return True
+
+    def _disconnect(self):
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+            self._sock = None
+
+    def _schedule_reconnect(self):
+        self._next_connect_time = time.monotonic() + self._backoff
+        self._backoff = min(self._backoff * 2, self.max_backoff)
+
+    ################################################################################
+    # spool
+
+    def _spool(self, frame, num_records):
+        if not self.spool_path:
+            self._drop(num_records)
+            return
+        try:
+            spool_size = os.path.getsize(self.spool_path)
+        except OSError:
+            spool_size = 0
+        if spool_size + len(frame) > self.max_spool_bytes:
+            self._drop(num_records)
+            return
+        try:
+            with open(self.spool_path, 'ab') as f:
+                offset = f.tell()
+                try:
+                    f.write(frame)
+                    f.flush()
+                except OSError:
+                    # don't leave a partial frame behind
+                    f.truncate(offset)
+                    raise
+        except OSError:
+            self._drop(num_records)
+            self._handle_thread_error('spooling %s records failed' % num_records)
+            return
+        self._spooled_records += num_records
+
+    def _replay_spool(self):
+        if not self._spooled_records or not self.spool_path:
+            return
+        offset = 0  # of the first frame not sent yet
+        try:
+            with open(self.spool_path, 'rb') as f:
+                while True:
+                    header = f.read(_BATCH_HEADER.size)
+                    if len(header) < _BATCH_HEADER.size:
+                        break
+                    length, count = _BATCH_HEADER.unpack(header)
+                    body = f.read(length)
+                    if len(body) < length:
+                        break
+                    self._send(header + body, count)
+                    offset = f.tell()
+                    self._spooled_records = max(self._spooled_records - count, 0)
+        except FileNotFoundError:
+            # removed by someone else
+            self._spooled_records = 0
+            return
+        except OSError:
+            if offset:
+                # so the frames already sent are not sent again
+                self._remove_spool_head(offset)
+            raise
+        os.remove(self.spool_path)
+        self._spooled_records = 0
+
+    def _remove_spool_head(self, offset):
+        """ Removes the first ``offset`` bytes of the spool. """
+        tmp_path = self.spool_path + '.tmp'
+        with open(self.spool_path, 'rb') as src, open(tmp_path, 'wb') as dst:
+            src.seek(offset)
+            shutil.copyfileobj(src, dst)
+        os.replace(tmp_path, self.spool_path)
+
+    def _drop(self, num_records):
+        with self._cond:
+            self._counters['dropped'] += num_records
+
+
+def enable_shipping(address, logger=None, **kwargs):
+    """
+    Adds a ``ShippingHandler`` to root logger, to ship records to a collector listening on
+    ``address``.  Returns the handler (e.g. for calling its ``stats()`` method).
+    """
+    handler = ShippingHandler(address, **kwargs)
+    _add_logging_handler(handler, logger=logger)
+    return handler
+
+
+def _count_records(path):
+    with open(path, 'rb') as f:
+        return sum(len(batch) for batch in iter_batches(f))
+
+
+################################################################################
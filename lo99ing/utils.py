@@ -4,10 +4,7 @@ Utilities to make lo99ing friendly.
 
 import logging
 import os
-import types
 import time
-import datetime
-from pathlib import Path
 
 from .logger import Lo99er
 from .handlers import enable_stderr, disable_stderr, enable_file
@@ -30,10 +27,16 @@ def get_logger(name, level=None, propagate=True):
     if level is not None:
         level = to_level(level)
 
+    # fast path: an already-initialized logger (takes no locks)
+    if log_level_manager.has_initial(name):
+        logger = logging.Logger.manager.loggerDict.get(name)
+        if isinstance(logger, logging.Logger):
+            return logger
+
     # find the actual logger
     logger = logging.getLogger(name)
 
-    with logging_lock:
+    with log_level_manager.lock:
 
         is_initialized = log_level_manager.has_initial(name)
         is_lo99er = isinstance(logger, Lo99er)
@@ -80,6 +83,10 @@ def get_file_logger(name, filename, level=None, rotate=False, **kwargs):
     Create an "independent" logger which writes to a file only.
     If rotate=True, will create a daily-rotating logger (filename should contain '*',
     which is replaced with the date).
+    If pooled=True, the file is written through the shared file pool (see ``lo99ing.fdpool``),
+    which caps the number of open files, when using many file loggers.
+    If durable=True, records are committed to disk in groups, and can be waited for using
+    ``wait_durable(logger)`` (see ``lo99ing.durable``).
     """
     logger = get_logger(name, level, propagate=False)
     disable_stderr(logger)
@@ -98,15 +105,64 @@ def _name_fixup(name):
     """
     if os.path.sep in name:
         # used with filename, like: get_logger(__file__)
-        p = Path(name)
-        res = os.path.splitext(p.name)[0]
+        dirname, basename = os.path.split(name)
+        res = os.path.splitext(basename)[0]
         if res in ('', '__init__'):
-            res = p.parent.name
+            res = os.path.basename(dirname)
         return res
     else:
         return name
 
 
+################################################################################
+# performance
+
+def use_fast_disabled_calls(enabled=True):
+    """
+    Make calls to logging methods of disabled levels (e.g. ``logger.debug()`` when level is INFO)
+    nearly free, by binding these methods (of every Lo99er, and its ``prefixed`` adapters) to a
+    no-op.  Methods are rebound whenever a logger's level changes (e.g. using
+    ``set_log_level_override``).
+
+    NOTE: this does not apply to ``logger.log(level, ...)``, nor to loggers whose level is NOTSET
+    (i.e. inherited from their parent).
+    """
+    with logging_lock:
+        Lo99er.fast_disabled_calls = enabled
+        loggers = list(logging.Logger.manager.loggerDict.values())
+    for logger in loggers:
+        if isinstance(logger, Lo99er):
+            logger.rebind_level_methods()
+
+
+def use_slim_records(enabled=True):
+    """
+    Create records using ``lo99ing.record.SlimLogRecord``, which computes fields only if they are
+    used (e.g. by the formatters of the installed handlers).
+    Record factories installed before are kept (see ``lo99ing.record.make_record``), but records
+    are slim only if the factory installed before is the default one.
+    """
+    from .record import install
+    install(enabled)
+
+
+def set_max_arg_length(maxlen, logger=None):
+    """
+    Bound the rendered size of logged args (and of messages logged with no args) to (roughly)
+    ``maxlen`` chars, with a marker showing how much was elided.
+    Strings, containers and exceptions are not fully rendered, which avoids huge allocations.
+    Other objects are rendered and then truncated.
+    :param logger: if None, sets the global default.  Otherwise, sets it for a specific Lo99er.
+    :param maxlen: None to disable (for a specific logger: to use the global default).
+    """
+    if logger is None:
+        Lo99er.max_arg_length = maxlen
+    elif maxlen is None:
+        vars(logger).pop('max_arg_length', None)
+    else:
+        logger.max_arg_length = maxlen
+
+
 ################################################################################
 # clock
 
@@ -121,40 +177,23 @@ def use_utc(formatter=None):
 
 def use_clock(clock, formatter=None):
     """
-    Use a custom clock for creating log-message timestamps.
-    :param clock: a callable which takes no args and returns a ``datetime.datetime`` object.
+    Use a custom clock for creating log-message timestamps (e.g. when replaying historical
+    events).  The clock is read when records are created, and the time is stored on the record
+    (as ``created_ns``, ``created`` and ``msecs``), so it is used by all handlers and formatters,
+    including deferred and buffered ones.
+    :param clock: a callable which takes no args and returns a ``datetime.datetime`` object, or
+        a timestamp (seconds since the epoch), or None (for using the real time).
+        Naive datetimes are taken to be in ``formatter``'s timezone (see ``use_utc``).  In local
+        time, a naive datetime within a DST change is ambiguous: a repeated wall time is resolved
+        by its ``fold``, and a skipped one is displayed an hour off.  Clocks which need exact
+        local times should return aware datetimes.
+        Pass ``clock=None`` to stop using a custom clock.
     """
-    if formatter is None:
-        formatter = _formatter
-
-    originalFormatTime = formatter.formatTime
-
-    def _formatTime(self, record, datefmt=None):
-        ct = _logging_timestamp(record.created)
-        if not isinstance(ct, datetime.datetime):
-            return originalFormatTime(record, datefmt)
-
-        # we need to override this method to ensure the millis are taken from the converted
-        # creation time, and not from the record (which would be the case if we just changed
-        # formatter.converter to be _logging_timestamp.
-        if datefmt:
-            s = ct.strftime(datefmt)
-        else:
-            s = ct.strftime("%Y-%m-%d %H:%M:%S")
-            s = '%s,%03d' % (s, ct.microsecond / 1000)
-        return s
-
-    def _logging_timestamp(record_created):
-        now = clock()
-        if now is not None:
-            return now
-        if record_created is not None:
-            return record_created
-        return datetime.datetime.utcnow()
+    from .record import set_clock
 
     if formatter is None:
         formatter = _formatter
-    formatter.formatTime = types.MethodType(_formatTime, formatter)
+    set_clock(clock, formatter)
 
 
 ################################################################################
@@ -0,0 +1,431 @@
+"""
+Write-stall detection and failover for handlers.
+
+When the disk behind a file handler hangs (e.g. an NFS hiccup), or stderr is a pipe nobody
+reads, a regular handler blocks every thread which logs.  A ``StallGuardHandler`` wraps a handler
+(the "primary"), and writes to it from a worker thread, measuring the latency of each write.
+Logging threads only queue records for the worker, so they never block on the primary.
+
+When a write takes longer than ``deadline`` seconds (or the queue is full), the primary is
+considered stalled, and records are diverted to a fallback, instead of being queued:
+
+- ``'ring'``: an in-memory ring of the last ``ring_size`` records
+- ``'spool'``: a local spool file of JSON lines (bounded by ``max_spool_bytes``), which also
+  survives restarts
+- ``'drop'``: records are dropped (and counted)
+
+Once the stalled write returns, the worker replays the fallback records (in order) to the
+primary, and then resumes queueing new records to it.  Stalls are reported as warnings to the
+``lo99ing.watchdog`` logger, and are kept in ``events()``; see also ``stats()``.
+
+Usage::
+
+    lo99ing.enable_file('/mnt/nfs/app.log')
+    lo99ing.guard_handlers(deadline=2.0, fallback='spool', spool_path='/var/lib/app/log.spool')
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+import collections
+
+from . import handlers as _handlers
+from .handlers import (
+    _GlobalFiltersMixin, _ErrorHandlerMixin, _UnlockedHandleMixin, prepare_deferred, record_to_dict,
+    handle_batch)
+
+
+WATCHDOG_LOGGER_NAME = 'lo99ing.watchdog'
+
+FALLBACKS = ('ring', 'spool', 'drop')
+
+
+################################################################################
+# handler
+
+class StallGuardHandler(
+        _GlobalFiltersMixin, _ErrorHandlerMixin, _UnlockedHandleMixin, logging.Handler):
+    """
+    Wraps a handler, writing to it from a worker thread, and diverting records to a fallback
+    while it is stalled.
+
+    The guard owns the primary handler: closing the guard closes it (unless it is stalled), and it
+    is not closed by ``logging.shutdown()`` (which would block on a stalled primary).  lo99ing's
+    shared stderr handlers are not owned: ``guard_handlers`` guards a copy of these instead.
+    """
+
+    def __init__(self, handler, deadline=1.0, fallback='ring', max_queue=10000, ring_size=10000,
+                 spool_path=None, max_spool_bytes=64 * 1024 * 1024, level=logging.NOTSET):
+        """
+        :param handler: the primary handler.
+        :param deadline: a write taking longer than this (seconds) is considered a stall.
+        :param fallback: where records are diverted while stalled: one of 'ring', 'spool' or
+            'drop'.
+        :param max_queue: the max number of records queued for the worker.  If exceeded, the
+            primary is considered stalled (it can't keep up).
+        :param ring_size: the max number of records kept by the 'ring' fallback (older ones are
+            dropped).
+        :param spool_path: the spool file of the 'spool' fallback.  Leftovers of a previous run
+            are replayed on start, so it should be in a directory only the app can write to.
+        :param max_spool_bytes: the max size of the spool file (further records are dropped).
+        """
+        if fallback not in FALLBACKS:
+            raise ValueError(
+                'fallback must be one of %s, not %r' % (', '.join(FALLBACKS), fallback))
+        if fallback == 'spool' and not spool_path:
+            raise ValueError("fallback='spool' requires spool_path")
+        super().__init__(level)
+        self.primary = handler
+        self.deadline = deadline
+        self.fallback = fallback
+        self.max_queue = max_queue
+        self.spool_path = str(spool_path) if spool_path else None
+        self.max_spool_bytes = max_spool_bytes
+        if not _is_shared(handler):
+            _disown(handler)
+
+        self._cond = threading.Condition(threading.Lock())
+        self._queue = collections.deque()
+        self._ring = collections.deque(maxlen=ring_size)
+        self._spool_file = None
+        self._stopped = False
+        self._abandoned = False  # closed while stalled: the worker exits once the write returns
+        self._write_started = None  # when the current write (by the worker) started
+        self._busy = False  # whether the worker is writing (or replaying)
+        self._stall = None  # the event of the current stall, while stalled
+        self._events = collections.deque(maxlen=100)
+        self._counters = dict(
+            writes=0, records=0, write_time=0.0, max_write_time=0.0, stalls=0, diverted=0,
+            dropped=0, replayed=0)
+        if self.spool_path and (
+                os.path.exists(self.spool_path) or os.path.exists(self._replay_path)):
+            # leftovers from a previous run: divert new records, until these are replayed
+            self._stall = self._new_event('leftover spool')
+
+        self._thread = threading.Thread(target=self._run, name='lo99ing-watchdog', daemon=True)
+        self._thread.start()
+
+    ################################################################################
+    # logging threads
+
+    def emit(self, record):
+        try:
+            prepare_deferred(record)
+        except Exception:
+            self.handleError(record)
+            return
+        report = None
+        with self._cond:
+            if self._stall is None:
+                started = self._write_started
+                blocked_for = time.monotonic() - started if started is not None else 0
+                if blocked_for > self.deadline:
+                    report = self._begin_stall(
+                        'write blocked for more than %ss' % self.deadline, blocked_for)
+                elif len(self._queue) >= self.max_queue:
+                    report = self._begin_stall('queue full (%s records)' % self.max_queue)
+            if self._stall is None and not self._stopped:
+                self._queue.append(record)
+                self._cond.notify()
+            else:
+                self._divert(record)
+        if report is not None:
+            _report(*report)
+
+    def _begin_stall(self, reason, blocked_for=0):
+        # NOTE: must be called with self._cond held.  returns a report, to be logged after
+        # releasing it (since logging it re-enters this handler).
+        self._stall = self._new_event(reason, time.time() - blocked_for)
+        self._counters['stalls'] += 1
+        return ('%s stalled: %s.  diverting records to %s', (self.primary, reason, self.fallback))
+
+    def _new_event(self, reason, t=None):
+        """ Records a stall event, which started at ``t`` (now by default). """
+        event = dict(
+            time=time.time() if t is None else t, reason=reason, duration=None, diverted=0,
+            replayed=0)
+        self._events.append(event)
+        return event
+
+    def _divert(self, record):
+        # NOTE: must be called with self._cond held
+        counters = self._counters
+        counters['diverted'] += 1
+        if self._stall is not None:
+            self._stall['diverted'] += 1
+        if self.fallback == 'ring':
+            if len(self._ring) == self._ring.maxlen:
+                counters['dropped'] += 1
+            self._ring.append(record)
+        elif self.fallback == 'spool':
+            try:
+                self._spool(record)
+            except Exception:
+                counters['dropped'] += 1
+        else:
+            counters['dropped'] += 1
+
+    def _spool(self, record):
+        if self._spool_file is None:
+            fd = os.open(self.spool_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+            self._spool_file = open(fd, 'ab')
+        if self._spool_file.tell() >= self.max_spool_bytes:
+            self._counters['dropped'] += 1
+            return
+        line = json.dumps(record_to_dict(record), default=repr) + '\n'
+        self._spool_file.write(line.encode('utf-8'))
+        self._spool_file.flush()
+
+    ################################################################################
+    # worker thread
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._queue or self._stall or self._stopped)
+                if self._abandoned or (self._stopped and not self._queue and not self._stall):
+                    return
+                batch = list(self._queue)
+                self._queue.clear()
+                self._busy = True
+            try:
+                if batch:
+                    self._write(batch)
+                else:
+                    # stalled, but the worker is free, i.e. the stalled write returned
+                    self._recover()
+            finally:
+                with self._cond:
+                    self._busy = False
+                    self._cond.notify_all()
+
+    def _write(self, records):
+        primary = self.primary
+        t0 = time.monotonic()
+        self._write_started = t0
+        try:
+            records = handle_batch(primary, records)
+        except Exception:
+            pass  # the primary's handleError already reported it
+        finally:
+            self._write_started = None
+            write_time = time.monotonic() - t0
+        if not records:
+            return  # none passed the primary's level
+        report = None
+        with self._cond:
+            counters = self._counters
+            counters['writes'] += 1
+            counters['records'] += len(records)
+            counters['write_time'] += write_time
+            counters['max_write_time'] = max(counters['max_write_time'], write_time)
+            if write_time > self.deadline and self._stall is None:
+                # a stall which no logging thread ran into
+                event = self._new_event('write took %.1fs' % write_time, time.time() - write_time)
+                event['duration'] = write_time
+                counters['stalls'] += 1
+                report = ('%s stalled: write took %.1fs', (primary, write_time))
+        if report is not None:
+            _report(*report)
+
+    def _recover(self):
+        """ Replays the fallback records to the primary, and then ends the stall. """
+        while True:
+            with self._cond:
+                records = list(self._ring)
+                self._ring.clear()
+                spool = self._take_spool()
+                if not records and spool is None:
+                    event, self._stall = self._stall, None
+                    break
+            if spool is not None:
+                self._replay_spool(spool)
+            if records:
+                self._write(records)
+                self._count_replayed(len(records))
+
+        event['duration'] = time.time() - event['time']
+        dropped = self._counters['dropped']
+        _report('%s recovered after %.1fs: %s records diverted, %s replayed (%s dropped in total)',
+                (self.primary, event['duration'], event['diverted'], event['replayed'], dropped))
+
+    def _take_spool(self):
+        # NOTE: must be called with self._cond held.  returns the path of a spool to replay.
+        if self.spool_path is None:
+            return None
+        if self._spool_file is not None:
+            self._spool_file.close()
+            self._spool_file = None
+        if os.path.exists(self._replay_path):
+            return self._replay_path  # leftover of an interrupted replay
+        if os.path.exists(self.spool_path):
+            os.replace(self.spool_path, self._replay_path)
+            return self._replay_path
+        return None
+
+    def _replay_spool(self, path, chunk_size=1000):
+        with open(path, 'rb') as f:
+            chunk = []
+            for line in f:
+                try:
+                    d = json.loads(line)
+                except ValueError:
+                    break  # a truncated record may be left by a crash
+                if not isinstance(d, dict):
+                    break
+                chunk.append(logging.makeLogRecord(d))
+                if len(chunk) >= chunk_size:
+                    self._write(chunk)
+                    self._count_replayed(len(chunk))
+                    chunk = []
+            if chunk:
+                self._write(chunk)
+                self._count_replayed(len(chunk))
+        os.remove(path)
+
+    def _count_replayed(self, n):
+        with self._cond:
+            self._counters['replayed'] += n
+            if self._stall is not None:
+                self._stall['replayed'] += n
+
+    @property
+    def _replay_path(self):
+        return self.spool_path + '.replay'
+
+    ################################################################################
+    # flush/close
+
+    def flush(self, timeout=None):
+        """
+        Waits until all records queued (or diverted) so far are written, and flushes the primary.
+        Returns False on timeout (defaults to ``deadline``), e.g. if the primary is stalled.
+        """
+        timeout = self.deadline if timeout is None else timeout
+        with self._cond:
+            if not self._cond.wait_for(
+                    lambda: not self._queue and not self._busy and self._stall is None,
+                    timeout):
+                return False
+        self.primary.flush()
+        return True
+
+    def close(self):
+        """
+        Writes the queued records (waiting up to ``deadline`` for the worker), and closes the
+        primary.  If the primary is stalled, the queued records are diverted instead, and the
+        primary is left open.  Records diverted to the 'ring' fallback are then lost, and are
+        counted as dropped (the spool is replayed by the next run).
+        """
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        self._thread.join(self.deadline)
+        with self._cond:
+            # if stalled, the fallback records are left as is (e.g. the spool is replayed by
+            # the next run)
+            self._abandoned = self._thread.is_alive()
+            for record in self._queue:
+                self._divert(record)
+            self._queue.clear()
+            if self._abandoned:
+                # the ring is never replayed
+                self._counters['dropped'] += len(self._ring)
+                self._ring.clear()
+            if self._spool_file is not None:
+                self._spool_file.close()
+                self._spool_file = None
+        if not self._thread.is_alive() and not _is_shared(self.primary):
+            self.primary.close()
+        super().close()
+
+    ################################################################################
+    # reporting
+
+    def stats(self):
+        """
+        Returns a dict of metrics: number of writes and records written, write latency (seconds,
+        average and max), number of stalls, whether currently stalled, records diverted, dropped
+        and replayed, and records queued and in the ring.
+        """
+        with self._cond:
+            d = dict(self._counters)
+            d['stalled'] = self._stall is not None
+            d['queue'] = len(self._queue)
+            d['ring'] = len(self._ring)
+        d['avg_write_time'] = d.pop('write_time') / (d['writes'] or 1)
+        return d
+
+    def events(self):
+        """
+        Returns the recent stall events (dicts of time, reason, duration, and the number of
+        records diverted and replayed).  The duration of an ongoing stall is None.
+        """
+        with self._cond:
+            return [dict(event) for event in self._events]
+
+    def __repr__(self):
+        return '<%s %r (%s)>' % (type(self).__name__, self.primary, self.level)
+
+
+def _is_shared(handler):
+    """ Whether the handler is one of lo99ing's stderr handlers, shared by loggers. """
+    return handler is _handlers.stderr_handler or handler is _handlers._bytes_stderr_handler
+
+
+def _copy_shared(handler):
+    """ Returns a new handler, writing to stderr like the given shared handler. """
+    if isinstance(handler, _handlers.BytesFdHandler):
+        copy = _handlers.BytesFdHandler(handler.fd)
+    else:
+        copy = _handlers.StreamHandler(handler.stream)
+    copy.setFormatter(handler.formatter)
+    copy.setLevel(handler.level)
+    for f in handler.filters:
+        copy.addFilter(f)
+    return copy
+
+
+def _disown(handler):
+    """ Removes the handler from the handlers closed by ``logging.shutdown()``. """
+    with logging._lock:
+        logging._handlerList[:] = [ref for ref in logging._handlerList if ref() is not handler]
+
+
+def _report(msg, args):
+    from .utils import get_logger
+    get_logger(WATCHDOG_LOGGER_NAME).warning(msg, *args)
+
+
+################################################################################
+# guarding
+
+def guard_handlers(logger=None, **kwargs):
+    """
+    Wraps each handler of ``logger`` (root logger by default) with a ``StallGuardHandler``.
+    Call this after adding the handlers (e.g. using ``enable_file()``).  With the 'spool'
+    fallback and multiple handlers, ``spool_path`` is suffixed with the handler's index.
+    Returns the guards.
+    """
+    if logger is None:
+        logger = logging.root
+    handlers = [h for h in logger.handlers if not isinstance(h, StallGuardHandler)]
+    spool_path = kwargs.pop('spool_path', None)
+    guards = []
+    for i, h in enumerate(handlers):
+        if spool_path and len(handlers) > 1:
+            kwargs['spool_path'] = '%s.%d' % (spool_path, i)
+        else:
+            kwargs['spool_path'] = spool_path
+        # the shared stderr handler may also be used (unguarded) by other loggers, so it is
+        # left as is, and a copy is guarded (and owned by the guard)
+        guard = StallGuardHandler(_copy_shared(h) if _is_shared(h) else h, **kwargs)
+        logger.removeHandler(h)
+        logger.addHandler(guard)
+        guards.append(guard)
+    return guards
+
+
+################################################################################
@@ -0,0 +1,94 @@
+#! /usr/bin/env python3
+
+import lo99ing
+import logging
+from lo99ing.misc import bounded_repr
+from helpers import ListHandler
+
+
+class Huge:
+
+    def __str__(self):
+        return 'H' * 10000
+
+
+class Index:
+    """ Number-like, but not a ``numbers.Number`` (e.g. a numpy scalar, or an enum). """
+
+    def __index__(self):
+        return 7
+
+    def __float__(self):
+        return 7.5
+
+
+def main():
+    handler = ListHandler()
+    logging.root.addHandler(handler)
+    logger = lo99ing.get_logger('LOGGER1')
+    logger2 = lo99ing.get_logger('LOGGER2')
+
+    # not bounded by default
+    logger.info('0 %s', 'x' * 500)
+    assert len(handler.messages[-1]) == 502
+
+    lo99ing.set_max_arg_length(100)
+
+    logger.info('1 str: %s', 'x' * 5000)
+    assert handler.messages[-1] == '1 str: ' + 'x' * 100 + '... [4900 chars elided]'
+
+    logger.info('2 list: %s', list(range(100000)))
+    msg = handler.messages[-1]
+    assert msg.startswith('2 list: [0, 1, 2,') and msg.endswith('[100000 items]'), msg
+    assert len(msg) < 200, msg
+
+    # not cut through reprlib's '...'
+    assert bounded_repr(list(range(1000)), 20) == '[0, 1, 2, 3, 4, 5 ... [1000 items]'
+    logger.info('2 list: %s', ['w' * 5000])
+    assert handler.messages[-1].endswith(' ... [1 item]'), handler.messages[-1]
+
+    logger.info('3 dict (repr): %r', {i: 'v' * 1000 for i in range(1000)})
+    msg = handler.messages[-1]
+    assert msg.startswith("3 dict (repr): {0: 'vvv") and msg.endswith('[1000 items]'), msg
+    assert len(msg) < 200, msg
+
+    logger.info('4 exception: %s', ValueError('k' * 5000))
+    assert handler.messages[-1] == \
+        '4 exception: ValueError - ' + 'k' * 100 + '... [4900 chars elided]'
+    logger.info('4 exception: %s', KeyError('k' * 5000))
+    msg = handler.messages[-1]
+    assert msg.startswith("4 exception: KeyError - 'kkk") and msg.endswith('chars elided]'), msg
+
+    logger.info('5 object: %s', Huge())
+    assert handler.messages[-1] == '5 object: ' + 'H' * 100 + '... [9900 chars elided]'
+
+    logger.info('6 numbers: %d %.1f %s', 5, 1.5, None)
+    assert handler.messages[-1] == '6 numbers: 5 1.5 None', handler.messages[-1]
+    logger.info('6 number-like: %d %.1f', Index(), Index())
+    assert handler.messages[-1] == '6 number-like: 7 7.5', handler.messages[-1]
+
+    # a single mapping, for '%(key)s' formatting: its values are bounded
+    logger.info('6 mapping: %(a)s %(b)s', {'a': 1, 'b': 'z' * 5000})
+    assert handler.messages[-1] == '6 mapping: 1 ' + 'z' * 100 + '... [4900 chars elided]', \
+        handler.messages[-1]
+    logger.info('6 empty mapping: %s', {})
+    assert handler.messages[-1] == '6 empty mapping: {}', handler.messages[-1]
+
+    logger.info('M' * 1000)
+    assert handler.messages[-1] == 'M' * 100 + '... [900 chars elided]'
+
+    # per-logger
+    lo99ing.set_max_arg_length(10, logger=logger2)
+    logger2.info('7 %s', 'y' * 50)
+    assert handler.messages[-1] == '7 ' + 'y' * 10 + '... [40 chars elided]'
+    lo99ing.set_max_arg_length(None, logger=logger2)
+    logger2.info('8 %s', 'y' * 50)
+    assert handler.messages[-1] == '8 ' + 'y' * 50
+
+    lo99ing.set_max_arg_length(None)
+    logger.info('9 %s', 'x' * 500)
+    assert len(handler.messages[-1]) == 502
+
+
+if __name__ == '__main__':
+    main()
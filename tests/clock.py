@@ -1,7 +1,13 @@
 #! /usr/bin/env python3
 
+import io
+import os
+import time
 import lo99ing
+import logging
 import datetime
+from lo99ing.handlers import StreamHandler
+from lo99ing.formatter import formatter
 
 
 class ManualClock:
@@ -31,6 +37,90 @@ def main():
 
     logger.info('done')
 
+    # the clock is read when records are created, so deferred formatting shows the same time
+    stream = io.StringIO()
+    handler = StreamHandler(stream)
+    handler.setFormatter(formatter)
+    records = []
+    handler.addFilter(lambda record: records.append(record) or True)
+    logger = lo99ing.get_logger('DEFERRED', propagate=False)
+    lo99ing.disable_stderr(logger)
+    logger.addHandler(handler)
+    manual_clock.t = datetime.datetime(2001, 2, 3, 4, 5, 6, 7000)
+    logger.info('deferred')
+    manual_clock.t = datetime.datetime(2002, 1, 1)
+    assert records[0].created_ns == 981173106007000000, records[0].created_ns
+    assert formatter.format(records[0]).startswith('2001-02-03 04:05:06,007:INFO:DEFERRED:')
+
+    # timestamps and aware datetimes; records of slim records too
+    lo99ing.use_slim_records()
+    for t in [981173106.007, datetime.datetime(2001, 2, 3, 4, 5, 6, 7000, datetime.timezone.utc)]:
+        manual_clock.t = t
+        logger.info('%s', type(t).__name__)
+    lo99ing.use_slim_records(False)
+    assert logging.getLogRecordFactory() is lo99ing.record.make_record
+    lines = stream.getvalue().splitlines()
+    assert [line[:23] for line in lines] == ['2001-02-03 04:05:06,007'] * 3, lines
+
+    # back to real time
+    lo99ing.use_clock(None)
+    assert logging.getLogRecordFactory() is logging.LogRecord
+    t0 = time.time()
+    logger.info('real time')
+    assert records[-1].created >= t0
+
+    # record factories installed by others are wrapped, and kept
+    def tagging_factory(*args, **kwargs):
+        record = logging.LogRecord(*args, **kwargs)
+        record.tag = 'mine'
+        return record
+
+    logging.setLogRecordFactory(tagging_factory)
+    lo99ing.use_clock(manual_clock.now)
+    manual_clock.t = 981173106.007
+    logger.info('tagged')
+    assert records[-1].tag == 'mine' and records[-1].created_ns == 981173106007000000
+    # installed on top of lo99ing's factory: kept when the clock is cleared
+    outer_factory = logging.getLogRecordFactory()
+    logging.setLogRecordFactory(lambda *args, **kwargs: outer_factory(*args, **kwargs))
+    on_top = logging.getLogRecordFactory()
+    lo99ing.use_clock(None)
+    assert logging.getLogRecordFactory() is on_top
+    logger.info('tagged, real time')
+    assert records[-1].tag == 'mine' and records[-1].created >= t0
+    logging.setLogRecordFactory(outer_factory)
+    lo99ing.use_clock(None)
+    assert logging.getLogRecordFactory() is tagging_factory
+    logging.setLogRecordFactory(logging.LogRecord)
+
+    # naive local times around DST changes: a time repeated by the change is resolved by its fold
+    if hasattr(time, 'tzset'):
+        orig_tz = os.environ.get('TZ')
+        os.environ['TZ'] = 'America/New_York'
+        time.tzset()
+        try:
+            local_formatter = logging.Formatter()
+            lo99ing.use_clock(manual_clock.now, formatter=local_formatter)
+            for fold, utc_hour in [(0, 5), (1, 6)]:
+                manual_clock.t = datetime.datetime(2021, 11, 7, 1, 30, fold=fold)
+                logger.info('fold=%s', fold)
+                utc = datetime.datetime(2021, 11, 7, utc_hour, 30, tzinfo=datetime.timezone.utc)
+                assert records[-1].created == utc.timestamp(), (fold, records[-1].created)
+            # aware datetimes are exact
+            manual_clock.t = datetime.datetime(
+                2021, 3, 14, 2, 30, tzinfo=datetime.timezone(datetime.timedelta(hours=-5)))
+            logger.info('aware')
+            assert local_formatter.formatTime(records[-1]).startswith('2021-03-14 03:30:00')
+            lo99ing.use_clock(None)
+        finally:
+            if orig_tz is None:
+                del os.environ['TZ']
+            else:
+                os.environ['TZ'] = orig_tz
+            time.tzset()
+
+    logger.removeHandler(handler)
+
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,127 @@
+#! /usr/bin/env python3
+
+import os
+import glob
+import time
+import logging
+import pathlib
+import datetime
+import threading
+import lo99ing
+from lo99ing.durable import DurableFileHandler, DurableDailyRotatingFileHandler, wait_durable
+from lo99ing.formatter import formatter
+from helpers import read_lines
+
+
+def main():
+
+    logdir = os.path.splitext(__file__)[0] + '_output'
+    pathlib.Path(logdir).mkdir(exist_ok=True)
+    for path in glob.glob(os.path.join(logdir, '*.log')):
+        os.remove(path)
+
+    # log, then wait for durability
+    path = os.path.join(logdir, 'audit.log')
+    audit = lo99ing.get_file_logger('audit', path, durable=True, retry_interval=0.1)
+    handler, = audit.handlers
+    assert isinstance(handler, DurableFileHandler), handler
+    audit.info('1 txn committed')
+    assert wait_durable(audit)
+    assert read_lines(path) == ['1 txn committed']
+
+    # many threads: records are committed in groups
+    def run(thread_idx):
+        for i in range(50):
+            audit.info('txn %s.%s', thread_idx, i)
+            assert handler.sync(timeout=10)
+
+    threads = [threading.Thread(target=run, args=(i, )) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    stats = handler.stats()
+    assert stats['records'] == 1 + 8 * 50, stats
+    assert stats['pending'] == 0 and stats['errors'] == 0, stats
+    assert stats['commits'] <= stats['records'], stats
+    assert stats['max_commit_time'] >= stats['avg_commit_time'] > 0, stats
+    assert len(read_lines(path)) == 1 + 8 * 50
+
+    # bulk logging
+    audit.log_many([(logging.INFO, 'bulk %s', (i, )) for i in range(10)])
+    assert wait_durable(audit, timeout=10)
+    assert read_lines(path)[-1] == 'bulk 9'
+    assert handler.stats()['max_batch'] >= 10
+    # records which fail to format are not counted as written
+    records = handler.stats()['records']
+    audit.log_many([(logging.INFO, 'bulk %s', (10, )), (logging.INFO, 'bad %d', ('x', ))])
+    assert wait_durable(audit, timeout=10)
+    assert handler.stats()['records'] == records + 1, handler.stats()
+    assert read_lines(path)[-1] == 'bulk 10'
+
+    # a failed commit is raised by sync (and wait_durable), and retried
+    os.close(handler.fd)
+    handler.fd = os.open(path, os.O_RDONLY)
+    audit.info('2 fails')
+    for wait in [handler.sync, lambda: wait_durable(audit)]:
+        try:
+            wait()
+            assert False
+        except OSError:
+            pass
+    assert handler.stats()['errors'] >= 2 and handler.stats()['pending'] == 1, handler.stats()
+    # a later successful commit includes the failed records
+    os.close(handler.fd)
+    handler.fd = os.open(path, os.O_WRONLY | os.O_APPEND)
+    audit.info('3 ok')
+    assert wait_durable(audit, timeout=10)
+    assert read_lines(path)[-2:] == ['2 fails', '3 ok'], read_lines(path)[-2:]
+    assert handler.stats()['pending'] == 0
+
+    audit.removeHandler(handler)
+    handler.close()
+
+    # rollover
+    pattern = os.path.join(logdir, 'rotating.*.log')
+    handler = DurableDailyRotatingFileHandler(pattern)
+    handler.setFormatter(formatter)
+    logger = lo99ing.get_logger('rotating', propagate=False)
+    lo99ing.disable_stderr(logger)
+    logger.addHandler(handler)
+    logger.info('1 today')
+    assert wait_durable(logger)
+    tomorrow = datetime.datetime.utcnow() + datetime.timedelta(days=1)
+    handler.now = lambda: tomorrow
+    handler.rolloverAt = time.time()
+    logger.info('2 tomorrow')
+    assert wait_durable(logger)
+    paths = sorted(glob.glob(pattern))
+    assert len(paths) == 2, paths
+    assert read_lines(paths[0]) == ['1 today']
+    assert read_lines(paths[1]) == ['2 tomorrow']
+
+    # rollover while flushing with the handler's lock held (as logging.shutdown() does)
+    day_after = tomorrow + datetime.timedelta(days=1)
+    handler.now = lambda: day_after
+    handler.rolloverAt = time.time()
+
+    def shutdown():
+        handler.acquire()
+        try:
+            logger.info('3 day after')
+            handler.flush()
+        finally:
+            handler.release()
+
+    thread = threading.Thread(target=shutdown, daemon=True)
+    thread.start()
+    thread.join(5)
+    assert not thread.is_alive(), 'deadlocked'
+    paths = sorted(glob.glob(pattern))
+    assert len(paths) == 3 and read_lines(paths[2]) == ['3 day after'], paths
+    logger.removeHandler(handler)
+    handler.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+#! /usr/bin/env python3
+
+import lo99ing
+import logging
+from lo99ing.ephemeral import EphemeralLoggers, ephemeral_loggers
+from lo99ing.level import log_level_manager
+
+
+def main():
+    loggers = EphemeralLoggers(max_loggers=10)
+    num_loggers = len(logging.Logger.manager.loggerDict)
+
+    for i in range(100):
+        logger = loggers.get_logger('conn.%s' % i)
+        if i % 10 == 0:
+            logger.info('1 this prints (%s)', i)
+
+    # memory is bounded
+    stats = loggers.stats()
+    assert stats == dict(alive=10, created=100, evictions=90), stats
+    assert 'conn.0' not in logging.Logger.manager.loggerDict
+    assert not log_level_manager.has_initial('conn.0')
+    assert len(logging.Logger.manager.loggerDict) == num_loggers + 10 + 1  # +1 placeholder
+
+    # re-created with override restored
+    lo99ing.set_log_level_override('conn.0', 'error')
+    logger = loggers.get_logger('conn.0')
+    assert logger.level == logging.ERROR, logger
+    logger.info('NOPRINT')
+    assert loggers.stats()['evictions'] == 91
+
+    # recently-used ones are not evicted
+    logger = loggers.get_logger('conn.0')
+    for i in range(200, 209):
+        loggers.get_logger('conn.%s' % i)
+    assert 'conn.0' in logging.Logger.manager.loggerDict
+
+    # children of regular loggers
+    parent = lo99ing.get_logger('parent')
+    child = loggers.get_child(parent, 'child')
+    assert child.name == 'parent.child' and child.parent is parent, child
+
+    # explicit eviction
+    loggers.evict('parent.child')
+    assert 'parent.child' not in logging.Logger.manager.loggerDict
+
+    # when all children are evicted, placeholders are removed too
+    for i in range(20):
+        loggers.get_logger('a.b.c%s' % i)
+    for i in range(20):
+        loggers.get_logger('d%s' % i)
+    assert 'a.b' not in logging.Logger.manager.loggerDict
+    assert 'a' not in logging.Logger.manager.loggerDict
+
+    # default instance
+    logger = lo99ing.get_ephemeral_logger('symbol.XYZ')
+    logger.info('2 this prints')
+    assert ephemeral_loggers.stats()['alive'] == 1
+
+
+if __name__ == '__main__':
+    main()
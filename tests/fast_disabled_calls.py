@@ -0,0 +1,70 @@
+#! /usr/bin/env python3
+
+import lo99ing
+import logging
+from helpers import ListHandler
+
+
+def main():
+    handler = ListHandler()
+    logging.root.addHandler(handler)
+
+    logger = lo99ing.get_logger('LOGGER1')
+    plogger = logger.prefixed('AAA')
+    pplogger = plogger.prefixed('BBB')
+
+    lo99ing.use_fast_disabled_calls()
+
+    # disabled levels are bound to a no-op
+    assert 'debug' in vars(logger) and 'info' not in vars(logger)
+    assert 'debug' in vars(plogger) and 'debug' in vars(pplogger)
+    logger.debug('NOPRINT')
+    plogger.debug('NOPRINT')
+    pplogger.debug('NOPRINT')
+    logger.info('1')
+    pplogger.info('2')
+
+    # rebound when level changes
+    logger.set_log_level_override('debug')
+    assert 'debug' not in vars(logger) and 'debug' not in vars(pplogger)
+    logger.debug('3')
+    pplogger.debug('4')
+
+    logger.set_log_level_override('error')
+    logger.warning('NOPRINT')
+    pplogger.info('NOPRINT')
+    pplogger.exception('5')
+
+    logger.set_log_level_override(None)
+    logger.info('6')
+
+    # new loggers and adapters
+    logger2 = lo99ing.get_logger('LOGGER2', level='warning')
+    assert 'info' in vars(logger2)
+    logger2.info('NOPRINT')
+    logger2.prefixed('CCC').info('NOPRINT')
+    logger2.prefixed('CCC').warning('7')
+
+    # loggers with no level of their own follow their parent's level
+    parent = lo99ing.get_logger('PARENT', level='info')
+    child = lo99ing.get_logger('PARENT.child')
+    child.setLevel(logging.NOTSET)
+    assert 'debug' in vars(parent) and 'debug' not in vars(child)
+    child.debug('NOPRINT')
+    parent.setLevel(logging.DEBUG)
+    child.debug('8')
+    parent.setLevel(logging.INFO)
+    child.debug('NOPRINT')
+
+    # disabling restores all methods
+    lo99ing.use_fast_disabled_calls(False)
+    assert 'debug' not in vars(logger) and 'debug' not in vars(pplogger)
+    assert 'info' not in vars(logger2)
+    logger2.info('NOPRINT')
+
+    messages = [m.split()[-1] for m in handler.messages]
+    assert messages == ['1', '2', '3', '4', '5', '6', '7', '8'], handler.messages
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+#! /usr/bin/env python3
+
+import lo99ing
+import os
+import glob
+import time
+import pathlib
+import datetime
+import threading
+from lo99ing.formatter import formatter
+from lo99ing.fdpool import FilePool, PooledFileHandler, PooledDailyRotatingFileHandler, file_pool
+from helpers import read_lines
+
+
+def main():
+
+    logdir = os.path.splitext(__file__)[0] + '_output'
+    pathlib.Path(logdir).mkdir(exist_ok=True)
+    for path in glob.glob(os.path.join(logdir, '*.log')):
+        os.remove(path)
+
+    # many independent file loggers, few open files
+    file_pool.set_max_open(4)
+    loggers = [
+        lo99ing.get_file_logger('client%s' % i, os.path.join(logdir, 'client%s.log' % i),
+                                pooled=True)
+        for i in range(20)
+    ]
+    for round in range(3):
+        for i, logger in enumerate(loggers):
+            logger.info('%s hello %s', round, i)
+    stats = file_pool.stats()
+    assert stats['open'] == 4, stats
+    assert stats['paths'] == 20, stats
+    assert stats['misses'] == 60 and stats['evictions'] == 56, stats
+    for i in range(20):
+        lines = read_lines(os.path.join(logdir, 'client%s.log' % i))
+        assert lines == ['%s hello %s' % (round, i) for round in range(3)], lines
+
+    # recently-used files stay open
+    loggers[0].info('3 hello 0')
+    loggers[0].info('4 hello 0')
+    assert file_pool.stats()['hits'] == stats['hits'] + 1
+
+    # handlers of the same path share the stream
+    pool = FilePool(max_open=2)
+    path = os.path.join(logdir, 'shared.log')
+    handlers = [PooledFileHandler(path, pool=pool) for _ in range(3)]
+    logger = lo99ing.get_logger('shared', propagate=False)
+    lo99ing.disable_stderr(logger)
+    for h in handlers:
+        h.setFormatter(formatter)
+        logger.addHandler(h)
+
+    def log_many(thread_idx):
+        for i in range(100):
+            logger.info('thread %s %s', thread_idx, i)
+
+    threads = [threading.Thread(target=log_many, args=(i, )) for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert pool.stats()['open'] == 1 and pool.stats()['paths'] == 1, pool.stats()
+    assert len(read_lines(path)) == 3 * 4 * 100
+
+    # the file is closed when the last handler is closed
+    for h in handlers[:2]:
+        logger.removeHandler(h)
+        h.close()
+    assert pool.stats()['open'] == 1
+    logger.removeHandler(handlers[2])
+    handlers[2].close()
+    assert pool.stats()['open'] == 0 and pool.stats()['paths'] == 0, pool.stats()
+
+    # encoding must match
+    h = PooledFileHandler(path, pool=pool, encoding='utf-8')
+    try:
+        PooledFileHandler(path, pool=pool, encoding='latin-1')
+        assert False
+    except ValueError:
+        pass
+    h.close()
+
+    # rollover
+    pattern = os.path.join(logdir, 'rotating.*.log')
+    handlers = [PooledDailyRotatingFileHandler(pattern, pool=pool) for _ in range(2)]
+    logger = lo99ing.get_logger('rotating', propagate=False)
+    lo99ing.disable_stderr(logger)
+    for h in handlers:
+        h.setFormatter(formatter)
+        logger.addHandler(h)
+    logger.info('1 today')
+    tomorrow = datetime.datetime.utcnow() + datetime.timedelta(days=1)
+    for h in handlers:
+        h.now = lambda: tomorrow
+        h.rolloverAt = time.time()
+    logger.info('2 tomorrow')
+    paths = sorted(glob.glob(os.path.join(logdir, 'rotating.*.log')))
+    assert len(paths) == 2, paths
+    assert read_lines(paths[0]) == ['1 today'] * 2
+    assert read_lines(paths[1]) == ['2 tomorrow'] * 2
+    # the old file was closed, once both handlers rolled over
+    assert pool.stats()['paths'] == 1, pool.stats()
+    for h in handlers:
+        logger.removeHandler(h)
+        h.close()
+
+    file_pool.close_all()
+    assert file_pool.stats()['open'] == 0
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+#! /usr/bin/env python3
+
+import io
+import re
+import lo99ing
+import logging
+from lo99ing.handlers import StreamHandler, remove_global_filter
+
+
+class NoRender:
+    """ An arg which must never be rendered, i.e. the record must be dropped before formatting. """
+
+    def __str__(self):
+        raise AssertionError('rendered')
+
+
+def main():
+    output = io.StringIO()
+    handler = StreamHandler(output)
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    logging.root.addHandler(handler)
+    lo99ing.disable_stderr()
+
+    noisy = lo99ing.RuleFilter([
+        lo99ing.FilterRule(logger='third.party', max_level='info'),
+        lo99ing.FilterRule(template=r'^Heartbeat '),
+        lo99ing.FilterRule(logger='mine', site='tests/filters.py:%d' % (SITE_LINENO, )),
+        lo99ing.FilterRule(logger='mine', template=r'^Sent', text=r'to host-\d+ '),
+    ])
+
+    mine = lo99ing.get_logger('mine')
+    third = lo99ing.get_logger('third.party.module')
+    other = lo99ing.get_logger('third.partying')
+
+    # per handler
+    handler.addFilter(noisy)
+    third.info('NOPRINT %s', NoRender())
+    third.warning('1 warning from third party')
+    other.info('2 not a descendant of third.party')
+    handler.removeFilter(noisy)
+    third.info('3 not filtered')
+
+    # global
+    lo99ing.add_global_filter(noisy)
+    third.info('NOPRINT %s', NoRender())
+    mine.info('Heartbeat %s', NoRender())
+    mine.info('4 Heartbeat not at start')
+    log_from_site(mine)
+    mine.info('Sent %s bytes to host-%s ok', 5, 1)
+    mine.info('5 Sent %s bytes to host-%s ok', 5, 1)
+    mine.info('Sent %s bytes to server-%s ok', 6, 1)
+    remove_global_filter(noisy)
+    third.info('7 not filtered')
+
+    lines = output.getvalue().splitlines()
+    messages = [m.split()[0] for m in lines]
+    assert messages == ['1', '2', '3', '4', '5', 'Sent', '7'], lines
+
+    stats = [n for _, n in noisy.stats()]
+    assert stats == [2, 1, 1, 1], noisy.stats()
+
+    # templates with flags or groups (which can't be combined into a single regex)
+    output.truncate(0)
+    output.seek(0)
+    flagged = lo99ing.RuleFilter([
+        lo99ing.FilterRule(template=r'^Heartbeat '),
+        lo99ing.FilterRule(template=r'(?i)^ping\b'),
+        lo99ing.FilterRule(template=r'^(\w+) \1\b'),
+        lo99ing.FilterRule(template=re.compile('^pong', re.IGNORECASE)),
+    ])
+    handler.addFilter(flagged)
+    mine.info('PING %s', NoRender())
+    mine.info('again again %s', NoRender())
+    mine.info('Pong %s', NoRender())
+    mine.info('8 pinging again')
+    handler.removeFilter(flagged)
+    assert output.getvalue().splitlines() == ['8 pinging again'], output.getvalue()
+    assert [n for _, n in flagged.stats()] == [0, 1, 1, 1], flagged.stats()
+
+    # the templates of prefixed loggers include the prefix (for single records, and batches)
+    output.truncate(0)
+    output.seek(0)
+    prefixed = lo99ing.RuleFilter([
+        lo99ing.FilterRule(template=r'^Heartbeat '),
+        lo99ing.FilterRule(template=r'^\[db\] Heartbeat '),
+    ])
+    handler.addFilter(prefixed)
+    db = mine.prefixed('[db]')
+    db.info('Heartbeat %s', NoRender())
+    db.log_many([(logging.INFO, 'Heartbeat %s', (NoRender(), ))])
+    mine.prefixed('[cache]').info('Heartbeat 9 not filtered')
+    handler.removeFilter(prefixed)
+    assert output.getvalue().splitlines() == ['[cache] Heartbeat 9 not filtered'], \
+        output.getvalue()
+    assert [n for _, n in prefixed.stats()] == [0, 2], prefixed.stats()
+
+
+def log_from_site(logger):
+    logger.info('NOPRINT %s', NoRender())
+
+
+SITE_LINENO = log_from_site.__code__.co_firstlineno + 1
+
+
+if __name__ == '__main__':
+    main()
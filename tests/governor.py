@@ -0,0 +1,99 @@
+#! /usr/bin/env python3
+
+import io
+import time
+import contextlib
+import logging
+import lo99ing
+from lo99ing.governor import LevelGovernor
+from lo99ing.logger import Lo99er
+from lo99ing.handlers import StreamHandler
+from lo99ing.formatter import formatter
+from helpers import wait_for
+
+
+def main():
+    noisy = lo99ing.get_logger('noisy', level='info', propagate=False)
+    quiet = lo99ing.get_logger('quiet', level='info', propagate=False)
+    lo99ing.disable_stderr(noisy)
+    lo99ing.disable_stderr(quiet)
+    noisy.addHandler(logging.NullHandler())
+    quiet.addHandler(logging.NullHandler())
+    stream = io.StringIO()
+    handler = StreamHandler(stream)
+    handler.setFormatter(formatter)
+    governor_logger = lo99ing.get_logger('lo99ing.governor')
+    governor_logger.addHandler(handler)
+
+    pressure = [0]
+    governor = LevelGovernor(budget=100, window=3600, hold=5, pressure=lambda: pressure[0])
+    governor.start()
+    t0 = time.monotonic()
+
+    # over budget: level is raised one step.  (counting doesn't depend on the record factory)
+    lo99ing.use_clock(time.time)
+    lo99ing.use_slim_records()
+    for i in range(500):
+        noisy.info('record %s', i)
+    for i in range(50):
+        quiet.info('record %s', i)
+    lo99ing.use_slim_records(False)
+    lo99ing.use_clock(None)
+    governor.tick(t0 + 1)
+    assert noisy.level == logging.WARNING, noisy
+    assert quiet.level == logging.INFO, quiet
+    state = governor.state()
+    assert list(state['shed']) == ['noisy'], state
+    assert state['shed']['noisy']['level'] == 'WARNING', state
+    assert 'raising level of noisy to WARNING' in stream.getvalue(), stream.getvalue()
+
+    # never above max_level
+    for i in range(500):
+        noisy.warning('record %s', i)
+    governor.tick(t0 + 2)
+    assert noisy.level == logging.WARNING, noisy
+    assert stream.getvalue().count('raising') == 1, stream.getvalue()
+
+    # overrides set meanwhile are not lost
+    lo99ing.set_log_level_override('noisy', 'debug')
+    assert noisy.level == logging.WARNING, noisy
+
+    # restored after the hold period
+    governor.tick(t0 + 4)
+    assert noisy.level == logging.WARNING, noisy
+    governor.tick(t0 + 8)
+    assert noisy.level == logging.DEBUG, noisy
+    assert 'restoring level of noisy' in stream.getvalue()
+    assert governor.state()['shed'] == {}
+    lo99ing.set_log_level_override('noisy', None)
+    assert noisy.level == logging.INFO, noisy
+
+    # pressure reduces the budgets
+    pressure[0] = 2.0
+    for i in range(8):
+        quiet.log_many([(logging.INFO, 'record %s', (j, )) for j in range(10)])
+    governor.tick(t0 + 9)
+    assert quiet.level == logging.WARNING, quiet
+    assert governor.state()['pressure'] == 2.0
+
+    # stopping restores all levels
+    governor.stop()
+    assert quiet.level == logging.INFO, quiet
+    assert Lo99er.governor is None
+    governor_logger.removeHandler(handler)
+
+    # errors of the governor's thread are printed to stderr (and it keeps running)
+    def failing_pressure():
+        raise ValueError('no pressure gauge')
+
+    errors = io.StringIO()
+    with contextlib.redirect_stderr(errors):
+        governor = LevelGovernor(window=0.01, pressure=failing_pressure)
+        governor.start()
+        wait_for(lambda: errors.getvalue().count('ValueError: no pressure gauge') >= 2)
+        governor.stop()
+    assert 'the level governor failed to apply budgets' in errors.getvalue(), errors.getvalue()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,37 @@
+"""
+Helpers shared by the tests (which run as scripts, so they import this as ``helpers``).
+"""
+
+import time
+import logging
+
+
+class ListHandler(logging.Handler):
+    """ Keeps the messages of the records it handles (formatted, if it has a formatter). """
+
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(self.format(record) if self.formatter else record.getMessage())
+
+
+def read_lines(path, prefixed=True):
+    """
+    Returns the lines of a log file, without their ``time:level:name:`` prefix (if
+    ``prefixed``).
+    """
+    with open(path) as f:
+        lines = f.read().splitlines()
+    if prefixed:
+        lines = [line.split(': ', 1)[1] for line in lines]
+    return lines
+
+
+def wait_for(predicate, timeout=10):
+    """ Waits until ``predicate()`` is true, failing after ``timeout`` seconds. """
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, 'timed out'
+        time.sleep(0.01)
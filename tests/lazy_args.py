@@ -0,0 +1,125 @@
+#! /usr/bin/env python3
+
+import lo99ing
+import time
+import logging
+import threading
+from lo99ing import lazy
+from helpers import ListHandler
+
+
+class Computation:
+
+    def __init__(self, value):
+        self.value = value
+        self.calls = 0
+        self.threads = []
+
+    def __call__(self):
+        self.calls += 1
+        self.threads.append(threading.current_thread().name)
+        return self.value
+
+
+def main():
+    handlers = [ListHandler(), ListHandler()]
+    logger = lo99ing.get_logger('LAZY', level='info', propagate=False)
+    lo99ing.disable_stderr(logger)
+    for h in handlers:
+        logger.addHandler(h)
+
+    # never computed for disabled levels
+    summary = Computation('summary')
+    logger.debug('state: %s', lazy(summary))
+    assert summary.calls == 0
+    lo99ing.use_fast_disabled_calls()
+    logger.debug('state: %s', lazy(summary))
+    lo99ing.use_fast_disabled_calls(False)
+    assert summary.calls == 0
+
+    # computed once, though rendered by both handlers
+    logger.info('state: %s', lazy(summary))
+    assert summary.calls == 1
+    assert [h.messages for h in handlers] == [['state: summary']] * 2, handlers[0].messages
+
+    # args of the computation, and numeric formatting
+    logger.info('%s %d %.1f %r', lazy(str.upper, 'x'), lazy(len, 'abc'), lazy(float, 2),
+                lazy(dict, a=1))
+    assert handlers[0].messages[-1] == "X 3 2.0 {'a': 1}", handlers[0].messages[-1]
+
+    # exceptions are formatted like exceptions passed directly as args
+    logger.info('error: %s', lazy(Computation(ValueError('bad'))))
+    assert handlers[0].messages[-1] == 'error: ValueError - bad', handlers[0].messages[-1]
+
+    # failing computations are rendered, not raised (nor retried by other handlers)
+    calls = []
+
+    def fail():
+        calls.append(1)
+        raise RuntimeError('oops')
+
+    logger.info('failed: %s', lazy(fail))
+    assert len(calls) == 1
+    assert handlers[1].messages[-1] == 'failed: (error computing lazy arg: RuntimeError - oops)', \
+        handlers[1].messages[-1]
+
+    # computations don't wait for each other, and are waited for by other threads rendering them
+    started = threading.Event()
+    finished = threading.Event()
+
+    def slow():
+        started.set()
+        return 'slow' if finished.wait(5) else 'timed out'
+
+    computation = Computation(None)
+    slow_arg = lazy(lambda: computation() or slow())
+    renderers = [threading.Thread(target=str, args=(slow_arg, )) for _ in range(2)]
+    renderers[0].start()
+    assert started.wait(5)
+    renderers[1].start()
+    logger.info('fast: %s', lazy(lambda: finished.set() or 'fast'))
+    assert handlers[0].messages[-1] == 'fast: fast', handlers[0].messages[-1]
+    for thread in renderers:
+        thread.join()
+    logger.info('slow: %s', slow_arg)
+    assert handlers[0].messages[-1] == 'slow: slow', handlers[0].messages[-1]
+    assert computation.calls == 1
+
+    # rendered by its own computation
+    def recursive():
+        return 'outer(%s)' % (arg, )
+
+    arg = lazy(recursive)
+    logger.info('%s', arg)
+    assert handlers[0].messages[-1] == 'outer((lazy arg rendered while computed))', \
+        handlers[0].messages[-1]
+
+    # bounded
+    lo99ing.set_max_arg_length(10, logger)
+    logger.info('big: %s', lazy(lambda: 'x' * 100))
+    assert handlers[0].messages[-1] == 'big: ' + 'x' * 10 + '... [90 chars elided]', \
+        handlers[0].messages[-1]
+    lo99ing.set_max_arg_length(None, logger)
+
+    # log_many
+    computation = Computation('many')
+    logger.log_many([(logging.INFO, 'many %s', (lazy(computation), )),
+                     (logging.DEBUG, 'skipped %s', (lazy(computation), ))])
+    assert computation.calls == 1 and handlers[0].messages[-1] == 'many many'
+
+    # with a sharded handler, computed by the writer thread
+    sharded = lo99ing.enable_sharded(logger, window=0)
+    computation = Computation('deferred')
+    logger.info('sharded: %s', lazy(computation))
+    for _ in range(100):
+        if handlers[1].messages[-1] == 'sharded: deferred':
+            break
+        time.sleep(0.01)
+    assert computation.calls == 1 and computation.threads != ['MainThread'], computation.threads
+    assert handlers[0].messages[-1] == 'sharded: deferred'
+    logger.removeHandler(sharded)
+    sharded.close()
+
+
+if __name__ == '__main__':
+    main()
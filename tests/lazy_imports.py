@@ -0,0 +1,36 @@
+#! /usr/bin/env python3
+
+import os
+import sys
+import subprocess
+
+
+# modules which "import lo99ing" should not import (these are imported on first use)
+HEAVY_MODULES = [
+    'inspect', 'pathlib', 'logging.handlers', 'multiprocessing', 'socket', 'datetime',
+    'lo99ing.multiproc', 'lo99ing.shipping', 'lo99ing.rotating', 'lo99ing.profile',
+]
+
+
+def main():
+    code = 'import sys, lo99ing; print(" ".join(m for m in %r if m in sys.modules))' % (
+        HEAVY_MODULES, )
+    out = subprocess.check_output([sys.executable, '-c', code], env=os.environ)
+    assert out.split() == [], out
+
+    # lazily-imported names are still available
+    import lo99ing
+    assert lo99ing.LevelGovernor.__name__ == 'LevelGovernor'
+    assert 'enable_shipping' in dir(lo99ing)
+    assert lo99ing.shipping.enable_shipping is lo99ing.enable_shipping
+    from lo99ing.handlers import DailyRotatingFileHandler
+    assert DailyRotatingFileHandler.__module__ == 'lo99ing.rotating'
+    try:
+        lo99ing.no_such_name
+        assert False
+    except AttributeError:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+#! /usr/bin/env python3
+
+import lo99ing
+import logging
+import threading
+from lo99ing.level import (
+    log_level_manager, set_log_level_override, set_log_level_floor, get_log_level_overrides)
+
+
+NUM_WRITERS = 4
+NUM_NAMES = 20
+NUM_ROUNDS = 200
+
+LEVELS = (logging.DEBUG, logging.INFO, logging.WARNING, logging.ERROR)
+
+
+def main():
+    names = [['LEVELS.%d.%d' % (i, j) for j in range(NUM_NAMES)] for i in range(NUM_WRITERS)]
+    loggers = {name: lo99ing.get_logger(name, level='info') for group in names for name in group}
+
+    def write(group):
+        for r in range(NUM_ROUNDS):
+            for name in group:
+                set_log_level_override(name, logging.DEBUG)
+                set_log_level_floor(name, logging.WARNING)
+                set_log_level_override(name, None)
+                set_log_level_floor(name, None)
+        # the final state: an override for even names, a floor for odd names
+        for j, name in enumerate(group):
+            if j % 2:
+                set_log_level_floor(name, logging.ERROR)
+            else:
+                set_log_level_override(name, logging.WARNING)
+
+    stopped = threading.Event()
+    errors = []
+
+    def read():
+        try:
+            while not stopped.is_set():
+                overrides = get_log_level_overrides()
+                assert all(level in LEVELS for level in overrides.values()), overrides
+                for name, logger in loggers.items():
+                    assert log_level_manager.get_effective(name) in LEVELS, name
+                    logger.isEnabledFor(logging.INFO)
+        except Exception as e:
+            errors.append(e)
+
+    readers = [threading.Thread(target=read) for _ in range(2)]
+    writers = [threading.Thread(target=write, args=(group, )) for group in names]
+    for t in readers + writers:
+        t.start()
+    for t in writers:
+        t.join()
+    stopped.set()
+    for t in readers:
+        t.join()
+    assert not errors, errors
+
+    # no update was lost, though writers replaced the dicts concurrently
+    overrides = get_log_level_overrides()
+    for group in names:
+        for j, name in enumerate(group):
+            if j % 2:
+                assert name not in overrides, name
+                assert log_level_manager.get_floor(name) == logging.ERROR, name
+                expected = logging.ERROR
+            else:
+                assert overrides[name] == logging.WARNING, name
+                assert log_level_manager.get_floor(name) is None, name
+                expected = logging.WARNING
+            assert log_level_manager.get_effective(name) == expected, name
+            assert loggers[name].level == expected, (name, loggers[name].level)
+
+
+if __name__ == '__main__':
+    main()
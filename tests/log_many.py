@@ -0,0 +1,100 @@
+#! /usr/bin/env python3
+
+import io
+import os
+import logging
+import pathlib
+import lo99ing
+from lo99ing.handlers import StreamHandler, FileHandler, BytesFileHandler
+from lo99ing.fdpool import PooledFileHandler
+from lo99ing.formatter import formatter
+from helpers import read_lines
+
+
+class CountingStream(io.StringIO):
+
+    num_writes = 0
+
+    def write(self, s):
+        self.num_writes += 1
+        return super().write(s)
+
+
+def main():
+
+    logdir = os.path.splitext(__file__)[0] + '_output'
+    pathlib.Path(logdir).mkdir(exist_ok=True)
+    paths = [os.path.join(logdir, name) for name in ('text.log', 'bytes.log', 'pooled.log')]
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
+
+    logger = lo99ing.get_logger('BULK', level='info', propagate=False)
+    lo99ing.disable_stderr(logger)
+    stream = CountingStream()
+    handlers = [
+        StreamHandler(stream),
+        FileHandler(paths[0]),
+        BytesFileHandler(paths[1]),
+        PooledFileHandler(paths[2]),
+    ]
+    for h in handlers:
+        h.setFormatter(formatter)
+        logger.addHandler(h)
+
+    entries = [
+        (logging.INFO, 'item %s: %s', (1, 'ok')),
+        (logging.DEBUG, 'NOPRINT %s', (2, )),
+        ('warning', 'item %s: %s', (3, ValueError('bad'))),
+        (logging.INFO, 'item %s', (4, )),
+    ]
+    assert logger.log_many(entries) == 3
+    assert stream.num_writes == 1, stream.num_writes
+    expected = ['item 1: ok', 'item 3: ValueError - bad', 'item 4']
+    assert [line.split(': ', 1)[1] for line in stream.getvalue().splitlines()] == expected
+    for path in paths:
+        assert read_lines(path) == expected, path
+
+    # the location is of the log_many call
+    handler = StreamHandler(stream)
+    handler.setFormatter(logging.Formatter('%(filename)s:%(funcName)s'))
+    logger.addHandler(handler)
+    logger.log_many([(logging.INFO, 'x', ())])
+    assert stream.getvalue().endswith('log_many.py:main\n'), stream.getvalue()
+    logger.removeHandler(handler)
+
+    # prefixed
+    stream.seek(0)
+    stream.truncate()
+    plogger = logger.prefixed('[job]')
+    assert plogger.log_many([(logging.INFO, 'item %s', (i, )) for i in range(3)]) == 3
+    lines = [line.split(': ', 1)[1] for line in stream.getvalue().splitlines()]
+    assert lines == ['[job] item %s' % i for i in range(3)], lines
+
+    # handler levels and filters
+    stream.seek(0)
+    stream.truncate()
+    handlers[0].setLevel(logging.WARNING)
+    handlers[0].addFilter(lambda record: 'NOPRINT' not in record.msg)
+    logger.log_many([
+        (logging.INFO, 'NOPRINT level', ()),
+        (logging.ERROR, 'NOPRINT filter', ()),
+        (logging.ERROR, 'error', ()),
+    ])
+    lines = [line.split(': ', 1)[1] for line in stream.getvalue().splitlines()]
+    assert lines == ['error'], lines
+
+    # handlers without handle_many, and propagation
+    child = lo99ing.get_logger('BULK.child')
+    child_stream = io.StringIO()
+    child.addHandler(logging.StreamHandler(child_stream))
+    child.log_many([(logging.INFO, 'child %s', (i, )) for i in range(2)])
+    assert child_stream.getvalue() == 'child 0\nchild 1\n', child_stream.getvalue()
+
+    for h in handlers:
+        logger.removeHandler(h)
+        h.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+#! /usr/bin/env python3
+
+import lo99ing
+import time
+import logging
+import multiprocessing
+from helpers import ListHandler
+
+
+def worker(conn, idx):
+    lo99ing.enable_process_sink(conn, batch_size=3)
+    logger = lo99ing.get_logger('WORKER')
+    quiet_logger = lo99ing.get_logger('WORKER.quiet')
+    for i in range(5):
+        logger.info('info %s %s', idx, i)
+    logger.debug('debug %s (enabled by override pushed from parent)', idx)
+    quiet_logger.info('NOPRINT (filtered in the worker by override pushed from parent)')
+    try:
+        {}[idx]
+    except KeyError as e:
+        logger.error('error %s: %s', idx, e)
+
+
+def idle_worker(conn, toggled):
+    lo99ing.enable_process_sink(conn)
+    logger = lo99ing.get_logger('IDLE')
+    # doesn't log anything while the parent pushes levels
+    toggled.wait()
+    deadline = time.monotonic() + 5
+    while not logger.isEnabledFor(logging.DEBUG):
+        assert time.monotonic() < deadline, 'final level not received'
+        time.sleep(0.01)
+    logger.debug('idle worker: debug enabled')
+
+
+def main():
+    handler = ListHandler()
+    logging.root.addHandler(handler)
+
+    lo99ing.set_log_level_override('WORKER', 'debug')
+    lo99ing.set_log_level_override('WORKER.quiet', 'error')
+
+    listener = lo99ing.ProcessLogListener()
+    listener.start()
+
+    procs = []
+    for idx in range(2):
+        conn = listener.new_connection()
+        proc = multiprocessing.Process(target=worker, args=(conn, idx))
+        proc.start()
+        conn.close()
+        procs.append(proc)
+    for proc in procs:
+        proc.join()
+        assert proc.exitcode == 0, proc.exitcode
+
+    listener.stop()
+
+    messages = handler.messages
+    for idx in range(2):
+        for i in range(5):
+            assert 'info %s %s' % (idx, i) in messages, messages
+        assert any(m.startswith('debug %s' % idx) for m in messages), messages
+        assert 'error %s: KeyError - %s' % (idx, idx) in messages, messages
+    assert not any('NOPRINT' in m for m in messages), messages
+    assert len(messages) == 2 * 7, messages
+
+    # records from each worker arrive in order:
+    for idx in range(2):
+        mine = [m for m in messages if m.startswith('info %s ' % idx)]
+        assert mine == ['info %s %s' % (idx, i) for i in range(5)], mine
+
+    # changing levels doesn't block on workers which don't log (coalesced, sent by a thread)
+    listener = lo99ing.ProcessLogListener()
+    listener.start()
+    conn = listener.new_connection()
+    toggled = multiprocessing.Event()
+    proc = multiprocessing.Process(target=idle_worker, args=(conn, toggled))
+    proc.start()
+    conn.close()
+    t0 = time.monotonic()
+    for i in range(20000):
+        lo99ing.set_log_level_override('IDLE', 'debug' if i % 2 else 'info')
+    assert time.monotonic() - t0 < 10
+    toggled.set()
+    proc.join()
+    assert proc.exitcode == 0, proc.exitcode
+    listener.stop()
+    assert handler.messages[-1] == 'idle worker: debug enabled', handler.messages[-1]
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+#! /usr/bin/env python3
+
+import lo99ing
+import logging
+import os
+import pathlib
+from lo99ing.handlers import FileHandler, BytesFileHandler
+from lo99ing.formatter import formatter
+
+
+def log_stuff(logger):
+    logger.info('1 hello')
+    logger.warning('2 unicode: שלום \U0001F600')
+    logger.info('3 multi\nline')
+    try:
+        {}[1]
+    except KeyError:
+        logger.exception('4 exception')
+    logger.info('5 exception arg: %s', ValueError('x'))
+    logger.info('7 done')
+
+
+def main():
+
+    logdir = os.path.splitext(__file__)[0] + '_output'
+    pathlib.Path(logdir).mkdir(exist_ok=True)
+    paths = [os.path.join(logdir, name) for name in ('text.log', 'bytes.log', 'batched.log')]
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
+
+    logger = lo99ing.get_logger('LOGGER1', propagate=False)
+    lo99ing.disable_stderr(logger)
+
+    handlers = [
+        FileHandler(paths[0]),
+        BytesFileHandler(paths[1]),
+        BytesFileHandler(paths[2], buffer_records=100),
+    ]
+    for h in handlers:
+        h.setFormatter(formatter)
+        logger.addHandler(h)
+
+    # the same record is formatted by all handlers, so timestamps match
+    log_stuff(logger)
+
+    # batched: written only on flush (or on error)
+    logger.info('8 batched')
+    assert not open(paths[2]).read().endswith('8 batched\n')
+    for h in handlers:
+        h.flush()
+
+    # a custom formatter (falls back to formatter.format)
+    for h in handlers:
+        h.setFormatter(logging.Formatter('%(levelname)s %(message)s'))
+    logger.info('9 custom format')
+
+    for h in handlers:
+        logger.removeHandler(h)
+        h.close()
+
+    text = open(paths[0], 'rb').read()
+    assert text.count(b'\n') > 10, text
+    assert b'9 custom format' in text
+    for path in paths[1:]:
+        data = open(path, 'rb').read()
+        assert data == text, (path, data, text)
+
+    # stderr
+    lo99ing.enable_stderr(logger, native_bytes=True)
+    lo99ing.enable_stderr(logger, native_bytes=True)
+    assert len(logger.handlers) == 1, logger.handlers
+    logger.info('10 this prints to stderr')
+    lo99ing.disable_stderr(logger)
+    assert not logger.handlers, logger.handlers
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+#! /usr/bin/env python3
+
+import lo99ing
+import os
+import pathlib
+from lo99ing.profile import LoggingProfiler
+
+
+def chatty(logger):
+    for i in range(100):
+        logger.info('1 chatty %s %s', i, 'x' * 1000)
+
+
+def quiet(logger):
+    logger.info('2 quiet')
+
+
+def failing(logger):
+    try:
+        {}[1]
+    except KeyError as e:
+        logger.error('3 error %s', e)
+        logger.exception('4 exception')
+
+
+def main():
+
+    logdir = os.path.splitext(__file__)[0] + '_output'
+    pathlib.Path(logdir).mkdir(exist_ok=True)
+
+    logger = lo99ing.get_file_logger('PROFILED', os.path.join(logdir, 'a.log'))
+
+    with LoggingProfiler() as profiler:
+        chatty(logger)
+        quiet(logger)
+        failing(logger)
+    quiet(logger)  # not profiled
+
+    stats = {d['site'].split()[-1]: d for d in profiler.stats()}
+    assert set(stats) == {'(chatty)', '(quiet)', '(failing)'}, stats
+    assert stats['(chatty)']['calls'] == 100, stats
+    assert stats['(chatty)']['chars'] > 100 * 1000, stats
+    assert stats['(quiet)']['calls'] == 1, stats
+    assert stats['(failing)']['exception'] > 0, stats
+    assert profiler.stats(sort='chars')[0]['site'].endswith('(chatty)')
+    for d in stats.values():
+        assert d['wall'] >= d['format'] + d['exception'], d
+
+    report = profiler.report(sort='chars')
+    print(report)
+    assert '(chatty)' in report.splitlines()[2], report
+
+    # calls raising (e.g. from a filter) are measured too, and don't leave the sample behind
+    def bad_filter(record):
+        raise RuntimeError('bad filter')
+
+    logger.addFilter(bad_filter)
+    with LoggingProfiler() as profiler:
+        try:
+            quiet(logger)
+            assert False
+        except RuntimeError:
+            pass
+        assert profiler._current() is None
+    logger.removeFilter(bad_filter)
+    assert profiler.stats()[0]['calls'] == 1, profiler.stats()
+
+    # sampling
+    profiler = LoggingProfiler(sample_every=10)
+    with profiler:
+        chatty(logger)
+    assert profiler.stats()[0]['calls'] == 10, profiler.stats()
+
+
+if __name__ == '__main__':
+    main()
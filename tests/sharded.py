@@ -0,0 +1,156 @@
+#! /usr/bin/env python3
+
+import lo99ing
+import io
+import os
+import sys
+import time
+import glob
+import logging
+import pathlib
+import threading
+import subprocess
+import contextlib
+import lo99ing.sharded as sharded_module
+from lo99ing.sharded import ShardedHandler
+from helpers import read_lines, wait_for
+
+
+FORMAT = '%(created).6f %(threadName)s %(message)s'
+
+
+def last_line(path):
+    return read_lines(path, prefixed=False)[-1]
+
+
+def main():
+
+    logdir = os.path.splitext(__file__)[0] + '_output'
+    pathlib.Path(logdir).mkdir(exist_ok=True)
+    for path in glob.glob(os.path.join(logdir, '*.log')):
+        os.remove(path)
+
+    # records of many threads are merged in timestamp order
+    path = os.path.join(logdir, 'merged.log')
+    logger = lo99ing.get_file_logger('merged', path)
+    logger.handlers[0].setFormatter(logging.Formatter(FORMAT))
+    sharded = lo99ing.enable_sharded(logger, window=60)
+    assert logger.handlers == [sharded], logger.handlers
+
+    def run(thread_idx):
+        for i in range(200):
+            logger.info('thread %s %s', thread_idx, i)
+
+    threads = [threading.Thread(target=run, args=(i, ), name='t%s' % i) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not os.path.getsize(path)  # all within the window
+    sharded.flush()
+    lines = read_lines(path, prefixed=False)
+    assert len(lines) == 8 * 200, len(lines)
+    times = [float(line.split()[0]) for line in lines]
+    assert times == sorted(times)
+    for i in range(8):
+        msgs = [line.split(' ', 2)[2] for line in lines if line.split()[1] == 't%s' % i]
+        assert msgs == ['thread %s %s' % (i, j) for j in range(200)], msgs[:5]
+    stats = sharded.stats()
+    assert stats['records'] == 8 * 200 and stats['late'] == 0, stats
+
+    # messages are rendered when logged
+    args = [1]
+    logger.info('args %s', args)
+    args.append(2)
+    sharded.flush()
+    assert last_line(path).endswith(' args [1]'), last_line(path)
+
+    # records of exited threads are written (without flushing), and their shards discarded
+    sharded.window = 0
+    t = threading.Thread(target=logger.info, args=('from exited thread', ))
+    t.start()
+    t.join()
+    for _ in range(100):
+        if last_line(path).endswith('from exited thread'):
+            break
+        time.sleep(0.01)
+    assert last_line(path).endswith('from exited thread'), last_line(path)
+    assert sharded.stats()['shards'] == 1, sharded.stats()  # only main thread's
+
+    # the window is measured using the records' clock
+    sharded.window = 0.05
+    lo99ing.use_clock(lambda: time.time() + 3600)
+    logger.info('from the future')
+    for _ in range(100):
+        if last_line(path).endswith('from the future'):
+            break
+        time.sleep(0.01)
+    lo99ing.use_clock(None)
+    assert last_line(path).endswith('from the future'), last_line(path)
+
+    # handler levels are applied
+    error_path = os.path.join(logdir, 'errors.log')
+    lo99ing.enable_file(error_path, logger=logger)
+    logger.handlers[-1].setLevel(logging.ERROR)
+    assert lo99ing.enable_sharded(logger) is sharded
+    assert len(sharded.handlers) == 2
+    logger.info('info')
+    logger.error('error')
+    sharded.flush()
+    assert read_lines(error_path) == ['error']
+
+    logger.removeHandler(sharded)
+    sharded.close()
+    for h in sharded.handlers:
+        h.close()
+
+    # errors of the writer thread are reported (and it keeps running)
+    class FailingHandler(logging.Handler):
+        def emit(self, record):
+            raise ValueError('bad handler')
+
+        def handle(self, record):
+            self.emit(record)  # unlike Handler.handle, not reporting the error itself
+
+    logger = lo99ing.get_logger('sharded.failing', propagate=False)
+    lo99ing.disable_stderr(logger)
+    sharded = ShardedHandler([FailingHandler()], window=0)
+    logger.addHandler(sharded)
+    errors = io.StringIO()
+    with contextlib.redirect_stderr(errors):
+        for i in range(2):
+            logger.info('fails %s', i)
+            wait_for(lambda: errors.getvalue().count('ValueError: bad handler') > i)
+    assert 'Logged from %s' % sharded_module.__file__ in errors.getvalue(), errors.getvalue()
+    logger.removeHandler(sharded)
+    sharded.close()
+
+    # the stderr handler is recognized behind the ShardedHandler
+    logger = lo99ing.get_logger('sharded.stderr', propagate=False)
+    lo99ing.enable_stderr(logger)
+    sharded = lo99ing.enable_sharded(logger)
+    lo99ing.enable_stderr(logger)
+    assert logger.handlers == [sharded] and len(sharded.handlers) == 1, sharded.handlers
+    lo99ing.disable_stderr(logger)
+    assert logger.handlers == [sharded] and sharded.handlers == [], sharded.handlers
+    logger.removeHandler(sharded)
+    sharded.close()
+
+    # records still within the window are written on process exit
+    path = os.path.join(logdir, 'exit.log')
+    code = '\n'.join([
+        'import threading, lo99ing',
+        'logger = lo99ing.get_file_logger("exit", %r)' % path,
+        'lo99ing.enable_sharded(logger, window=60)',
+        'threads = [threading.Thread(target=logger.info, args=("thread %s", i)) for i in range(4)]',
+        '[t.start() for t in threads]',
+        '[t.join() for t in threads]',
+        'logger.info("main")',
+    ])
+    subprocess.check_call([sys.executable, '-c', code])
+    lines = read_lines(path)
+    assert sorted(lines) == ['main'] + ['thread %s' % i for i in range(4)], lines
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,163 @@
+#! /usr/bin/env python3
+
+import lo99ing
+from lo99ing.shipping import iter_batches, encode_batch, ShippingHandler
+import io
+import os
+import contextlib
+import pathlib
+import socket
+import socketserver
+import threading
+import time
+from helpers import wait_for
+
+
+class Collector(socketserver.ThreadingTCPServer):
+    """ A stand-in collector, storing the records it receives. """
+
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, port=0):
+        super().__init__(('127.0.0.1', port), CollectorRequestHandler)
+        self.records = []
+        self.batches = 0
+        self.connections = []
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def stop(self):
+        self.shutdown()
+        for conn in self.connections:
+            try:
+                conn.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass  # already closed
+            conn.close()
+        self.server_close()
+
+
+class CollectorRequestHandler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        self.server.connections.append(self.request)
+        try:
+            for batch in iter_batches(self.rfile):
+                self.server.batches += 1
+                self.server.records.extend(batch)
+        except (OSError, ValueError):
+            pass
+
+
+def main():
+
+    logdir = os.path.splitext(__file__)[0] + '_output'
+    pathlib.Path(logdir).mkdir(exist_ok=True)
+    spool_path = os.path.join(logdir, 'spool.bin')
+    if os.path.exists(spool_path):
+        os.remove(spool_path)
+
+    collector = Collector()
+    port = collector.port
+
+    logger = lo99ing.get_logger('SHIPPED', propagate=False)
+    lo99ing.disable_stderr(logger)
+    handler = lo99ing.enable_shipping(
+        ('127.0.0.1', port), logger=logger, batch_size=50, spool_path=spool_path,
+        min_backoff=0.05, max_backoff=0.2)
+
+    # records are batched:
+    for i in range(200):
+        logger.info('1 record %s', i)
+    handler.flush()
+    wait_for(lambda: len(collector.records) == 200)
+    assert collector.records[0].endswith('SHIPPED: 1 record 0'), collector.records[0]
+    assert collector.records[-1].endswith('SHIPPED: 1 record 199'), collector.records[-1]
+    assert collector.batches < 200, collector.batches
+    stats = handler.stats()
+    assert stats['sent'] == 200 and stats['dropped'] == 0, stats
+
+    # multi-line records are kept intact:
+    try:
+        {}[1]
+    except KeyError:
+        logger.exception('2 with traceback')
+    handler.flush()
+    wait_for(lambda: len(collector.records) == 201)
+    assert 'Traceback' in collector.records[-1], collector.records[-1]
+
+    # collector is down: records are spooled
+    collector.stop()
+    time.sleep(0.1)
+    for i in range(20):
+        logger.info('3 spooled %s', i)
+        handler.flush()
+    stats = handler.stats()
+    assert stats['spooled'] > 0, stats
+
+    # collector is back: connection is re-established, and spool is replayed
+    collector2 = Collector(port)
+    logger.info('4 after reconnect')
+    handler.flush()
+    wait_for(lambda: collector2.records and collector2.records[-1].endswith('4 after reconnect'))
+    wait_for(lambda: handler.stats()['spooled'] == 0 and not os.path.exists(spool_path))
+    shipped = [r for r in collector.records + collector2.records if '3 spooled' in r]
+    assert len(shipped) == 20, shipped
+    stats = handler.stats()
+    assert stats['dropped'] == 0, stats
+    assert stats['reconnects'] == 2, stats
+    assert not os.path.exists(spool_path)
+
+    handler.close()
+    collector2.stop()
+
+    # no collector, and spooling fails: records are dropped (and counted), and it's reported
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    dead_address = sock.getsockname()
+    sock.close()
+    logger = lo99ing.get_logger('UNSPOOLED', propagate=False)
+    lo99ing.disable_stderr(logger)
+    handler = lo99ing.enable_shipping(
+        dead_address, logger=logger, spool_path=os.path.join(logdir, 'no-such-dir', 'spool.bin'))
+    stderr = io.StringIO()
+    with contextlib.redirect_stderr(stderr):
+        logger.info('5 lost')
+        handler.flush()
+    stats = handler.stats()
+    assert stats['dropped'] == 1 and stats['spooled'] == 0, stats
+    assert 'FileNotFoundError' in stderr.getvalue(), stderr.getvalue()
+    handler.close()
+
+    # a replay failing midway: the frames already sent are removed from the spool
+    with open(spool_path, 'wb') as f:
+        for i in range(3):
+            f.write(encode_batch([b'6 frame %d' % i]))
+    handler = ShippingHandler(dead_address, spool_path=spool_path, min_backoff=60)
+    wait_for(lambda: handler.stats()['connect_failures'] == 1)
+    sent = []
+
+    def send(frame, num_records):
+        if sent:
+            raise ConnectionResetError()
+        sent.append(frame)
+
+    handler._send = send
+    try:
+        handler._replay_spool()
+        assert False
+    except ConnectionResetError:
+        pass
+    assert handler.stats()['spooled'] == 2, handler.stats()
+    with open(spool_path, 'rb') as f:
+        assert list(iter_batches(f)) == [['6 frame 1'], ['6 frame 2']]
+    handler.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+#! /usr/bin/env python3
+
+import io
+import re
+import copy
+import pickle
+import logging
+import threading
+import lo99ing
+from lo99ing.handlers import StreamHandler
+from lo99ing.record import SlimLogRecord, get_used_fields, LAZY_FIELDS
+from lo99ing.formatter import formatter
+
+
+def main():
+    lo99ing.use_slim_records()
+    logger = lo99ing.get_logger('SLIM', propagate=False)
+    lo99ing.disable_stderr(logger)
+    stream = io.StringIO()
+    handler = StreamHandler(stream)
+    handler.setFormatter(formatter)
+    logger.addHandler(handler)
+
+    # the default format uses none of the lazy fields, so they are not computed
+    records = []
+    handler.addFilter(lambda record: records.append(record) or True)
+    logger.info('1 hello %s', 'world')
+    record, = records
+    assert isinstance(record, SlimLogRecord), record
+    assert stream.getvalue().endswith(':INFO:SLIM: 1 hello world\n'), stream.getvalue()
+    assert not LAZY_FIELDS.keys() & record.__dict__.keys(), record.__dict__.keys()
+
+    # but they are computed when accessed as attributes
+    assert record.filename == 'slim_records.py', record.filename
+    assert record.module == 'slim_records'
+    assert record.threadName == 'MainThread'
+    assert record.processName == 'MainProcess'
+    assert LAZY_FIELDS.keys() <= record.__dict__.keys(), record.__dict__.keys()
+    try:
+        record.no_such_field
+        assert False
+    except AttributeError:
+        pass
+
+    # a format using lazy fields: these are computed eagerly (setting a formatter triggers
+    # re-inspecting the handlers)
+    handler.setFormatter(logging.Formatter('%(module)s:%(lineno)d %(threadName)s %(message)s'))
+    assert {'module', 'threadName'} <= get_used_fields()
+    records.clear()
+    logger.info('2 formatted')
+    assert re.search(r'slim_records:\d+ MainThread 2 formatted\n$', stream.getvalue()), \
+        stream.getvalue()
+    assert {'module', 'threadName'} <= records[0].__dict__.keys(), records[0].__dict__.keys()
+
+    # thread names are those of the creating thread, even if formatted by another
+    handler.setFormatter(formatter)
+    records.clear()
+    done = threading.Event()
+
+    def run():
+        logger.info('3 from thread')
+        done.wait()
+
+    t = threading.Thread(target=run, name='worker')
+    t.start()
+    assert 'threadName' not in records[0].__dict__
+    assert records[0].threadName == 'worker', records[0].threadName
+    done.set()
+    t.join()
+
+    # copying and pickling (e.g. QueueHandler) computes all fields
+    records.clear()
+    logger.info('4 copied')
+    for r in [copy.copy(records[0]), pickle.loads(pickle.dumps(records[0]))]:
+        assert LAZY_FIELDS.keys() <= r.__dict__.keys(), r.__dict__.keys()
+        assert r.filename == 'slim_records.py'
+
+    # the records' location is of the logging call
+    records.clear()
+    logger.prefixed('[x]').warning('5 location')
+    assert records[0].funcName == 'main', records[0].funcName
+
+    # extending: wrapping the factory, or subclassing
+    slim_factory = logging.getLogRecordFactory()
+
+    def tagging_factory(*args, **kwargs):
+        record = slim_factory(*args, **kwargs)
+        record.tag = 'wrapped'
+        return record
+
+    class TaggedRecord(SlimLogRecord):
+
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.tag = 'subclassed'
+
+    for factory, tag in [(tagging_factory, 'wrapped'), (TaggedRecord, 'subclassed')]:
+        logging.setLogRecordFactory(factory)
+        records.clear()
+        logger.info('6 %s', tag)
+        assert isinstance(records[0], SlimLogRecord) and records[0].tag == tag, records[0]
+        assert 'module' not in records[0].__dict__ and records[0].module == 'slim_records'
+        assert stream.getvalue().endswith(':INFO:SLIM: 6 %s\n' % tag), stream.getvalue()
+
+    # a factory installed on top of lo99ing's is kept when uninstalling
+    logging.setLogRecordFactory(tagging_factory)
+    lo99ing.use_slim_records(False)
+    assert logging.getLogRecordFactory() is tagging_factory
+    records.clear()
+    logger.info('7 not slim')
+    assert type(records[0]) is logging.LogRecord and records[0].tag == 'wrapped', records[0]
+    logging.setLogRecordFactory(slim_factory)
+    lo99ing.use_slim_records(False)
+    assert logging.getLogRecordFactory() is logging.LogRecord
+    assert logging.Handler.setFormatter is lo99ing.record._orig_set_formatter
+    logger.removeHandler(handler)
+
+
+if __name__ == '__main__':
+    main()
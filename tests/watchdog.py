@@ -0,0 +1,195 @@
+#! /usr/bin/env python3
+
+import lo99ing
+import os
+import sys
+import json
+import time
+import glob
+import logging
+import pathlib
+import threading
+from lo99ing.watchdog import StallGuardHandler, guard_handlers, WATCHDOG_LOGGER_NAME
+from lo99ing.handlers import stderr_handler
+from helpers import ListHandler, wait_for
+
+
+class BlockingHandler(logging.Handler):
+    """ A handler whose writes block while ``unblocked`` is not set (like a hung disk). """
+
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+        self.unblocked = threading.Event()
+        self.unblocked.set()
+
+    def emit(self, record):
+        self.unblocked.wait()
+        self.messages.append(record.getMessage())
+
+
+def main():
+
+    logdir = os.path.splitext(__file__)[0] + '_output'
+    pathlib.Path(logdir).mkdir(exist_ok=True)
+    for path in glob.glob(os.path.join(logdir, '*')):
+        os.remove(path)
+
+    # stall reports
+    reports = ListHandler()
+    watchdog_logger = lo99ing.get_logger(WATCHDOG_LOGGER_NAME, propagate=False)
+    lo99ing.disable_stderr(watchdog_logger)
+    watchdog_logger.addHandler(reports)
+
+    logger = lo99ing.get_logger('GUARDED', propagate=False)
+    lo99ing.disable_stderr(logger)
+
+    # healthy: records are written by the worker
+    primary = BlockingHandler()
+    guard = StallGuardHandler(primary, deadline=0.1)
+    logger.addHandler(guard)
+    logger.info('0 healthy')
+    assert guard.flush()
+    assert primary.messages == ['0 healthy']
+
+    # stalled: callers don't block, and records are diverted to the ring
+    primary.unblocked.clear()
+    logger.info('1 blocks')
+    wait_for(lambda: guard._write_started is not None)
+    time.sleep(0.15)
+    t0 = time.monotonic()
+    for i in range(2, 6):
+        logger.info('%s diverted', i)
+    assert time.monotonic() - t0 < 0.1
+    stats = guard.stats()
+    assert stats['stalled'] and stats['stalls'] == 1 and stats['diverted'] == 4, stats
+    assert stats['ring'] == 4, stats
+    assert not guard.flush(timeout=0.01)
+    assert 'stalled' in reports.messages[-1], reports.messages
+
+    # recovery: the ring is replayed, in order
+    primary.unblocked.set()
+    assert guard.flush(timeout=5)
+    expected = ['0 healthy', '1 blocks'] + ['%s diverted' % i for i in range(2, 6)]
+    assert primary.messages == expected, primary.messages
+    stats = guard.stats()
+    assert not stats['stalled'] and stats['replayed'] == 4 and stats['dropped'] == 0, stats
+    assert stats['max_write_time'] > 0.1, stats
+    event, = guard.events()
+    assert event['duration'] > 0.1 and event['diverted'] == 4 and event['replayed'] == 4, event
+    assert 'recovered' in reports.messages[-1], reports.messages
+    logger.info('6 healthy again')
+    assert guard.flush() and primary.messages[-1] == '6 healthy again'
+    logger.removeHandler(guard)
+    guard.close()
+
+    # drop fallback, and a ring too small: drops are counted
+    for fallback in ['drop', 'ring']:
+        primary = BlockingHandler()
+        guard = StallGuardHandler(primary, deadline=0.05, fallback=fallback, ring_size=2)
+        logger.addHandler(guard)
+        primary.unblocked.clear()
+        logger.info('blocks')
+        wait_for(lambda: guard._write_started is not None)
+        time.sleep(0.1)
+        for i in range(5):
+            logger.info('%s', i)
+        assert guard.stats()['dropped'] == (5 if fallback == 'drop' else 3), guard.stats()
+        primary.unblocked.set()
+        assert guard.flush(timeout=5)
+        expected = ['blocks'] + ([] if fallback == 'drop' else ['3', '4'])
+        assert primary.messages == expected, primary.messages
+        logger.removeHandler(guard)
+        guard.close()
+
+    # ring fallback, closed while stalled: the ring's records are counted as dropped
+    primary = BlockingHandler()
+    guard = StallGuardHandler(primary, deadline=0.05)
+    logger.addHandler(guard)
+    primary.unblocked.clear()
+    logger.info('blocks')
+    wait_for(lambda: guard._write_started is not None)
+    time.sleep(0.1)
+    for i in range(3):
+        logger.info('%s', i)
+    logger.removeHandler(guard)
+    guard.close()
+    stats = guard.stats()
+    assert stats['dropped'] == 3 and stats['ring'] == 0, stats
+    primary.unblocked.set()
+
+    # invalid fallback
+    try:
+        StallGuardHandler(primary, fallback='disk')
+        assert False
+    except ValueError as e:
+        assert str(e) == "fallback must be one of ring, spool, drop, not 'disk'", str(e)
+
+    # spool fallback: spooled records survive a restart (while stalled), and are replayed
+    spool_path = os.path.join(logdir, 'app.spool')
+    primary = BlockingHandler()
+    guard = StallGuardHandler(primary, deadline=0.05, fallback='spool', spool_path=spool_path)
+    logger.addHandler(guard)
+    primary.unblocked.clear()
+    logger.info('blocks')
+    wait_for(lambda: guard._write_started is not None)
+    time.sleep(0.1)
+    logger.info('spooled %s', 1)
+    try:
+        raise ValueError('bad')
+    except ValueError:
+        logger.exception('spooled 2', extra={'obj': object()})
+    logger.removeHandler(guard)
+    guard.close()  # stalled: gives up after the deadline, and leaves the primary open
+    primary.unblocked.set()
+    # the spool is JSON lines (not e.g. pickle, which would run code when replayed)
+    with open(spool_path) as f:
+        spooled = [json.loads(line) for line in f]
+    assert [d['msg'] for d in spooled] == ['spooled 1', 'spooled 2'], spooled
+    assert spooled[1]['obj'].startswith('<object object at'), spooled[1]
+    assert os.stat(spool_path).st_mode & 0o077 == 0, oct(os.stat(spool_path).st_mode)
+
+    primary = ListHandler()
+    primary.setFormatter(logging.Formatter())  # with the exception's traceback
+    guard = StallGuardHandler(primary, fallback='spool', spool_path=spool_path)
+    logger.addHandler(guard)
+    logger.info('after restart')
+    assert guard.flush(timeout=5)
+    assert primary.messages[0] == 'spooled 1', primary.messages
+    assert primary.messages[1].startswith('spooled 2\nTraceback'), primary.messages
+    assert primary.messages[1].endswith('ValueError: bad'), primary.messages
+    assert primary.messages[2:] == ['after restart'], primary.messages
+    assert not os.path.exists(spool_path) and not os.path.exists(spool_path + '.replay')
+    logger.removeHandler(guard)
+    guard.close()
+
+    # guarding the handlers of a logger
+    path = os.path.join(logdir, 'guarded.log')
+    file_logger = lo99ing.get_file_logger('GUARDED.file', path)
+    file_handler = file_logger.handlers[0]
+    guard, = guard_handlers(file_logger, deadline=1)
+    assert file_logger.handlers == [guard] and guard.primary is file_handler
+    assert guard_handlers(file_logger) == []
+    file_logger.info('to file')
+    assert guard.flush()
+    with open(path) as f:
+        assert f.read().endswith(': to file\n')
+    file_logger.removeHandler(guard)
+    guard.close()
+    assert file_handler.stream is None  # closed
+
+    # guarding the shared stderr handler: a copy is guarded, and it's recognized as stderr's
+    stderr_logger = lo99ing.get_logger('GUARDED.stderr', propagate=False)
+    lo99ing.enable_stderr(stderr_logger)
+    guard, = guard_handlers(stderr_logger)
+    assert guard.primary is not stderr_handler and guard.primary.stream is sys.stderr
+    assert any(ref() is stderr_handler for ref in logging._handlerList)  # still flushed at exit
+    lo99ing.enable_stderr(stderr_logger)
+    assert stderr_logger.handlers == [guard], stderr_logger.handlers
+    lo99ing.disable_stderr(stderr_logger)
+    assert stderr_logger.handlers == [], stderr_logger.handlers
+    guard.close()
+
+
+if __name__ == '__main__':
+    main()